@@ -26,7 +26,8 @@ alb_stack = AlbStack(app, "AlbStack", vpc=vpc_stack.vpc, alb_sg=sg_stack.alb_sg,
 
 efs_stack = EfsStack(app, "EfsStack", vpc=vpc_stack.vpc, sg=sg_stack.efs_sg)
 # EFS Access Points Stack (depends on EFS)
-efs_ap_stack = EfsAccessPointsStack(app, "EfsAccessPointsStack", file_system=efs_stack.efs)
+efs_ap_stack = EfsAccessPointsStack(app, "EfsAccessPointsStack", file_system=efs_stack.efs,
+                                    grafana_file_system=efs_stack.grafana_efs)
 efs_ap_stack.add_dependency(efs_stack)
 
 # AMP Stack
@@ -39,6 +40,7 @@ ecs_stack = EcsStack(
     vpc=vpc_stack.vpc,
     ecs_sg=sg_stack.ecs_sg,
     efs=efs_stack.efs,
+    grafana_efs=efs_stack.grafana_efs,
     efs_grafana_ap=efs_ap_stack.grafana_ap,
     efs_loki_ap=efs_ap_stack.loki_ap,
     s3_bucket=s3_stack.bucket,
@@ -0,0 +1,124 @@
+# Async AWS client layer for the logger app
+#
+# boto3 has no asyncio support, so every call is handed to a bounded thread pool
+# and awaited. The pool size is the concurrency limit for in-flight AWS calls.
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+# boto3's default session is not thread-safe, so clients are created one at a time
+_create_lock = threading.RLock()
+
+
+def max_concurrency_from_env():
+    """Read AWS_CLIENT_MAX_CONCURRENCY, falling back to the default"""
+    return max(1, int(os.getenv("AWS_CLIENT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+
+class AwsCallExecutor:
+    """Runs blocking boto3 calls on a bounded thread pool"""
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="aws-call"
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context into the worker thread so spans created by
+        # the botocore instrumentation keep the request span as their parent
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(ctx.run, fn, *args, **kwargs)
+        )
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def boto3_factory(kind, service_name, region_name, max_pool_connections=10):
+    """Factory for LazyAwsClient that imports boto3 only when it is called"""
+    def create():
+        import boto3
+        from botocore.config import Config
+        config = Config(max_pool_connections=max_pool_connections)
+        return getattr(boto3, kind)(service_name, region_name=region_name, config=config)
+    return create
+
+
+class LazyAwsClient:
+    """A boto3 client, resource or Table that is created on first use.
+
+    Attribute access returns a function that creates the target on its first
+    call and then forwards to it. Behind an AsyncAwsProxy that first call runs on
+    an executor thread, so neither the boto3 import nor client creation ever
+    blocks the event loop.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            with _create_lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            return getattr(self.resolve(), name)(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class AsyncAwsProxy:
+    """Awaitable view of a boto3 client, resource or Table.
+
+    Methods of the wrapped object become coroutines that run on the executor;
+    plain attributes such as ``table_name`` are returned as-is. Every call is
+    timed, including the wait for an executor thread, and reported to
+    ``on_call(service, operation, duration, error)``.
+    """
+
+    def __init__(self, target, executor, service=None, on_call=None):
+        self._target = target
+        self._executor = executor
+        self._service = service
+        self._on_call = on_call
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        on_call = self._on_call
+        service = self._service
+
+        async def call(*args, **kwargs):
+            if on_call is None:
+                return await self._executor.run(attr, *args, **kwargs)
+            start = time.perf_counter()
+            error = None
+            try:
+                return await self._executor.run(attr, *args, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                on_call(service, name, time.perf_counter() - start, error)
+
+        call.__name__ = name
+        # Cache the wrapper so later lookups skip __getattr__
+        self.__dict__[name] = call
+        return call
@@ -0,0 +1,173 @@
+# Write-behind DynamoDB writer
+#
+# Puts, and deletes through submit_delete(), are put on a bounded queue and
+# written in order in BatchWriteItem calls of up to 25 requests, so a delete
+# submitted after a put is never overtaken by it. A batch is sent once it is
+# full or the linger timer expires. UnprocessedItems, and batches whose call
+# failed outright, are retried with full-jitter exponential backoff; the two
+# are counted separately. When the queue is full, submit() raises
+# WriteQueueFull so the caller can shed load. stop() lets the loop finish the
+# batch it holds and drain the queue before returning, so nothing submitted is
+# lost on shutdown.
+import asyncio
+import logging
+import random
+
+DYNAMODB_MAX_BATCH_WRITE = 25
+
+logger = logging.getLogger("sample_logger")
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class DynamoDbWriteBehind:
+    def __init__(self, async_dynamodb, table_name, key_names=("id", "timestamp"), max_queue=1000,
+                 linger=0.05, max_retries=5, retry_backoff=0.05, max_backoff=2.0,
+                 on_batch=None, on_unprocessed=None, on_written=None):
+        self.table_name = table_name
+        self.key_names = key_names
+        self.max_queue = max_queue
+        self.linger = linger
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.stats = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0, "unprocessed_retries": 0,
+                      "call_errors": 0}
+        self._dynamodb = async_dynamodb
+        # Called with the number of items in each batch, before it is sent
+        self._on_batch = on_batch
+        # Called with the number of UnprocessedItems about to be retried
+        self._on_unprocessed = on_unprocessed
+        # Called with each item (or deleted key) once it is written
+        self._on_written = on_written
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def submit(self, item):
+        """Queue an item for writing; raises WriteQueueFull when at capacity"""
+        self._enqueue({"PutRequest": {"Item": item}})
+
+    def submit_delete(self, key):
+        """Queue a delete, written after everything submitted before it"""
+        self._enqueue({"DeleteRequest": {"Key": key}})
+
+    def _enqueue(self, request):
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            raise WriteQueueFull(f"DynamoDB write queue is full ({self.max_queue} items)")
+        self.stats["submitted"] += 1
+
+    async def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Write the batch in progress and whatever is still queued, then stop"""
+        if self._task is not None:
+            self._stopping.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < DYNAMODB_MAX_BATCH_WRITE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+
+    async def _next_item(self, timeout=None):
+        """The next queued request, or None after ``timeout`` seconds or once stopping with an empty queue"""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        if self._stopping.is_set():
+            return None
+        get = asyncio.ensure_future(self._queue.get())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            await asyncio.wait({get, stopping}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            if not get.done():
+                # Not yet taken off the queue, so nothing is lost
+                get.cancel()
+        return get.result() if get.done() and not get.cancelled() else None
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._next_item()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.linger
+            while len(batch) < DYNAMODB_MAX_BATCH_WRITE:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self._queue.empty():
+                    break
+                item = await self._next_item(max(timeout, 0))
+                if item is None:
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    @staticmethod
+    def _target(request):
+        """The item of a put, or the key of a delete"""
+        if "PutRequest" in request:
+            return request["PutRequest"]["Item"]
+        return request["DeleteRequest"]["Key"]
+
+    def _key(self, request):
+        target = self._target(request)
+        return tuple(target[k] for k in self.key_names)
+
+    async def _write(self, batch):
+        # BatchWriteItem rejects two writes to the same key; the last one wins
+        requests = list({self._key(request): request for request in batch}.values())
+        self.stats["batches"] += 1
+        if self._on_batch:
+            self._on_batch(len(requests))
+
+        attempt = 0
+        while requests:
+            call_failed = False
+            try:
+                response = await self._dynamodb.batch_write_item(RequestItems={self.table_name: requests})
+                pending = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The whole call failed (throttled, network, ...): not UnprocessedItems
+                logger.error("DynamoDB batch write failed: %s", e)
+                self.stats["call_errors"] += 1
+                call_failed = True
+                pending = requests
+
+            self.stats["written"] += len(requests) - len(pending)
+            if self._on_written:
+                unwritten = {self._key(request) for request in pending}
+                for request in requests:
+                    if self._key(request) not in unwritten:
+                        self._on_written(self._target(request))
+            if not pending:
+                return
+            if attempt >= self.max_retries:
+                self.stats["dropped"] += len(pending)
+                logger.error("Dropping %s DynamoDB items after %s retries", len(pending), attempt)
+                return
+
+            attempt += 1
+            if not call_failed:
+                self.stats["unprocessed_retries"] += len(pending)
+                if self._on_unprocessed:
+                    self._on_unprocessed(len(pending))
+            # Full jitter keeps retries from many tasks from arriving together
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.retry_backoff * 2 ** attempt)))
+            requests = pending
@@ -0,0 +1,320 @@
+# Background sample-log generator
+#
+# By default emits one random log line every 30 seconds. In multi-worker mode
+# it runs in the serving process only, so a task logs at the same rate however
+# many workers it has.
+#
+# For capacity testing the Loki/EFS/S3 backend it is a load generator: a target
+# rate in lines per second, a number of distinct label values (``stream_id``,
+# promoted to a Loki label with LOKI_LABEL_FIELDS=stream_id), a message size
+# distribution and a burst profile, spread over threads or processes. Each
+# worker schedules lines against the integral of its rate curve rather than
+# sleeping a fixed gap per line, so it catches up after a slow write instead of
+# drifting, and reports achieved against requested lines. Its records go to
+# the sample_logger.generator logger, which log sampling leaves alone.
+#
+#   python -m app.logger_app.log_generator --rate 5000 --duration 30 --workers 4
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+LOG_LEVELS = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL]
+LOG_LEVEL_NAMES = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+SAMPLE_MESSAGES = [
+    "User login succeeded",
+    "User login failed",
+    "File uploaded successfully",
+    "File upload failed",
+    "Database connection established",
+    "Database connection lost",
+    "Cache miss",
+    "Cache hit",
+    "API request received",
+    "API request failed",
+    "Background job started",
+    "Background job completed",
+    "Unexpected exception occurred"
+]
+DEFAULT_RATE = 1 / 30
+BURST_PROFILES = ("steady", "square", "sine")
+# Longest single sleep, so a worker notices the end of its run or a rate change
+MAX_SLEEP = 1.0
+
+logger = logging.getLogger("sample_logger.generator")
+
+
+class BurstProfile:
+    """Rate multiplier over time.
+
+    ``steady`` is always 1. ``square`` is ``factor`` for the first ``duty`` of
+    every ``period`` seconds and 1 otherwise. ``sine`` swings smoothly between
+    1 and ``factor`` once per period.
+    """
+
+    def __init__(self, kind="steady", period=60.0, duty=0.2, factor=5.0):
+        if kind not in BURST_PROFILES:
+            raise ValueError(f"Unknown burst profile: {kind}")
+        self.kind = kind
+        self.period = period
+        self.duty = duty
+        self.factor = factor
+
+    def multiplier(self, elapsed):
+        if self.kind == "square":
+            return self.factor if (elapsed % self.period) < self.duty * self.period else 1.0
+        if self.kind == "sine":
+            return 1 + (self.factor - 1) * (1 - math.cos(2 * math.pi * elapsed / self.period)) / 2
+        return 1.0
+
+    def integral(self, elapsed):
+        """Seconds at rate 1 equivalent to ``elapsed`` seconds of this profile"""
+        if self.kind == "square":
+            periods, offset = divmod(elapsed, self.period)
+            burst = self.duty * self.period
+            per_period = burst * self.factor + (self.period - burst)
+            return periods * per_period + min(offset, burst) * self.factor + max(0.0, offset - burst)
+        if self.kind == "sine":
+            wave = elapsed - self.period / (2 * math.pi) * math.sin(2 * math.pi * elapsed / self.period)
+            return elapsed + (self.factor - 1) / 2 * wave
+        return elapsed
+
+
+# Message size distributions: sample() returns a size in bytes
+
+class FixedSize:
+    def __init__(self, size):
+        self.size = size
+
+    def sample(self):
+        return self.size
+
+
+class UniformSize:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self):
+        return random.randint(self.low, self.high)
+
+
+class LognormalSize:
+    """Mostly near ``median`` with a long tail of large messages"""
+
+    def __init__(self, median, sigma):
+        self.mu = math.log(median)
+        self.sigma = sigma
+
+    def sample(self):
+        return round(random.lognormvariate(self.mu, self.sigma))
+
+
+def size_model(dist, fixed=200, low=100, high=1000, median=200, sigma=0.8):
+    """Message size distribution in bytes; ``None`` keeps the plain sample messages"""
+    if not dist:
+        return None
+    if dist == "fixed":
+        return FixedSize(fixed)
+    if dist == "uniform":
+        return UniformSize(low, high)
+    if dist == "lognormal":
+        return LognormalSize(median, sigma)
+    raise ValueError(f"Unknown message size distribution: {dist}")
+
+
+class LogLoadGenerator:
+    def __init__(self, rate=DEFAULT_RATE, cardinality=1, sizes=None, burst=None, workers=1,
+                 mode="thread", report_interval=0.0):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown log generator mode: {mode}")
+        self.rate = rate
+        self.cardinality = max(1, cardinality)
+        self.sizes = sizes
+        self.burst = burst or BurstProfile()
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.report_interval = report_interval
+
+    @classmethod
+    def from_env(cls):
+        """LOG_GENERATOR_* settings; the defaults reproduce one line every 30 seconds"""
+        def env(key, default):
+            return os.getenv(f"LOG_GENERATOR_{key}", default)
+
+        return cls(
+            rate=float(env("RATE", str(DEFAULT_RATE))),
+            cardinality=int(env("CARDINALITY", "1")),
+            sizes=size_model(
+                env("SIZE_DIST", "").lower(),
+                fixed=int(env("SIZE_BYTES", "200")),
+                low=int(env("SIZE_MIN_BYTES", "100")),
+                high=int(env("SIZE_MAX_BYTES", "1000")),
+                median=int(env("SIZE_MEDIAN_BYTES", "200")),
+                sigma=float(env("SIZE_SIGMA", "0.8"))
+            ),
+            burst=BurstProfile(
+                env("BURST", "steady").lower(),
+                period=float(env("BURST_PERIOD_SECONDS", "60")),
+                duty=float(env("BURST_DUTY", "0.2")),
+                factor=float(env("BURST_FACTOR", "5"))
+            ),
+            workers=int(env("WORKERS", "1")),
+            mode=env("MODE", "thread").lower(),
+            report_interval=float(env("REPORT_SECONDS", "0"))
+        )
+
+    def run(self, duration=None):
+        """Generate for ``duration`` seconds (forever when None) and return a report"""
+        args = [(self, worker_id, duration) for worker_id in range(self.workers)]
+        if self.workers == 1 and self.mode == "thread":
+            results = [_run_worker(*args[0])]
+        elif self.mode == "process":
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+                results = list(pool.map(_run_worker_process, args))
+        else:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="log-generator") as pool:
+                results = list(pool.map(lambda a: _run_worker(*a), args))
+        return _combine(results, self.rate)
+
+    def generate(self, worker_id=0, duration=None, clock=time.perf_counter, sleep=time.sleep):
+        """One worker's share of the rate, on the calling thread"""
+        rate = self.rate / self.workers
+        labels = [f"stream-{n}" for n in range(self.cardinality)]
+        filler = "x" * 65536
+        lines = 0
+        payload_bytes = 0
+        start = clock()
+        last_report = start
+        reported_lines = 0
+        while True:
+            now = clock()
+            elapsed = now - start
+            if duration is not None and elapsed >= duration:
+                break
+            due = int(rate * self.burst.integral(elapsed)) + 1
+            while lines < due:
+                n = random.randrange(len(LOG_LEVELS))
+                message = random.choice(SAMPLE_MESSAGES)
+                if self.sizes is not None:
+                    size = max(0, self.sizes.sample() - len(message) - 1)
+                    message = f"{message} {filler[:size]}"
+                logger.log(LOG_LEVELS[n], "[%s] %s", LOG_LEVEL_NAMES[n], message,
+                           extra={"stream_id": random.choice(labels), "generator_worker": worker_id})
+                lines += 1
+                payload_bytes += len(message)
+            if self.report_interval and now - last_report >= self.report_interval:
+                logger.warning("Log generator worker %s: requested %.1f lines/s, achieved %.1f lines/s",
+                               worker_id, rate * self.burst.multiplier(elapsed),
+                               (lines - reported_lines) / (now - last_report))
+                last_report = now
+                reported_lines = lines
+            # Sleep until the next line is due
+            current_rate = rate * self.burst.multiplier(elapsed)
+            gap = (due - rate * self.burst.integral(elapsed)) / current_rate if current_rate else MAX_SLEEP
+            if duration is not None:
+                gap = min(gap, duration - elapsed)
+            sleep(min(max(gap, 0.0), MAX_SLEEP))
+        elapsed = clock() - start
+        return {
+            "worker": worker_id,
+            "lines": lines,
+            "requested_lines": rate * self.burst.integral(elapsed),
+            "payload_bytes": payload_bytes,
+            "elapsed_seconds": elapsed,
+        }
+
+
+def _run_worker(generator, worker_id, duration):
+    return generator.generate(worker_id, duration)
+
+
+def _run_worker_process(args):
+    from app.logger_app.logging_pipeline import configure_logging
+    handler = configure_logging()
+    result = _run_worker(*args)
+    handler.close()
+    result["dropped"] = handler.dropped
+    if handler.sampler is not None:
+        result["suppressed"] = sum(handler.sampler.suppressed_totals().values())
+    return result
+
+
+def _combine(results, rate):
+    elapsed = max(r["elapsed_seconds"] for r in results)
+    lines = sum(r["lines"] for r in results)
+    requested = sum(r["requested_lines"] for r in results)
+    return {
+        "requested_rate": rate,
+        "achieved_rate": round(lines / elapsed, 1) if elapsed else 0.0,
+        "requested_lines": round(requested),
+        "lines": lines,
+        "achieved_ratio": round(lines / requested, 4) if requested else 0.0,
+        "payload_bytes": sum(r["payload_bytes"] for r in results),
+        "elapsed_seconds": round(elapsed, 3),
+        "dropped": sum(r.get("dropped", 0) for r in results),
+        "suppressed": sum(r.get("suppressed", 0) for r in results),
+        "workers": results,
+    }
+
+
+def random_log():
+    """Run the generator configured by LOG_GENERATOR_* until the process exits"""
+    try:
+        generator = LogLoadGenerator.from_env()
+    except ValueError as e:
+        logger.error("Log generator disabled: %s", e)
+        return
+    generator.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate log lines at a controlled rate")
+    parser.add_argument("--rate", type=float, default=1000.0, help="lines per second, all workers together")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mode", choices=("thread", "process"), default="process")
+    parser.add_argument("--cardinality", type=int, default=1, help="distinct stream_id label values")
+    parser.add_argument("--size-dist", choices=("fixed", "uniform", "lognormal"), default=None)
+    parser.add_argument("--size-bytes", type=int, default=200)
+    parser.add_argument("--size-min-bytes", type=int, default=100)
+    parser.add_argument("--size-max-bytes", type=int, default=1000)
+    parser.add_argument("--size-median-bytes", type=int, default=200)
+    parser.add_argument("--size-sigma", type=float, default=0.8)
+    parser.add_argument("--burst", choices=BURST_PROFILES, default="steady")
+    parser.add_argument("--burst-period", type=float, default=60.0)
+    parser.add_argument("--burst-duty", type=float, default=0.2)
+    parser.add_argument("--burst-factor", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    from app.logger_app.logging_pipeline import configure_logging
+    handler = configure_logging()
+
+    generator = LogLoadGenerator(
+        rate=args.rate,
+        cardinality=args.cardinality,
+        sizes=size_model(args.size_dist, args.size_bytes, args.size_min_bytes, args.size_max_bytes,
+                         args.size_median_bytes, args.size_sigma),
+        burst=BurstProfile(args.burst, args.burst_period, args.burst_duty, args.burst_factor),
+        workers=args.workers,
+        mode=args.mode
+    )
+    report = generator.run(args.duration)
+    handler.close()
+    if args.mode == "thread":
+        report["dropped"] = handler.dropped
+        if handler.sampler is not None:
+            report["suppressed"] = sum(handler.sampler.suppressed_totals().values())
+    # stdout carries the generated lines
+    print(json.dumps(report, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
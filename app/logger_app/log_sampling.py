@@ -0,0 +1,289 @@
+# Log sampling and rate limiting
+#
+# LogSampler is a logging filter on the ring-buffer handler. Each record must
+# take a token from its level's bucket and from its message template's bucket,
+# where the template is the unformatted %-style message, so every "Web
+# endpoint visited at %s from %s" line shares one bucket whatever the
+# arguments. Records without a token are counted instead of queued, and the
+# writer thread periodically turns the counts into "N similar messages
+# suppressed" records. ERROR and CRITICAL records are never sampled, and
+# neither are the load generator's: it exists to produce a given rate.
+#
+# Limits are (rate per second, burst) pairs and can be changed at runtime.
+# By default every template gets 10 per second with a burst of 50, which caps
+# floods such as index()'s "Web endpoint visited" line. The access logger is
+# left out of that default: all its records share one template, so the
+# default would cap the request log itself. LOG_SAMPLING_TEMPLATE_RATE and
+# LOG_SAMPLING_LEVELS (or the admin endpoint) change the limits.
+#
+# uvicorn workers are separate processes, so limits changed through the admin
+# endpoint are published to LOG_SAMPLING_SHARED_FILE (set by serving.py) and
+# every worker reloads that file when it changes.
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ALWAYS_KEPT_LEVEL = logging.ERROR
+# Loggers whose records are never sampled (see log_generator.py)
+UNSAMPLED_LOGGERS = frozenset({"sample_logger.generator"})
+# Loggers the default template limit does not apply to (see middleware.py)
+TEMPLATE_DEFAULT_EXEMPT_LOGGERS = frozenset({"sample_logger.access"})
+DEFAULT_TEMPLATE_RATE = "10:50"
+MAX_TEMPLATES = 1000
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._updated = clock()
+
+    def take(self):
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def parse_limit(value):
+    """"10:50" -> (10.0, 50.0); a bare rate uses it as the burst too"""
+    rate, _, burst = value.partition(":")
+    rate = float(rate)
+    burst = float(burst) if burst else max(rate, 1.0)
+    if rate < 0 or burst < 0:
+        raise ValueError(f"Invalid log sampling limit {value!r}")
+    return rate, burst
+
+
+def parse_level_limits(value):
+    """"DEBUG=0:0,INFO=50:100" -> {"DEBUG": (0.0, 0.0), "INFO": (50.0, 100.0)}"""
+    limits = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            level, limit = pair.split("=", 1)
+            limits[level.strip().upper()] = parse_limit(limit.strip())
+    return limits
+
+
+def _json_limit(value):
+    if value is None:
+        return None
+    if not isinstance(value, dict) or "rate" not in value:
+        raise ValueError(f"Expected {{\"rate\": ..., \"burst\": ...}} or null, got {value!r}")
+    rate = float(value["rate"])
+    burst = float(value.get("burst", max(rate, 1.0)))
+    if rate < 0 or burst < 0:
+        raise ValueError("rate and burst must not be negative")
+    return rate, burst
+
+
+def update_from_json(body):
+    """Keyword arguments for LogSampler.update() from an admin request body.
+
+    {"levels": {"INFO": {"rate": 50, "burst": 100}}, "template_default": {...},
+    "templates": {"<template>": {...}}}; null removes a limit.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    kwargs = {}
+    if "levels" in body:
+        kwargs["level_limits"] = {level: _json_limit(limit) for level, limit in body["levels"].items()}
+    if "template_default" in body:
+        kwargs["template_limit"] = _json_limit(body["template_default"])
+        kwargs["clear_template_limit"] = kwargs["template_limit"] is None
+    if "templates" in body:
+        kwargs["template_limits"] = {t: _json_limit(limit) for t, limit in body["templates"].items()}
+    return kwargs
+
+
+class LogSampler(logging.Filter):
+    def __init__(self, level_limits=None, template_limit=None, template_limits=None,
+                 summary_interval=10.0, max_templates=MAX_TEMPLATES, clock=time.monotonic):
+        super().__init__()
+        self.summary_interval = summary_interval
+        self.max_templates = max_templates
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._level_limits = {}
+        self._level_buckets = {}
+        self._template_limit = None
+        self._template_limits = {}
+        self._template_buckets = OrderedDict()
+        # (level name, logger name, template) -> suppressed since the last summary
+        self._pending = {}
+        self._suppressed_totals = {}
+        self._last_summary = clock()
+        self.update(level_limits or {}, template_limit, template_limits or {})
+
+    @classmethod
+    def from_env(cls):
+        """LOG_SAMPLING_LEVELS, LOG_SAMPLING_TEMPLATE_RATE and LOG_SAMPLING_SUMMARY_SECONDS"""
+        template_rate = os.getenv("LOG_SAMPLING_TEMPLATE_RATE", DEFAULT_TEMPLATE_RATE)
+        return cls(
+            level_limits=parse_level_limits(os.getenv("LOG_SAMPLING_LEVELS", "")),
+            template_limit=parse_limit(template_rate) if template_rate else None,
+            summary_interval=float(os.getenv("LOG_SAMPLING_SUMMARY_SECONDS", "10"))
+        )
+
+    def update(self, level_limits=None, template_limit=None, template_limits=None, clear_template_limit=False):
+        """Replace the given limits; buckets whose limit changed start full again"""
+        with self._lock:
+            if level_limits is not None:
+                for level, limit in level_limits.items():
+                    level = level.upper()
+                    if limit is None:
+                        self._level_limits.pop(level, None)
+                    else:
+                        self._level_limits[level] = limit
+                self._level_buckets = {}
+            if template_limit is not None or clear_template_limit:
+                self._template_limit = template_limit
+                self._template_buckets.clear()
+            if template_limits is not None:
+                for template, limit in template_limits.items():
+                    if limit is None:
+                        self._template_limits.pop(template, None)
+                    else:
+                        self._template_limits[template] = limit
+                self._template_buckets.clear()
+
+    def replace(self, limits):
+        """Set exactly the limits in ``limits`` (as returned by limits()), removing all others"""
+        kwargs = update_from_json(limits)
+        with self._lock:
+            self._level_limits = {}
+            self._level_buckets = {}
+            self._template_limit = None
+            self._template_limits = {}
+            self._template_buckets.clear()
+        self.update(**kwargs)
+
+    def _bucket(self, buckets, key, limit):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(*limit, clock=self._clock)
+        return bucket
+
+    def filter(self, record):
+        if record.levelno >= ALWAYS_KEPT_LEVEL or record.name in UNSAMPLED_LOGGERS:
+            return True
+        template = record.msg if isinstance(record.msg, str) else str(type(record.msg))
+        with self._lock:
+            template_limit = self._template_limits.get(template)
+            if template_limit is None and record.name not in TEMPLATE_DEFAULT_EXEMPT_LOGGERS:
+                template_limit = self._template_limit
+            if template_limit is not None:
+                key = (record.name, template)
+                bucket = self._bucket(self._template_buckets, key, template_limit)
+                self._template_buckets.move_to_end(key)
+                if len(self._template_buckets) > self.max_templates:
+                    self._template_buckets.popitem(last=False)
+                if not bucket.take():
+                    self._suppress(record, template)
+                    return False
+            level_limit = self._level_limits.get(record.levelname)
+            if level_limit is not None and not self._bucket(self._level_buckets, record.levelname, level_limit).take():
+                self._suppress(record, template)
+                return False
+        return True
+
+    def _suppress(self, record, template):
+        # Called with _lock held
+        key = (record.levelname, record.name, template)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._suppressed_totals[record.levelname] = self._suppressed_totals.get(record.levelname, 0) + 1
+
+    def summary_records(self, force=False):
+        """One record per suppressed template once every summary_interval seconds"""
+        now = self._clock()
+        with self._lock:
+            if not self._pending or (not force and now - self._last_summary < self.summary_interval):
+                return []
+            pending = self._pending
+            self._pending = {}
+            self._last_summary = now
+        return [
+            logging.makeLogRecord({
+                "name": name, "levelno": logging.getLevelName(level), "levelname": level,
+                "msg": "%s similar messages suppressed: %s", "args": (count, template),
+                "suppressed_count": count, "template": template
+            })
+            for (level, name, template), count in pending.items()
+        ]
+
+    def suppressed_totals(self):
+        """Suppressed records per level since startup"""
+        with self._lock:
+            return dict(self._suppressed_totals)
+
+    def limits(self):
+        """The current limits in the admin endpoint's JSON form"""
+        snapshot = self.snapshot()
+        return {key: snapshot[key] for key in ("levels", "template_default", "templates")}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "levels": {level: {"rate": r, "burst": b} for level, (r, b) in self._level_limits.items()},
+                "template_default": (
+                    {"rate": self._template_limit[0], "burst": self._template_limit[1]}
+                    if self._template_limit else None
+                ),
+                "templates": {t: {"rate": r, "burst": b} for t, (r, b) in self._template_limits.items()},
+                "always_kept": [logging.getLevelName(ALWAYS_KEPT_LEVEL), "CRITICAL"],
+                "summary_interval_seconds": self.summary_interval,
+                "suppressed_total": dict(self._suppressed_totals),
+            }
+
+
+class SharedLimits:
+    """Limits set through the admin endpoint, shared by the workers through a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._version = None
+
+    @classmethod
+    def from_env(cls):
+        """LOG_SAMPLING_SHARED_FILE, or None when it is unset (a single process)"""
+        path = os.getenv("LOG_SAMPLING_SHARED_FILE")
+        return cls(path) if path else None
+
+    def _stat_version(self):
+        # os.replace() gives the file a new inode on every publish
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def publish(self, sampler):
+        """Write the sampler's limits for the other workers"""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(sampler.limits(), f)
+        os.replace(tmp, self.path)
+        self._version = self._stat_version()
+
+    def sync(self, sampler):
+        """Load the published limits into ``sampler`` if they changed; True when they did"""
+        version = self._stat_version()
+        if version is None or version == self._version:
+            return False
+        try:
+            with open(self.path) as f:
+                limits = json.load(f)
+        except (OSError, ValueError):
+            # Removed since the stat, or not written by publish(); keep the current limits
+            return False
+        sampler.replace(limits)
+        self._version = version
+        return True
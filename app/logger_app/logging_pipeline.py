@@ -0,0 +1,207 @@
+# Non-blocking logging pipeline
+#
+# Request threads only append records to a bounded in-memory ring buffer. A
+# writer thread drains it, formats the records (as compact JSON by default) and
+# writes them to stdout in bulk, so a slow log consumer such as a FireLens
+# sidecar under backpressure stalls the writer thread instead of requests. When
+# the buffer is full the oldest record is overwritten and counted as dropped.
+# The writer hands records to a sink: stdout, or Loki when LOG_SINK=loki. An
+# optional LogSampler (app/logger_app/log_sampling.py) rate-limits records
+# before they are queued.
+#
+# Messages are formatted on the writer thread, from the logger's %-style
+# arguments, so records below the logger level cost nothing and the ones above
+# it are not formatted on the request path.
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+TEXT_DATEFMT = '%Y-%m-%dT%H:%M:%S%z'
+
+# Set by RequestContextMiddleware to {"scope": <ASGI scope>, "start": <perf_counter>}
+request_context = contextvars.ContextVar("request_context", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def request_endpoint(scope):
+    """Route template such as /get-data/{data_id} once routed, else the raw path"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path")
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class StreamSink:
+    """Writes each batch of formatted records to a stream (stdout by default)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, records, lines):
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def tick(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferHandler(logging.Handler):
+    """Queues records for a writer thread that hands them to ``sink`` in batches.
+
+    A sink has write(records, lines), called with each drained batch, tick(),
+    called on every writer wake-up, and close(). A ``sampler`` is installed as
+    a filter and its suppression summaries are written with the next batch.
+    """
+
+    def __init__(self, stream=None, capacity=10000, flush_interval=0.05, sink=None, sampler=None):
+        super().__init__()
+        self.sink = sink or StreamSink(stream)
+        self.sampler = sampler
+        if sampler is not None:
+            self.addFilter(sampler)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._records = deque(maxlen=capacity)
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        # Context only exists on the calling thread, so capture it here
+        context = request_context.get()
+        if context is not None:
+            record.endpoint = request_endpoint(context["scope"])
+        if trace is not None:
+            span_context = trace.get_current_span().get_span_context()
+            if span_context.is_valid:
+                record.trace_id = format(span_context.trace_id, "032x")
+                record.span_id = format(span_context.span_id, "016x")
+        if len(self._records) >= self.capacity:
+            self.dropped += 1
+        self._records.append(record)
+
+    def _drain(self, final=False):
+        with self._write_lock:
+            self._write_records(final)
+
+    def _write_records(self, final=False):
+        records = []
+        while self._records:
+            try:
+                records.append(self._records.popleft())
+            except IndexError:
+                break
+        dropped = self.dropped - self._reported_dropped
+        if dropped:
+            self._reported_dropped += dropped
+            records.append(logging.makeLogRecord({
+                "name": "sample_logger.logging", "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": "Dropped %s log records: the log buffer was full", "args": (dropped,),
+                "dropped_records": dropped
+            }))
+        if self.sampler is not None:
+            records.extend(self.sampler.summary_records(force=final))
+        if records:
+            formatted = []
+            for record in records:
+                try:
+                    formatted.append((record, self.format(record)))
+                except Exception:
+                    self.handleError(record)
+            try:
+                self.sink.write([r for r, _ in formatted], [line for _, line in formatted])
+            except Exception:
+                # Nothing useful to log to; keep the writer alive
+                pass
+        try:
+            self.sink.tick()
+        except Exception:
+            pass
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def flush(self):
+        """Write everything buffered so far (from the caller's thread)"""
+        self._drain()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._wake.set()
+            self._writer.join(timeout=5)
+            self._drain(final=True)
+            self.sink.close()
+        super().close()
+
+
+def configure_logging(level=None, stream=None):
+    """Install the ring-buffer handler on the root logger.
+
+    LOG_FORMAT selects ``json`` (default) or ``text`` output,
+    LOG_BUFFER_SIZE the number of records held before the oldest are dropped
+    and LOG_SINK where they go: ``stdout`` (default) or ``loki``, which pushes
+    them to Loki directly (see app/logger_app/loki_push.py). LOG_SAMPLING=false
+    turns off the rate limits of app/logger_app/log_sampling.py. Returns the
+    handler.
+    """
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, RingBufferHandler)]:
+        root.removeHandler(existing)
+        existing.close()
+    sink = None
+    if os.getenv("LOG_SINK", "stdout").lower() == "loki":
+        from app.logger_app.loki_push import LokiPushSink
+        sink = LokiPushSink.from_env()
+    sampler = None
+    if os.getenv("LOG_SAMPLING", "true").lower() == "true":
+        from app.logger_app.log_sampling import LogSampler
+        sampler = LogSampler.from_env()
+    handler = RingBufferHandler(stream, capacity=int(os.getenv("LOG_BUFFER_SIZE", "10000")), sink=sink,
+                                sampler=sampler)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, TEXT_DATEFMT))
+    else:
+        handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+    return handler
@@ -0,0 +1,263 @@
+# Direct Loki push sink for the logging pipeline
+#
+# Used instead of stdout + the FireLens sidecar when LOG_SINK=loki. Records are
+# grouped into Loki streams by label set (the static labels, the level and any
+# record attributes listed in ``label_fields``) and sent to /loki/api/v1/push
+# as gzip-compressed JSON once a batch reaches ``batch_max_bytes`` or its
+# oldest entry is ``batch_wait`` seconds old.
+#
+# The sink runs on the logging pipeline's single writer thread, so it never
+# sleeps there. A batch that fails with a retryable error (connection errors,
+# 429 and 5xx) is written to a bounded spill directory, and for an exponential,
+# jittered backoff later batches go straight there without waiting on the
+# network. tick() then replays the spilled batches, oldest first, which is how
+# they are retried. When the spill directory is full the oldest files are
+# deleted and counted as dropped. A batch being replayed is renamed to
+# <file>.<pid>.sending; one left behind by a process that died is put back
+# when the next sink starts.
+import gzip
+import json
+import logging
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_LOKI_PUSH_URL = "http://loki.internal.com/loki/api/v1/push"
+
+logger = logging.getLogger("sample_logger.loki")
+
+
+class LokiPushError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def parse_labels(value):
+    """"job=logger-app,env=prod" -> {"job": "logger-app", "env": "prod"}"""
+    labels = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            key, label_value = pair.split("=", 1)
+            labels[key.strip()] = label_value.strip()
+    return labels
+
+
+class LokiPushSink:
+    def __init__(self, url=DEFAULT_LOKI_PUSH_URL, labels=None, label_fields=(), batch_max_bytes=1024 * 1024,
+                 batch_wait=1.0, retry_backoff=0.5, max_backoff=30.0, timeout=5.0,
+                 spill_dir=None, spill_max_bytes=64 * 1024 * 1024, replay_per_flush=4,
+                 clock=time.monotonic):
+        self.url = url
+        self.labels = labels or {"job": "logger-app"}
+        self.label_fields = tuple(label_fields)
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_wait = batch_wait
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.replay_per_flush = replay_per_flush
+        self.stats = {"batches": 0, "entries": 0, "retries": 0, "failed": 0, "spilled": 0,
+                      "replayed": 0, "spill_dropped": 0}
+        self._clock = clock
+        self._streams = {}
+        self._pending_bytes = 0
+        self._oldest = None
+        # While Loki is unavailable, batches are spilled without a push until this time
+        self._retry_at = 0.0
+        self._outage_backoff = retry_backoff
+        # Whether tick() should look for spilled batches; the directory may hold some from a previous run
+        self._spill_pending = bool(spill_dir)
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._recover_claims()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            url=os.getenv("LOKI_PUSH_URL", DEFAULT_LOKI_PUSH_URL),
+            labels=parse_labels(os.getenv("LOKI_LABELS", "job=logger-app")),
+            label_fields=[f.strip() for f in os.getenv("LOKI_LABEL_FIELDS", "").split(",") if f.strip()],
+            batch_max_bytes=int(os.getenv("LOKI_BATCH_MAX_BYTES", str(1024 * 1024))),
+            batch_wait=float(os.getenv("LOKI_BATCH_WAIT_MS", "1000")) / 1000,
+            spill_dir=os.getenv("LOKI_SPILL_DIR", "/tmp/loki-spill") or None,
+            spill_max_bytes=int(float(os.getenv("LOKI_SPILL_MAX_MB", "64")) * 1024 * 1024)
+        )
+
+    # Sink interface used by RingBufferHandler's writer thread
+
+    def write(self, records, lines):
+        for record, line in zip(records, lines):
+            labels = {**self.labels, "level": record.levelname.lower()}
+            for field in self.label_fields:
+                value = getattr(record, field, None)
+                if value is not None:
+                    labels[field] = str(value)
+            key = tuple(sorted(labels.items()))
+            self._streams.setdefault(key, []).append([str(int(record.created * 1e9)), line])
+            self._pending_bytes += len(line) + 32
+            if self._oldest is None:
+                self._oldest = self._clock()
+        if self._pending_bytes >= self.batch_max_bytes:
+            self.flush()
+
+    def tick(self):
+        if self._oldest is not None and self._clock() - self._oldest >= self.batch_wait:
+            self.flush()
+        elif self._spill_pending and self._clock() >= self._retry_at:
+            self._replay_spilled()
+
+    def close(self):
+        self.flush()
+
+    def flush(self):
+        if not self._streams:
+            return
+        payload = {
+            "streams": [
+                {"stream": dict(key), "values": values} for key, values in self._streams.items()
+            ]
+        }
+        entries = sum(len(values) for values in self._streams.values())
+        self._streams = {}
+        self._pending_bytes = 0
+        self._oldest = None
+        body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+        if self._clock() < self._retry_at:
+            self._spill(body)
+            return
+        try:
+            self._push(body)
+        except LokiPushError as e:
+            if not e.retryable:
+                # Loki will never accept it (bad labels, too old, ...); don't spill it
+                self.stats["failed"] += 1
+                logger.error("Dropping log batch: %s", e)
+                return
+            self._spill(body)
+            self._back_off()
+            return
+        self.stats["batches"] += 1
+        self.stats["entries"] += entries
+        self._outage_backoff = self.retry_backoff
+        self._replay_spilled()
+
+    def _back_off(self):
+        """Spill without pushing until the backoff, doubled by every failure in a row, has passed"""
+        self.stats["retries"] += 1
+        # Jitter keeps the workers sharing a Loki from retrying together
+        self._retry_at = self._clock() + random.uniform(0.5, 1.0) * self._outage_backoff
+        self._outage_backoff = min(self._outage_backoff * 2, self.max_backoff)
+
+    # Network
+
+    def _push(self, body):
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            retryable = e.code == 429 or e.code >= 500
+            raise LokiPushError(f"Loki push failed with HTTP {e.code}", retryable=retryable)
+        except OSError as e:
+            raise LokiPushError(f"Loki push failed: {e}")
+
+    # Spill directory
+
+    def _spill_files(self):
+        names = sorted(n for n in os.listdir(self.spill_dir) if n.endswith(".json.gz"))
+        return [os.path.join(self.spill_dir, n) for n in names]
+
+    def _spill(self, body):
+        if not self.spill_dir:
+            self.stats["spill_dropped"] += 1
+            return
+        # Unique across worker processes sharing the directory
+        path = os.path.join(self.spill_dir, f"{time.time_ns():020d}-{os.getpid()}.json.gz")
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+        self.stats["spilled"] += 1
+        self._spill_pending = True
+
+        files = self._spill_files()
+        total = 0
+        sizes = []
+        for name in files:
+            try:
+                size = os.path.getsize(name)
+            except OSError:
+                size = 0
+            sizes.append((name, size))
+            total += size
+        for name, size in sizes:
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(name)
+                self.stats["spill_dropped"] += 1
+            except OSError:
+                pass
+            total -= size
+
+    def _replay_spilled(self):
+        if not self.spill_dir:
+            return
+        files = self._spill_files()
+        if not files:
+            self._spill_pending = False
+            return
+        for path in files[:self.replay_per_flush]:
+            claimed = f"{path}.{os.getpid()}.sending"
+            try:
+                # Only one worker process can claim a given file
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, "rb") as f:
+                body = f.read()
+            try:
+                self._push(body)
+            except LokiPushError as e:
+                if e.retryable:
+                    os.rename(claimed, path)
+                    self._back_off()
+                    return
+                logger.error("Dropping spilled log batch: %s", e)
+            os.remove(claimed)
+            self.stats["replayed"] += 1
+        self._outage_backoff = self.retry_backoff
+
+    def _recover_claims(self):
+        """Put back batches claimed for replay by a process that died while sending them"""
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith(".sending"):
+                continue
+            original = name[:-len(".sending")]
+            if not original.endswith(".json.gz"):
+                # <file>.<pid>.sending; older sinks claimed files without the pid
+                original, _, pid = original.rpartition(".")
+                if not pid.isdigit() or _process_alive(int(pid)):
+                    continue
+            try:
+                os.rename(os.path.join(self.spill_dir, name), os.path.join(self.spill_dir, original))
+            except OSError:
+                pass
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
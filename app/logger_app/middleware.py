@@ -0,0 +1,102 @@
+# ASGI middleware for the logger app
+#
+# Plain ASGI classes rather than Starlette's BaseHTTPMiddleware, which runs the
+# rest of the app in a separate task and copies every response body.
+#
+# Request count and duration are recorded here for every endpoint, timed with
+# the monotonic perf_counter clock. The OTel SDK validates and hashes the
+# attributes of every measurement, so RequestMetrics keeps one attribute set
+# per (method, route, status) and counts requests in a plain integer that is
+# exported through an observable counter; only the duration is a per-request
+# SDK call.
+import logging
+import time
+
+from app.logger_app.logging_pipeline import request_context
+
+logger = logging.getLogger("sample_logger.access")
+
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+def request_elapsed():
+    """Seconds since the middleware received the current request"""
+    context = request_context.get()
+    return time.perf_counter() - context["start"] if context is not None else 0.0
+
+
+class RequestMetrics:
+    """Request counts per interned attribute set, plus the duration histogram"""
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram
+        # (method, endpoint, status) -> [attributes, count]
+        self._entries = {}
+
+    def _entry(self, method, scope, status):
+        route = scope.get("route")
+        # Unmatched paths share one value so scanners can't inflate cardinality
+        endpoint = getattr(route, "path", None) or "unmatched"
+        # and so do unknown methods
+        method = method if method in HTTP_METHODS else "_OTHER"
+        key = (method, endpoint, status)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [{
+                "method": method,
+                "endpoint": endpoint,
+                "status": status,
+            }, 0]
+        return entry
+
+    def record(self, scope, status, duration):
+        entry = self._entry(scope["method"], scope, status)
+        entry[1] += 1
+        if self.histogram is not None:
+            self.histogram.record(duration, entry[0])
+
+    def counts(self):
+        """[(attributes, requests so far)] for the http_requests_total callback"""
+        return [(attributes, count) for attributes, count in list(self._entries.values())]
+
+
+class RequestContextMiddleware:
+    """Publishes the request to the logging pipeline, writes one access record per
+    request and records the request metrics when ``metrics`` is given"""
+
+    def __init__(self, app, access_log=True, metrics=None):
+        self.app = app
+        self.access_log = access_log
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = request_context.set({"scope": scope, "start": start})
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.record(scope, status, duration)
+            if self.access_log:
+                logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status,
+                    extra={
+                        "method": scope["method"],
+                        "status": status,
+                        "latency_ms": round(duration * 1000, 2),
+                    }
+                )
+            request_context.reset(token)
@@ -0,0 +1,32 @@
+# Opaque continuation tokens for paginated DynamoDB queries
+import base64
+import json
+
+
+class InvalidPageToken(ValueError):
+    pass
+
+
+def encode_page_token(last_evaluated_key):
+    """Turn a LastEvaluatedKey into a URL-safe token, or None at the last page"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(",", ":"), sort_keys=True, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_token(token, key_names=None):
+    """Turn a token from encode_page_token back into an ExclusiveStartKey
+
+    With ``key_names`` the key must have exactly those string attributes.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidPageToken(f"Invalid page token: {e}")
+    if not isinstance(key, dict):
+        raise InvalidPageToken("Invalid page token")
+    if key_names is not None and (set(key) != set(key_names) or not all(isinstance(v, str) for v in key.values())):
+        raise InvalidPageToken("Invalid page token")
+    return key
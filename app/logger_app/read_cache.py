@@ -0,0 +1,108 @@
+# In-process read-through cache
+#
+# Size-bounded with LRU eviction. Entries live for ``ttl`` seconds, but never
+# past the item's own expiry attribute (epoch seconds, as used by DynamoDB TTL).
+# Misses (a loader returning None) are cached for the shorter ``negative_ttl``.
+# Concurrent misses for the same key share a single load. If the caller doing
+# the load is cancelled, the others are not: one of them loads it instead.
+import asyncio
+import time
+from collections import OrderedDict
+
+# Result given to the waiters of a load whose caller was cancelled
+_RETRY = object()
+
+
+class ReadThroughCache:
+    def __init__(self, max_entries=10000, ttl=30.0, negative_ttl=2.0, ttl_attribute="ttl",
+                 on_hit=None, on_miss=None, on_evict=None, clock=time.monotonic, wall_clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.ttl_attribute = ttl_attribute
+        self._on_hit = on_hit
+        self._on_miss = on_miss
+        # Called with the eviction reason: "size" or "expired"
+        self._on_evict = on_evict
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._entries = OrderedDict()
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                if self._on_hit:
+                    self._on_hit()
+                return value
+            del self._entries[key]
+            if self._on_evict:
+                self._on_evict("expired")
+
+        if self._on_miss:
+            self._on_miss()
+        while True:
+            pending = self._loading.get(key)
+            if pending is None:
+                return await self._load(key, loader)
+            value = await asyncio.shield(pending)
+            if value is not _RETRY:
+                return value
+
+    async def _load(self, key, loader):
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Only this caller gave up; waiters retry the load themselves
+            if self._loading.get(key) is future:
+                del self._loading[key]
+            future.set_result(_RETRY)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            # Skip the store if the key was invalidated while loading
+            if self._loading.get(key) is future:
+                self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._loading.clear()
+
+    def _store(self, key, value):
+        if value is None:
+            ttl = self.negative_ttl
+        else:
+            ttl = self.ttl
+            expires = value.get(self.ttl_attribute) if isinstance(value, dict) else None
+            if expires is not None:
+                ttl = min(ttl, float(expires) - self._wall_clock())
+        if ttl <= 0:
+            return
+        self._entries[key] = (value, self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            if self._on_evict:
+                self._on_evict("size")
@@ -0,0 +1,90 @@
+# Runtime profile: event loop, HTTP parser, JSON library and socket settings
+#
+# LOGGER_RUNTIME_PROFILE=default runs on the stdlib: asyncio, h11 and json,
+# with uvicorn's default keep-alive and backlog. "performance" asks for uvloop
+# and httptools, serializes responses and SQS message bodies with orjson, and
+# raises the keep-alive timeout above the ALB's 60 second idle timeout, so the
+# ALB never reuses a connection the app has just closed (a 502).
+#
+# Each extra is used only when it is installed (requirements-performance.txt);
+# otherwise that part falls back to asyncio, h11 or json and the profile says
+# so in describe().
+import importlib.util
+import json
+import os
+
+from fastapi.responses import JSONResponse
+
+PROFILES = ("default", "performance")
+# Above the ALB idle timeout (60 seconds)
+PERFORMANCE_KEEP_ALIVE_SECONDS = 65
+PERFORMANCE_BACKLOG = 4096
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+class OrjsonResponse(JSONResponse):
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RuntimeProfile:
+    def __init__(self, name="default", keep_alive=None, backlog=None):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown runtime profile: {name}")
+        self.name = name
+        performance = name == "performance"
+        if performance:
+            self.loop = "uvloop" if installed("uvloop") else "asyncio"
+            self.http = "httptools" if installed("httptools") else "h11"
+            self.json_library = "orjson" if orjson is not None else "json"
+        else:
+            self.loop = "asyncio"
+            self.http = "h11"
+            self.json_library = "json"
+        self.keep_alive = keep_alive or (PERFORMANCE_KEEP_ALIVE_SECONDS if performance else 5)
+        self.backlog = backlog or (PERFORMANCE_BACKLOG if performance else 2048)
+
+    @classmethod
+    def from_env(cls):
+        """LOGGER_RUNTIME_PROFILE, LOGGER_KEEP_ALIVE_SECONDS and LOGGER_BACKLOG"""
+        return cls(
+            os.getenv("LOGGER_RUNTIME_PROFILE", "default").strip().lower(),
+            keep_alive=int(os.getenv("LOGGER_KEEP_ALIVE_SECONDS", "0")),
+            backlog=int(os.getenv("LOGGER_BACKLOG", "0"))
+        )
+
+    @property
+    def response_class(self):
+        return OrjsonResponse if self.json_library == "orjson" else JSONResponse
+
+    def dumps(self, obj):
+        """JSON text for an SQS message body"""
+        if self.json_library == "orjson":
+            return orjson.dumps(obj).decode()
+        return json.dumps(obj)
+
+    def server_options(self):
+        """Keyword arguments for uvicorn.run()"""
+        return {
+            "loop": self.loop,
+            "http": self.http,
+            "timeout_keep_alive": self.keep_alive,
+            "backlog": self.backlog,
+        }
+
+    def describe(self):
+        missing = [m for m, used in (("uvloop", self.loop == "uvloop"), ("httptools", self.http == "httptools"),
+                                     ("orjson", self.json_library == "orjson")) if not used]
+        summary = (f"{self.name} (loop={self.loop}, http={self.http}, json={self.json_library}, "
+                   f"keep_alive={self.keep_alive}s, backlog={self.backlog})")
+        if self.name == "performance" and missing:
+            summary += f"; not installed: {', '.join(missing)}"
+        return summary
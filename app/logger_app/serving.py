@@ -0,0 +1,120 @@
+# Production serving mode
+#
+#   python -m app.logger_app.serving
+#
+# Runs uvicorn with LOGGER_WORKERS worker processes, or one per CPU of the
+# container's cgroup quota when it is unset or "auto". uvicorn spawns the
+# workers, so each one imports app.sample_logger itself and gets its own
+# OpenTelemetry providers, exporters, AWS clients and queues. Only the log
+# sampling limits set through the admin endpoint are shared, through the
+# LOG_SAMPLING_SHARED_FILE named here (see log_sampling.py). This process only
+# supervises the workers and runs the sample log generator, so it is not
+# multiplied by the worker count.
+#
+# On SIGTERM each worker stops accepting connections, waits up to
+# LOGGER_GRACEFUL_SHUTDOWN_SECONDS for in-flight requests and then runs the app
+# lifespan shutdown, which flushes SQS, DynamoDB and telemetry batches.
+#
+# LOGGER_RUNTIME_PROFILE selects the event loop, HTTP parser and socket
+# settings (see runtime_profile.py).
+import logging
+import math
+import os
+import tempfile
+import threading
+
+import uvicorn
+
+from app.logger_app.log_generator import random_log
+from app.logger_app.logging_pipeline import configure_logging
+from app.logger_app.runtime_profile import RuntimeProfile
+
+APP_FACTORY = "app.sample_logger:create_app"
+
+logger = logging.getLogger("sample_logger")
+
+
+def cgroup_cpu_limit(root="/sys/fs/cgroup"):
+    """CPUs allowed by the cgroup quota, or None when there is no quota"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(cgroup_root="/sys/fs/cgroup"):
+    """LOGGER_WORKERS, or the cgroup CPU limit rounded up, capped at the visible CPUs"""
+    configured = os.getenv("LOGGER_WORKERS", "auto").strip().lower()
+    if configured != "auto":
+        return max(1, int(configured))
+    cpus = available_cpus()
+    limit = cgroup_cpu_limit(cgroup_root)
+    if limit is None:
+        return cpus
+    # A fractional CPU is still worth a worker: they spend much of their time waiting on I/O
+    return max(1, min(cpus, math.ceil(limit)))
+
+
+def shared_limits_file():
+    """LOG_SAMPLING_SHARED_FILE for the workers to inherit, starting without published limits"""
+    path = os.environ.setdefault(
+        "LOG_SAMPLING_SHARED_FILE", os.path.join(tempfile.gettempdir(), "logger-app-log-sampling.json")
+    )
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return path
+
+
+def main():
+    workers = worker_count()
+    shared_limits_file()
+    port = int(os.getenv("PORT", "8080"))
+    profile = RuntimeProfile.from_env()
+    logger.info("Starting logger app with %s worker(s) on port %s, runtime profile %s",
+                workers, port, profile.describe())
+
+    t = threading.Thread(target=random_log, daemon=True)
+    t.start()
+    uvicorn.run(
+        APP_FACTORY,
+        factory=True,
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        # uvicorn's loggers propagate to the logging pipeline; access records
+        # come from RequestContextMiddleware
+        log_config=None,
+        access_log=False,
+        timeout_graceful_shutdown=int(os.getenv("LOGGER_GRACEFUL_SHUTDOWN_SECONDS", "20")),
+        **profile.server_options()
+    )
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
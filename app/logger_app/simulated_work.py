@@ -0,0 +1,153 @@
+# Simulated work for the demo endpoints
+#
+# A latency model decides how long a request "works"; SimulatedWork then either
+# waits without blocking the event loop or burns that much CPU in a worker
+# process. Everything is driven by environment variables:
+#
+#   SIMULATED_WORK_MODE         sleep (default), cpu or off
+#   SIMULATED_WORK_DIST         fixed, uniform, lognormal or trace
+#   SIMULATED_WORK_FIXED_MS     fixed latency
+#   SIMULATED_WORK_MIN_MS       uniform lower bound
+#   SIMULATED_WORK_MAX_MS       uniform upper bound
+#   SIMULATED_WORK_MEDIAN_MS    lognormal median
+#   SIMULATED_WORK_SIGMA        lognormal shape
+#   SIMULATED_WORK_TRACE_FILE   one latency in milliseconds per line, replayed in order
+#   SIMULATED_WORK_CPU_WORKERS  size of the process pool used by cpu mode
+#
+# Any of these can be set per endpoint, e.g. SIMULATED_WORK_INDEX_DIST.
+# Endpoints keep their built-in distribution when no DIST is configured.
+import asyncio
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+MODES = ("sleep", "cpu", "off")
+
+
+class FixedLatency:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def sample(self):
+        return self.seconds
+
+
+class UniformLatency:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self):
+        return random.uniform(self.low, self.high)
+
+
+class LognormalLatency:
+    def __init__(self, median, sigma):
+        self.mu = math.log(median)
+        self.sigma = sigma
+
+    def sample(self):
+        return random.lognormvariate(self.mu, self.sigma)
+
+
+class TraceLatency:
+    """Replays recorded latencies in order, wrapping around at the end"""
+
+    def __init__(self, samples):
+        if not samples:
+            raise ValueError("Latency trace is empty")
+        self._samples = itertools.cycle(samples)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            lines = [line.split(",")[0].strip() for line in f]
+        return cls([float(line) / 1000 for line in lines if line and not line.startswith("#")])
+
+    def sample(self):
+        with self._lock:
+            return next(self._samples)
+
+
+def latency_model_from_env(endpoint, default):
+    """Build the latency model for an endpoint, or return its default"""
+    def env(key, fallback=None):
+        return os.getenv(f"SIMULATED_WORK_{endpoint.upper()}_{key}",
+                         os.getenv(f"SIMULATED_WORK_{key}", fallback))
+
+    dist = (env("DIST") or "").lower()
+    if not dist:
+        return default
+    if dist == "fixed":
+        return FixedLatency(float(env("FIXED_MS", 100)) / 1000)
+    if dist == "uniform":
+        return UniformLatency(float(env("MIN_MS", 100)) / 1000, float(env("MAX_MS", 500)) / 1000)
+    if dist == "lognormal":
+        return LognormalLatency(float(env("MEDIAN_MS", 200)) / 1000, float(env("SIGMA", 0.5)))
+    if dist == "trace":
+        trace_file = env("TRACE_FILE")
+        if not trace_file:
+            raise ValueError("SIMULATED_WORK_TRACE_FILE is required for the trace distribution")
+        return TraceLatency.from_file(trace_file)
+    raise ValueError(f"Unknown simulated work distribution: {dist}")
+
+
+def burn_cpu(seconds):
+    """Spin for the given wall time; runs in a worker process"""
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            workers = int(os.getenv("SIMULATED_WORK_CPU_WORKERS", os.cpu_count() or 1))
+            _cpu_pool = ProcessPoolExecutor(max_workers=max(1, workers))
+        return _cpu_pool
+
+
+def shutdown_cpu_pool():
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is not None:
+            _cpu_pool.shutdown(wait=False, cancel_futures=True)
+            _cpu_pool = None
+
+
+class SimulatedWork:
+    def __init__(self, model, mode="sleep"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown simulated work mode: {mode}")
+        self.model = model
+        self.mode = mode
+
+    @classmethod
+    def from_env(cls, endpoint, default):
+        mode = os.getenv(f"SIMULATED_WORK_{endpoint.upper()}_MODE",
+                         os.getenv("SIMULATED_WORK_MODE", "sleep")).lower()
+        return cls(latency_model_from_env(endpoint, default), mode)
+
+    async def run(self):
+        """Perform one unit of work and return its duration in seconds"""
+        if self.mode == "off":
+            return 0.0
+        seconds = max(0.0, self.model.sample())
+        if self.mode == "sleep":
+            await asyncio.sleep(seconds)
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(_get_cpu_pool(), burn_cpu, seconds)
+        return seconds
@@ -0,0 +1,254 @@
+# Background SQS consumer
+#
+# N long-poll loops feed a bounded work queue drained by M workers. Processed
+# messages are acknowledged in groups of up to 10 with DeleteMessageBatch, and a
+# heartbeat extends the visibility timeout of messages that are still being
+# worked on so they are not redelivered mid-processing. Results are kept in a
+# bounded in-memory buffer that the HTTP layer reads from. A handler raises
+# UnprocessableMessage for a message that can never succeed, such as a body
+# that is not JSON; it is acknowledged at once instead of being redelivered
+# until the redrive policy moves it to the DLQ. On stop() the ack
+# loop is not cancelled: it sends the receipts it holds and any still queued.
+import asyncio
+import json
+import logging
+from collections import deque
+
+SQS_MAX_BATCH_ENTRIES = 10
+
+logger = logging.getLogger("sample_logger")
+
+
+class UnprocessableMessage(Exception):
+    pass
+
+
+async def parse_json_body(message):
+    """Default message handler: the decoded JSON body goes into the buffer"""
+    try:
+        return json.loads(message["Body"])
+    except ValueError as e:
+        raise UnprocessableMessage(f"Body is not JSON: {e}")
+
+
+class SqsConsumer:
+    def __init__(self, async_sqs, queue_url, handler=parse_json_body, pollers=2, workers=8,
+                 buffer_size=1000, wait_time=20, visibility_timeout=30, ack_linger=0.05,
+                 on_receive=None):
+        self.queue_url = queue_url
+        self.pollers = pollers
+        self.workers = workers
+        self.wait_time = wait_time
+        self.visibility_timeout = visibility_timeout
+        self.ack_linger = ack_linger
+        self.buffer = deque(maxlen=buffer_size)
+        self.stats = {
+            "received": 0,
+            "processed": 0,
+            "failed": 0,
+            "discarded": 0,
+            "deleted": 0,
+            "delete_failed": 0,
+            "visibility_extended": 0,
+            "poll_errors": 0,
+        }
+        self._sqs = async_sqs
+        self._handler = handler
+        self._on_receive = on_receive
+        self._work = None
+        self._acks = None
+        self._acks_closing = None
+        self._ack_task = None
+        self._in_flight = {}
+        self._tasks = []
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def snapshot(self):
+        """Current counters plus queue depths, for the HTTP layer"""
+        return {
+            **self.stats,
+            "buffered": len(self.buffer),
+            "in_flight": len(self._in_flight),
+            "queued": self._work.qsize() if self._work else 0,
+        }
+
+    def drain(self, limit):
+        """Pop up to ``limit`` processed results from the buffer"""
+        items = []
+        while self.buffer and len(items) < limit:
+            items.append(self.buffer.popleft())
+        return items
+
+    async def start(self):
+        if self._tasks:
+            return
+        # Keep the local backlog small so received messages are not left
+        # waiting while their visibility timeout runs down
+        self._work = asyncio.Queue(maxsize=self.workers)
+        self._acks = asyncio.Queue()
+        self._acks_closing = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._poll()) for _ in range(self.pollers)]
+        self._tasks += [asyncio.create_task(self._work_loop()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+        self._ack_task = asyncio.create_task(self._ack_loop())
+        self._tasks.append(self._ack_task)
+        logger.info("SQS consumer started: %s pollers, %s workers", self.pollers, self.workers)
+
+    async def stop(self):
+        """Stop polling and acknowledge everything already processed.
+
+        Messages that were received but not processed become visible again once
+        their visibility timeout expires.
+        """
+        tasks, self._tasks = self._tasks, []
+        ack_task, self._ack_task = self._ack_task, None
+        for task in tasks:
+            if task is not ack_task:
+                task.cancel()
+        await asyncio.gather(*(t for t in tasks if t is not ack_task), return_exceptions=True)
+        # Nothing new to acknowledge now; the ack loop empties the queue and returns
+        if ack_task is not None:
+            self._acks_closing.set()
+            await asyncio.gather(ack_task, return_exceptions=True)
+        receipts = []
+        while self._acks is not None and not self._acks.empty():
+            receipts.append(self._acks.get_nowait())
+        for i in range(0, len(receipts), SQS_MAX_BATCH_ENTRIES):
+            await self._delete_batch(receipts[i:i + SQS_MAX_BATCH_ENTRIES])
+
+    async def _poll(self):
+        backoff = 1.0
+        while True:
+            try:
+                response = await self._sqs.receive_message(
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=SQS_MAX_BATCH_ENTRIES,
+                    WaitTimeSeconds=self.wait_time,
+                    VisibilityTimeout=self.visibility_timeout,
+                    MessageAttributeNames=["All"]
+                )
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.error("SQS receive failed: %s", e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            messages = response.get("Messages", [])
+            if messages:
+                self.stats["received"] += len(messages)
+                if self._on_receive:
+                    self._on_receive(len(messages))
+            for message in messages:
+                await self._work.put(message)
+
+    async def _work_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await self._work.get()
+            receipt = message["ReceiptHandle"]
+            self._in_flight[receipt] = loop.time()
+            try:
+                result = await self._handler(message)
+            except asyncio.CancelledError:
+                raise
+            except UnprocessableMessage as e:
+                # Redelivering it would only fail again
+                self.stats["discarded"] += 1
+                logger.error("Discarding SQS message %s: %s", message.get('MessageId'), e)
+                self._acks.put_nowait(receipt)
+            except Exception as e:
+                # Not acknowledged: SQS redelivers it and the redrive policy
+                # moves it to the DLQ after repeated failures
+                self.stats["failed"] += 1
+                logger.error("SQS message %s failed: %s", message.get('MessageId'), e)
+            else:
+                self.stats["processed"] += 1
+                if result is not None:
+                    self.buffer.append(result)
+                self._acks.put_nowait(receipt)
+            finally:
+                self._in_flight.pop(receipt, None)
+
+    async def _next_receipt(self, timeout=None):
+        """The next receipt to acknowledge, or None after ``timeout`` seconds or once closing with none left"""
+        if not self._acks.empty():
+            return self._acks.get_nowait()
+        if self._acks_closing.is_set():
+            return None
+        get = asyncio.ensure_future(self._acks.get())
+        closing = asyncio.ensure_future(self._acks_closing.wait())
+        try:
+            await asyncio.wait({get, closing}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closing.cancel()
+            if not get.done():
+                # Not yet taken off the queue, so nothing is lost
+                get.cancel()
+        return get.result() if get.done() and not get.cancelled() else None
+
+    async def _ack_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            receipt = await self._next_receipt()
+            if receipt is None:
+                return
+            receipts = [receipt]
+            deadline = loop.time() + self.ack_linger
+            while len(receipts) < SQS_MAX_BATCH_ENTRIES:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self._acks.empty():
+                    break
+                receipt = await self._next_receipt(max(timeout, 0))
+                if receipt is None:
+                    break
+                receipts.append(receipt)
+            await self._delete_batch(receipts)
+
+    async def _delete_batch(self, receipts):
+        entries = [{"Id": str(i), "ReceiptHandle": r} for i, r in enumerate(receipts)]
+        try:
+            response = await self._sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["delete_failed"] += len(entries)
+            logger.error("SQS delete batch failed: %s", e)
+            return
+        self.stats["deleted"] += len(response.get("Successful", []))
+        self.stats["delete_failed"] += len(response.get("Failed", []))
+
+    async def _heartbeat_loop(self):
+        loop = asyncio.get_running_loop()
+        interval = max(self.visibility_timeout / 3, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            # Reset the timeout of anything in flight for more than half of it
+            cutoff = loop.time() - self.visibility_timeout / 2
+            slow = [r for r, started in list(self._in_flight.items()) if started <= cutoff]
+            for i in range(0, len(slow), SQS_MAX_BATCH_ENTRIES):
+                chunk = slow[i:i + SQS_MAX_BATCH_ENTRIES]
+                entries = [
+                    {"Id": str(n), "ReceiptHandle": r, "VisibilityTimeout": self.visibility_timeout}
+                    for n, r in enumerate(chunk)
+                ]
+                try:
+                    response = await self._sqs.change_message_visibility_batch(
+                        QueueUrl=self.queue_url, Entries=entries
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("SQS visibility extension failed: %s", e)
+                    continue
+                self.stats["visibility_extended"] += len(response.get("Successful", []))
+                now = loop.time()
+                for r in chunk:
+                    if r in self._in_flight:
+                        self._in_flight[r] = now
@@ -0,0 +1,163 @@
+# Batching SQS producer
+#
+# Messages from concurrent requests are collected and sent with SendMessageBatch.
+# A batch is flushed when it reaches 10 entries, when adding a message would push
+# it past the 256 KiB request limit, or when the linger timer fires. Each caller
+# awaits the MessageId of its own entry. Failed entries, and whole calls that
+# fail with a throttling, server or network error, are retried with jittered
+# exponential backoff; a single message over 256 KiB is rejected by send().
+import asyncio
+import random
+
+from botocore.exceptions import ClientError
+
+SQS_MAX_BATCH_ENTRIES = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
+SQS_MAX_MESSAGE_BYTES = 256 * 1024
+# SendMessageBatch errors worth another try; the rest (AccessDenied, bad parameters, ...) never succeed
+RETRYABLE_ERROR_CODES = frozenset({
+    "Throttling", "ThrottlingException", "RequestThrottled", "KmsThrottled",
+    "ServiceUnavailable", "InternalError", "InternalFailure",
+})
+
+
+def message_size(body, attributes=None):
+    """Bytes a message counts against the SendMessageBatch payload limit"""
+    size = len(body.encode("utf-8"))
+    for name, value in (attributes or {}).items():
+        size += len(name.encode("utf-8")) + len(value.get("DataType", "").encode("utf-8"))
+        size += len(value.get("StringValue", "").encode("utf-8")) + len(value.get("BinaryValue", b""))
+    return size
+
+
+def retryable_call_error(error):
+    """Whether a failed call is worth repeating: throttling and server errors, or no response at all"""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return True
+
+
+class _Entry:
+    __slots__ = ("body", "attributes", "size", "future")
+
+    def __init__(self, body, attributes, size, future):
+        self.body = body
+        self.attributes = attributes
+        self.size = size
+        self.future = future
+
+
+class SqsBatchProducer:
+    def __init__(self, async_sqs, queue_url, linger=0.005, max_retries=3,
+                 retry_backoff=0.05, max_batch_bytes=SQS_MAX_BATCH_BYTES, on_batch=None):
+        self.queue_url = queue_url
+        self.linger = linger
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_batch_bytes = max_batch_bytes
+        self._sqs = async_sqs
+        # Called after every SendMessageBatch call with (batch_size, sent, failed)
+        self._on_batch = on_batch
+        self._pending = []
+        self._pending_bytes = 0
+        self._linger_task = None
+        self._inflight = set()
+
+    async def send(self, body, attributes=None):
+        """Queue a message for the next batch and return its SQS MessageId"""
+        size = message_size(body, attributes)
+        if size > SQS_MAX_MESSAGE_BYTES:
+            raise ValueError(f"SQS message is {size} bytes, over the {SQS_MAX_MESSAGE_BYTES} byte limit")
+        entry = _Entry(body, attributes, size, asyncio.get_running_loop().create_future())
+        if self._pending and self._pending_bytes + entry.size > self.max_batch_bytes:
+            self._flush_pending()
+        self._pending.append(entry)
+        self._pending_bytes += entry.size
+        if len(self._pending) >= SQS_MAX_BATCH_ENTRIES:
+            self._flush_pending()
+        elif self._linger_task is None:
+            self._linger_task = asyncio.create_task(self._linger())
+        return await entry.future
+
+    async def close(self):
+        """Flush anything still pending and wait for in-flight batches"""
+        if self._pending:
+            self._flush_pending()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _linger(self):
+        await asyncio.sleep(self.linger)
+        self._linger_task = None
+        if self._pending:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        batch = self._pending
+        self._pending = []
+        self._pending_bytes = 0
+        if self._linger_task is not None and self._linger_task is not asyncio.current_task():
+            self._linger_task.cancel()
+        self._linger_task = None
+        task = asyncio.create_task(self._send_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send_batch(self, batch):
+        attempt = 0
+        while batch:
+            entries = []
+            for i, entry in enumerate(batch):
+                request_entry = {"Id": str(i), "MessageBody": entry.body}
+                if entry.attributes:
+                    request_entry["MessageAttributes"] = entry.attributes
+                entries.append(request_entry)
+
+            try:
+                response = await self._sqs.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            except Exception as e:
+                if attempt < self.max_retries and retryable_call_error(e):
+                    if self._on_batch:
+                        self._on_batch(len(batch), 0, 0)
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                # The whole call failed for good; every caller sees the same error
+                for entry in batch:
+                    if not entry.future.done():
+                        entry.future.set_exception(e)
+                if self._on_batch:
+                    self._on_batch(len(batch), 0, len(batch))
+                return
+
+            successful = response.get("Successful", [])
+            for result in successful:
+                future = batch[int(result["Id"])].future
+                if not future.done():
+                    future.set_result(result["MessageId"])
+
+            retry = []
+            failed = 0
+            for result in response.get("Failed", []):
+                entry = batch[int(result["Id"])]
+                # Sender faults (bad attributes, oversized body) will never succeed
+                if result.get("SenderFault") or attempt >= self.max_retries:
+                    failed += 1
+                    if not entry.future.done():
+                        entry.future.set_exception(ClientError(
+                            {"Error": {"Code": result.get("Code", "Unknown"), "Message": result.get("Message", "")}},
+                            "SendMessageBatch"
+                        ))
+                else:
+                    retry.append(entry)
+
+            if self._on_batch:
+                self._on_batch(len(batch), len(successful), failed)
+
+            batch = retry
+            if batch:
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+
+    def _backoff(self, attempt):
+        return self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
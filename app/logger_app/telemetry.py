@@ -0,0 +1,330 @@
+# Non-blocking OpenTelemetry startup
+#
+# The ADOT collector sidecar may still be starting when the app begins serving.
+# CollectorProbe checks in a background thread, with exponential backoff, until
+# the collector's OTLP port accepts TCP connections. Until then the gated
+# exporters keep spans and metric exports in bounded buffers instead of sending
+# them to a port nobody listens on; the buffers are flushed once the probe
+# succeeds.
+#
+# Exporters are only imported once the collector answers. Instrumentations are
+# listed in OTEL_INSTRUMENTATIONS and imported only when they are enabled.
+#
+# Head sampling can be set per route with OTEL_TRACES_SAMPLER_ROUTES (see
+# RouteRatioSampler); errors and slow traces are kept by the tail sampler in
+# the ADOT collector that EcsStack configures.
+import importlib
+import logging
+import os
+import socket
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, Sampler, TraceIdRatioBased
+
+DEFAULT_OTLP_PORT = 4317
+
+# name -> (module, instrumentor class)
+INSTRUMENTATIONS = {
+    "fastapi": ("opentelemetry.instrumentation.fastapi", "FastAPIInstrumentor"),
+    "botocore": ("opentelemetry.instrumentation.botocore", "BotocoreInstrumentor"),
+    "boto3sqs": ("opentelemetry.instrumentation.boto3sqs", "Boto3SQSInstrumentor"),
+}
+DEFAULT_INSTRUMENTATIONS = "fastapi,botocore,boto3sqs"
+
+logger = logging.getLogger("sample_logger")
+
+
+def collector_address(endpoint):
+    """(host, port) of an OTLP endpoint such as http://localhost:4317"""
+    parsed = urlparse(endpoint if "//" in endpoint else f"//{endpoint}")
+    return parsed.hostname or "localhost", parsed.port or DEFAULT_OTLP_PORT
+
+
+def enabled_instrumentations():
+    """Names from OTEL_INSTRUMENTATIONS (comma separated, "none" disables all)"""
+    value = os.getenv("OTEL_INSTRUMENTATIONS", DEFAULT_INSTRUMENTATIONS)
+    return [name.strip() for name in value.split(",") if name.strip() and name.strip() != "none"]
+
+
+def instrument(app, names=None):
+    """Import and apply the enabled instrumentations; returns the ones applied"""
+    applied = []
+    for name in enabled_instrumentations() if names is None else names:
+        if name not in INSTRUMENTATIONS:
+            logger.warning("Unknown instrumentation %s", name)
+            continue
+        module_name, class_name = INSTRUMENTATIONS[name]
+        try:
+            instrumentor = getattr(importlib.import_module(module_name), class_name)
+            if name == "fastapi":
+                instrumentor.instrument_app(app)
+            else:
+                instrumentor().instrument()
+        except Exception as e:
+            logger.error("Failed to enable %s instrumentation: %s", name, e)
+            continue
+        applied.append(name)
+    logger.info("OpenTelemetry instrumentation enabled: %s", ', '.join(applied) or 'none')
+    return applied
+
+
+def otlp_exporter(kind, class_name, endpoint):
+    """Import and create a gRPC OTLP exporter, e.g. ("trace_exporter", "OTLPSpanExporter")"""
+    module = importlib.import_module(f"opentelemetry.exporter.otlp.proto.grpc.{kind}")
+    return getattr(module, class_name)(endpoint=endpoint)
+
+
+def parse_route_ratios(value):
+    """"/health=0,/workflow=1" -> {"/health": 0.0, "/workflow": 1.0}"""
+    ratios = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            route, ratio = pair.rsplit("=", 1)
+            ratio = float(ratio)
+            if not 0.0 <= ratio <= 1.0:
+                raise ValueError(f"Sampling ratio for {route.strip()} must be between 0 and 1")
+            ratios[route.strip()] = ratio
+    return ratios
+
+
+class RouteRatioSampler(Sampler):
+    """Trace-id ratio sampling with a ratio per route.
+
+    The route is the ``http.route`` attribute the FastAPI instrumentation puts
+    on the server span (the template, e.g. /get-data/{data_id}), or the path in
+    a "GET /path" span name. Root spans without a route use ``default_ratio``.
+    Wrap it in ParentBased so child spans follow their root.
+    """
+
+    def __init__(self, route_ratios, default_ratio=1.0):
+        self.default = TraceIdRatioBased(default_ratio)
+        self.routes = {route: TraceIdRatioBased(ratio) for route, ratio in route_ratios.items()}
+
+    def _sampler(self, name, attributes):
+        route = attributes.get("http.route") if attributes else None
+        if route is None and " " in name:
+            route = name.split(" ", 1)[1]
+        return self.routes.get(route, self.default)
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                      trace_state=None):
+        return self._sampler(name, attributes).should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+
+    def get_description(self):
+        routes = ",".join(f"{route}={sampler.rate}" for route, sampler in self.routes.items())
+        return f"RouteRatioSampler{{default={self.default.rate},{routes}}}"
+
+
+def sampler_from_env():
+    """ParentBased(RouteRatioSampler) when OTEL_TRACES_SAMPLER_ROUTES is set.
+
+    The default ratio is OTEL_TRACES_SAMPLER_ARG (1.0 when unset). Returns None
+    otherwise, leaving the SDK to apply OTEL_TRACES_SAMPLER.
+    """
+    routes = os.getenv("OTEL_TRACES_SAMPLER_ROUTES", "")
+    if not routes.strip():
+        return None
+    default_ratio = float(os.getenv("OTEL_TRACES_SAMPLER_ARG", "1.0"))
+    return ParentBased(RouteRatioSampler(parse_route_ratios(routes), default_ratio))
+
+
+class CollectorProbe:
+    def __init__(self, endpoint, initial_backoff=0.25, max_backoff=30.0, connect_timeout=1.0):
+        self.address = collector_address(endpoint)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.attempts = 0
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._listeners = []
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def add_listener(self, callback):
+        """Call ``callback()`` from the probe thread once the collector answers"""
+        self._listeners.append(callback)
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="otel-collector-probe", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _connect(self):
+        self.attempts += 1
+        try:
+            with socket.create_connection(self.address, timeout=self.connect_timeout):
+                return True
+        except OSError:
+            return False
+
+    def _run(self):
+        backoff = self.initial_backoff
+        while not self._stopped.is_set():
+            if self._connect():
+                logger.info("OTLP collector reachable at %s:%s after %s attempts",
+                            self.address[0], self.address[1], self.attempts)
+                self._ready.set()
+                for callback in self._listeners:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error("Telemetry flush after collector start failed: %s", e)
+                return
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+class _GatedBuffer:
+    """Bounded buffer shared by the gated exporters; the oldest entries are dropped"""
+
+    def __init__(self, probe, max_buffered):
+        self.probe = probe
+        self.dropped = 0
+        self._pending = deque()
+        self._max_buffered = max_buffered
+        self._lock = threading.Lock()
+
+    def hold(self, entries):
+        """Buffer ``entries`` while the collector is down; False once it is ready"""
+        with self._lock:
+            if self.probe.ready:
+                return False
+            self._pending.extend(entries)
+            while len(self._pending) > self._max_buffered:
+                self._pending.popleft()
+                self.dropped += 1
+            return True
+
+    def take(self):
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+            return pending
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class GatedSpanExporter(SpanExporter):
+    """Holds spans until the collector answers.
+
+    ``exporter_factory`` is called once the collector is reachable, so the OTLP
+    exporter (and gRPC) is never imported on the startup path.
+    """
+
+    def __init__(self, exporter_factory, probe, max_buffered=10000):
+        self._factory = exporter_factory
+        self._exporter = None
+        self._buffer = _GatedBuffer(probe, max_buffered)
+        self._export_lock = threading.Lock()
+        probe.add_listener(self.flush_buffered)
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    @property
+    def dropped(self):
+        return self._buffer.dropped
+
+    def _delegate(self):
+        # Called with _export_lock held
+        if self._exporter is None:
+            self._exporter = self._factory()
+        return self._exporter
+
+    def export(self, spans):
+        if self._buffer.hold(spans):
+            return SpanExportResult.SUCCESS
+        with self._export_lock:
+            pending = self._buffer.take()
+            return self._delegate().export(pending + list(spans))
+
+    def flush_buffered(self):
+        with self._export_lock:
+            pending = self._buffer.take()
+            exporter = self._delegate()
+            if pending:
+                exporter.export(pending)
+
+    def force_flush(self, timeout_millis=30000):
+        if not self._buffer.probe.ready:
+            return True
+        self.flush_buffered()
+        return self._exporter.force_flush(timeout_millis)
+
+    def shutdown(self):
+        if self._buffer.probe.ready:
+            self.flush_buffered()
+        if self._exporter is not None:
+            self._exporter.shutdown()
+
+
+class GatedMetricExporter(MetricExporter):
+    """Holds metric exports until the collector answers.
+
+    Exports use the SDK's default cumulative temporality, so the newest export
+    already carries the totals and the buffer only needs to be a few exports
+    deep. Like GatedSpanExporter, the real exporter is created by
+    ``exporter_factory`` once the collector is reachable.
+    """
+
+    def __init__(self, exporter_factory, probe, max_buffered=8):
+        super().__init__()
+        self._factory = exporter_factory
+        self._exporter = None
+        self._buffer = _GatedBuffer(probe, max_buffered)
+        self._export_lock = threading.Lock()
+        probe.add_listener(self.flush_buffered)
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    def _delegate(self):
+        # Called with _export_lock held
+        if self._exporter is None:
+            self._exporter = self._factory()
+        return self._exporter
+
+    def export(self, metrics_data, timeout_millis=10000, **kwargs):
+        if self._buffer.hold([metrics_data]):
+            return MetricExportResult.SUCCESS
+        with self._export_lock:
+            exporter = self._delegate()
+            for pending in self._buffer.take():
+                exporter.export(pending, timeout_millis=timeout_millis)
+            return exporter.export(metrics_data, timeout_millis=timeout_millis)
+
+    def flush_buffered(self):
+        with self._export_lock:
+            exporter = self._delegate()
+            for pending in self._buffer.take():
+                exporter.export(pending)
+
+    def force_flush(self, timeout_millis=10000):
+        if self._exporter is None:
+            return True
+        return self._exporter.force_flush(timeout_millis=timeout_millis)
+
+    def shutdown(self, timeout_millis=30000, **kwargs):
+        if self._buffer.probe.ready:
+            self.flush_buffered()
+        if self._exporter is not None:
+            self._exporter.shutdown(timeout_millis=timeout_millis)
@@ -0,0 +1,56 @@
+# Tracing facade for the request handlers
+#
+# Handlers open their spans through Tracing.span() whether or not telemetry is
+# enabled. Without a tracer it returns one shared no-op context manager and
+# span, so the disabled path is an attribute lookup and two empty method calls
+# with no allocation. With a tracer it is start_as_current_span() with the
+# attributes passed up front. Attributes that are costly to build should be
+# guarded with span.is_recording(), which is also False for unsampled spans.
+
+
+class _NoOpSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def is_recording(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoOpSpan()
+
+
+class Tracing:
+    def __init__(self, tracer=None):
+        self.tracer = tracer
+
+    @property
+    def enabled(self):
+        return self.tracer is not None
+
+    def span(self, name, attributes=None):
+        """Context manager yielding the span (NOOP_SPAN when tracing is off)"""
+        if self.tracer is None:
+            return NOOP_SPAN
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+
+def mark_error(span, error):
+    """Error attributes and an ERROR status on a failed span; the collector's
+    tail sampling keeps traces by that status"""
+    span.set_attribute("error", True)
+    span.set_attribute("error.message", str(error))
+    if span.is_recording():
+        # Only real spans record, so opentelemetry is installed
+        from opentelemetry.trace import Status, StatusCode
+        span.set_status(Status(StatusCode.ERROR, str(error)))
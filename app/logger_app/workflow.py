@@ -0,0 +1,136 @@
+# Declarative workflow engine
+#
+# A workflow is a list of WorkflowStep objects. Steps whose dependencies have
+# completed run concurrently, each under its own timeout and span. If any step
+# fails, no further steps are started, completed steps that define a
+# compensate() are rolled back in reverse order, and the result reports which
+# steps completed, failed, were compensated or never ran.
+#
+# A step that times out may still take effect (its AWS call keeps running in
+# an executor thread), so it is not cancelled: it is compensated too, once its
+# run() has finished or after another ``timeout`` seconds.
+import asyncio
+import logging
+
+from app.logger_app.tracing import Tracing, mark_error
+
+logger = logging.getLogger("sample_logger")
+
+
+class WorkflowStep:
+    def __init__(self, name, run, timeout=5.0, compensate=None, depends_on=()):
+        self.name = name
+        # async run(context) -> result, stored in WorkflowResult.results
+        self.run = run
+        self.timeout = timeout
+        # async compensate(context) undoes run() after a later failure
+        self.compensate = compensate
+        self.depends_on = tuple(depends_on)
+
+
+class StepTimeout(Exception):
+    def __init__(self, message, work=None):
+        super().__init__(message)
+        # The step's run(), left running
+        self.work = work
+
+
+class WorkflowResult:
+    def __init__(self):
+        self.results = {}
+        self.completed = []
+        self.failed = {}
+        self.compensated = []
+        self.skipped = []
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def summary(self):
+        return {
+            "steps_completed": self.completed,
+            "steps_failed": {name: str(error) for name, error in self.failed.items()},
+            "steps_compensated": self.compensated,
+            "steps_skipped": self.skipped,
+        }
+
+
+async def _run_step(step, context, tracing):
+    with tracing.span(f"workflow.{step.name}") as span:
+        work = asyncio.ensure_future(step.run(context))
+        try:
+            return await asyncio.wait_for(asyncio.shield(work), step.timeout)
+        except asyncio.TimeoutError:
+            error = StepTimeout(f"Step {step.name} timed out after {step.timeout}s", work)
+            # Its outcome only matters to _compensate(); don't report it as unretrieved
+            work.add_done_callback(lambda w: w.cancelled() or w.exception())
+            mark_error(span, error)
+            raise error
+        except asyncio.CancelledError:
+            work.cancel()
+            raise
+        except Exception as e:
+            mark_error(span, e)
+            raise
+
+
+async def run_workflow(steps, context, tracer=None):
+    """Run the steps and return a WorkflowResult; never raises for step errors"""
+    tracing = Tracing(tracer)
+    result = WorkflowResult()
+    pending = list(steps)
+    while pending and result.ok:
+        ready = [s for s in pending if all(d in result.completed for d in s.depends_on)]
+        if not ready:
+            break
+        outcomes = await asyncio.gather(
+            *(_run_step(step, context, tracing) for step in ready),
+            return_exceptions=True
+        )
+        for step, outcome in zip(ready, outcomes):
+            pending.remove(step)
+            if isinstance(outcome, BaseException):
+                result.failed[step.name] = outcome
+            else:
+                result.completed.append(step.name)
+                result.results[step.name] = outcome
+
+    result.skipped = [step.name for step in pending]
+    if not result.ok:
+        await _compensate(steps, result, context, tracing)
+    return result
+
+
+async def _settle(work, timeout):
+    """Wait up to ``timeout`` seconds for a timed-out step's run() to finish"""
+    try:
+        await asyncio.wait_for(asyncio.shield(work), timeout)
+    except asyncio.TimeoutError:
+        work.cancel()
+        return False
+    except Exception:
+        pass
+    return True
+
+
+async def _compensate(steps, result, context, tracing):
+    by_name = {step.name: step for step in steps}
+    timed_out = [name for name, error in result.failed.items() if isinstance(error, StepTimeout)]
+    for name in timed_out + list(reversed(result.completed)):
+        step = by_name[name]
+        error = result.failed.get(name)
+        if step.compensate is None:
+            if error is not None:
+                error.work.cancel()
+            continue
+        # Compensating while the step is still running would be overtaken by it
+        if error is not None and not await _settle(error.work, step.timeout):
+            logger.warning("Workflow step %s still running; compensating anyway", name)
+        with tracing.span(f"workflow.{name}.compensate"):
+            try:
+                await asyncio.wait_for(step.compensate(context), step.timeout)
+            except Exception as e:
+                logger.error("Compensation for workflow step %s failed: %s", name, e)
+            else:
+                result.compensated.append(name)
@@ -5,6 +5,8 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from app.modules.loki_deployment import LOKI_PUSH_PATHS, loki_deployment_mode
+
 class AlbStack(Stack):
     def __init__(self, scope: Construct, id: str, vpc, alb_sg, internal_alb_sg, **kwargs):
         super().__init__(scope, id, **kwargs)
@@ -17,15 +19,38 @@ class AlbStack(Stack):
             security_group=internal_alb_sg,
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
         )
-        # Target groups
-        self.loki_tg = elbv2.ApplicationTargetGroup(
-            self, "LokiTargetGroup",
-            vpc=vpc,
-            port=3100,
-            protocol=elbv2.ApplicationProtocol.HTTP,
-            target_type=elbv2.TargetType.IP,
-            health_check=elbv2.HealthCheck(path="/ready", port="3100")
-        )
+        # Target groups. Loki has one in monolithic mode, and one each for
+        # pushes (write) and queries (read) in simple scalable mode
+        self.loki_mode = loki_deployment_mode(self.node)
+        self.loki_tg = None
+        self.loki_write_tg = None
+        self.loki_read_tg = None
+        if self.loki_mode == "monolithic":
+            self.loki_tg = elbv2.ApplicationTargetGroup(
+                self, "LokiTargetGroup",
+                vpc=vpc,
+                port=3100,
+                protocol=elbv2.ApplicationProtocol.HTTP,
+                target_type=elbv2.TargetType.IP,
+                health_check=elbv2.HealthCheck(path="/ready", port="3100")
+            )
+        else:
+            self.loki_write_tg = elbv2.ApplicationTargetGroup(
+                self, "LokiWriteTargetGroup",
+                vpc=vpc,
+                port=3100,
+                protocol=elbv2.ApplicationProtocol.HTTP,
+                target_type=elbv2.TargetType.IP,
+                health_check=elbv2.HealthCheck(path="/ready", port="3100")
+            )
+            self.loki_read_tg = elbv2.ApplicationTargetGroup(
+                self, "LokiReadTargetGroup",
+                vpc=vpc,
+                port=3100,
+                protocol=elbv2.ApplicationProtocol.HTTP,
+                target_type=elbv2.TargetType.IP,
+                health_check=elbv2.HealthCheck(path="/ready", port="3100")
+            )
         self.grafana_tg = elbv2.ApplicationTargetGroup(
             self, "GrafanaTargetGroup",
             vpc=vpc,
@@ -42,12 +67,29 @@ class AlbStack(Stack):
             protocol=elbv2.ApplicationProtocol.HTTP,
             default_action=elbv2.ListenerAction.forward([self.grafana_tg])
         )
-        self.internal_listener.add_action(
-            "LokiHostRule",
-            priority=1,
-            conditions=[elbv2.ListenerCondition.host_headers(["loki.internal.com"])],
-            action=elbv2.ListenerAction.forward([self.loki_tg])
-        )
+        if self.loki_mode == "monolithic":
+            self.internal_listener.add_action(
+                "LokiHostRule",
+                priority=1,
+                conditions=[elbv2.ListenerCondition.host_headers(["loki.internal.com"])],
+                action=elbv2.ListenerAction.forward([self.loki_tg])
+            )
+        else:
+            self.internal_listener.add_action(
+                "LokiPushRule",
+                priority=1,
+                conditions=[
+                    elbv2.ListenerCondition.host_headers(["loki.internal.com"]),
+                    elbv2.ListenerCondition.path_patterns(LOKI_PUSH_PATHS)
+                ],
+                action=elbv2.ListenerAction.forward([self.loki_write_tg])
+            )
+            self.internal_listener.add_action(
+                "LokiQueryRule",
+                priority=3,
+                conditions=[elbv2.ListenerCondition.host_headers(["loki.internal.com"])],
+                action=elbv2.ListenerAction.forward([self.loki_read_tg])
+            )
         self.internal_listener.add_action(
             "GrafanaHostRule",
             priority=2,
@@ -11,17 +11,43 @@ from aws_cdk import (
     aws_logs as logs,
     aws_iam as iam,
     aws_ssm as ssm,
+    CfnOutput,
+    Duration,
+    Fn,
     Stack
 )
         
 from constructs import Construct
 
+from app.modules.loki_deployment import (
+    MEMCACHED_PORT,
+    add_memcached_container,
+    add_scalable_loki,
+    fargate_memory_with_memcached,
+    loki_cache_backend,
+    loki_deployment_mode,
+    loki_environment,
+    memcached_mb
+)
+from app.modules.service_scaling import add_service_scaling, scaling_settings
+from app.modules.storage_profiles import storage_profile
+
 class EcsStack(Stack):
-    def __init__(self, scope: Construct, id: str, vpc, ecs_sg, efs, efs_grafana_ap, efs_loki_ap, s3_bucket, ecr_grafana, ecr_loki, ecr_logger, alb_stack, amp_workspace, sqs_stack, dynamodb_stack, **kwargs):
+    def __init__(self, scope: Construct, id: str, vpc, ecs_sg, efs, grafana_efs, efs_grafana_ap, efs_loki_ap, s3_bucket, ecr_grafana, ecr_loki, ecr_logger, alb_stack, amp_workspace, sqs_stack, dynamodb_stack, **kwargs):
         super().__init__(scope, id, **kwargs)
 
+        # Service autoscaling (see service_scaling.py for the context keys)
+        logger_scaling = scaling_settings(self.node, "logger")
+        loki_scaling = scaling_settings(self.node, "loki")
+        grafana_scaling = scaling_settings(self.node, "grafana")
+        # SQS backlog scaling divides by RunningTaskCount from Container Insights
+        backlog_scaling = logger_scaling["max_tasks"] > logger_scaling["min_tasks"] and logger_scaling["sqs_backlog_per_task"]
+
         # ECS Cluster
-        self.cluster = ecs.Cluster(self, "AppCluster", vpc=vpc,  cluster_name="ecsstack-cluster")
+        self.cluster = ecs.Cluster(
+            self, "AppCluster", vpc=vpc,  cluster_name="ecsstack-cluster",
+            container_insights_v2=ecs.ContainerInsights.ENABLED if backlog_scaling else None
+        )
 
         # Task Role and Execution Role
         task_role = iam.Role(self, "TaskRole",
@@ -50,6 +76,7 @@ class EcsStack(Stack):
             ],
             resources=[
                 efs.file_system_arn,
+                grafana_efs.file_system_arn,
                 efs_grafana_ap.access_point_arn,
                 efs_loki_ap.access_point_arn,
             ]
@@ -64,6 +91,7 @@ class EcsStack(Stack):
             ],
             resources=[
                 efs.file_system_arn,
+                grafana_efs.file_system_arn,
                 efs_grafana_ap.access_point_arn,
                 efs_loki_ap.access_point_arn,
             ]
@@ -119,7 +147,7 @@ class EcsStack(Stack):
         grafana_task_def.add_volume(
             name="grafana-efs",
             efs_volume_configuration=ecs.EfsVolumeConfiguration(
-                file_system_id=efs.file_system_id,
+                file_system_id=grafana_efs.file_system_id,
                 authorization_config=ecs.AuthorizationConfig(
                     access_point_id=efs_grafana_ap.access_point_id,
                     iam="ENABLED"
@@ -149,42 +177,6 @@ class EcsStack(Stack):
             )
         )
 
-        # Loki Task Definition
-        loki_task_def = ecs.FargateTaskDefinition(
-            self, "LokiTaskDef",
-            memory_limit_mib=2048,
-            cpu=1024,
-            task_role=task_role,
-            execution_role=execution_role
-        )
-        # EFS volume for Loki
-        loki_task_def.add_volume(
-            name="loki-efs",
-            efs_volume_configuration=ecs.EfsVolumeConfiguration(
-                file_system_id=efs.file_system_id,
-                authorization_config=ecs.AuthorizationConfig(
-                    access_point_id=efs_loki_ap.access_point_id,
-                    iam="ENABLED"
-                ),
-                transit_encryption="ENABLED"
-            )
-        )
-        loki_container = loki_task_def.add_container(
-            "LokiContainer",
-            image=ecs.ContainerImage.from_ecr_repository(ecr_loki),
-            logging=ecs.LogDriver.aws_logs(stream_prefix="loki")
-        )
-        loki_container.add_port_mappings(
-            ecs.PortMapping(container_port=3100, protocol=ecs.Protocol.TCP)
-        )
-        loki_container.add_mount_points(
-            ecs.MountPoint(
-                container_path="/var/loki",
-                source_volume="loki-efs",
-                read_only=False
-            )
-        )
-
         # Grafana Service
         grafana_service = ecs.FargateService(
             self, "GrafanaService",
@@ -192,23 +184,153 @@ class EcsStack(Stack):
             cluster=self.cluster,
             task_definition=grafana_task_def,
             security_groups=[ecs_sg],
-            desired_count=1,
+            desired_count=grafana_scaling["min_tasks"],
             assign_public_ip=True,
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC)
         )
-        # Loki Service
-        loki_service = ecs.FargateService(
-            self, "LokiService",
-            service_name="loki-service",
-            cluster=self.cluster,
-            task_definition=loki_task_def,
-            security_groups=[ecs_sg],
-            desired_count=1,
-            assign_public_ip=False,
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
-        )
 
-        # Logger App Task Definition with FireLens Sidecar
+        # Loki: one task with everything on EFS, or write/read/backend services
+        # (cdk deploy -c loki_deployment_mode=simple-scalable, see loki_deployment.py)
+        loki_mode = loki_deployment_mode(self.node)
+        storage = storage_profile(self.node)
+        loki_service = None
+        self.loki_services = {}
+        if loki_mode == "monolithic":
+            # Caches in Loki itself, or in a memcached sidecar (-c loki_cache=memcached)
+            loki_memcached = loki_cache_backend(self.node) == "memcached"
+            loki_memory = 2048
+            if loki_memcached:
+                loki_memory = fargate_memory_with_memcached(loki_memory, memcached_mb(self.node))
+            # /var/loki on EFS, or on the task's own storage with S3 as the
+            # durable store (-c storage_profile=ephemeral, see storage_profiles.py)
+            loki_on_efs = storage["loki_storage"] == "efs"
+            # Loki Task Definition
+            loki_task_def = ecs.FargateTaskDefinition(
+                self, "LokiTaskDef",
+                memory_limit_mib=loki_memory,
+                cpu=1024,
+                ephemeral_storage_gib=None if loki_on_efs else storage["loki_ephemeral_storage_gib"],
+                task_role=task_role,
+                execution_role=execution_role
+            )
+            loki_env = loki_environment(self.node, f"localhost:{MEMCACHED_PORT}" if loki_memcached else None)
+            if not loki_on_efs:
+                # The WAL goes with the task, so open chunks go to S3 before it stops
+                loki_env["LOKI_FLUSH_ON_SHUTDOWN"] = "true"
+            loki_container = loki_task_def.add_container(
+                "LokiContainer",
+                image=ecs.ContainerImage.from_ecr_repository(ecr_loki),
+                environment=loki_env,
+                logging=ecs.LogDriver.aws_logs(stream_prefix="loki"),
+                stop_timeout=None if loki_on_efs else Duration.seconds(120)
+            )
+            if loki_memcached:
+                add_memcached_container(loki_task_def, memcached_mb(self.node))
+            loki_container.add_port_mappings(
+                ecs.PortMapping(container_port=3100, protocol=ecs.Protocol.TCP)
+            )
+            if loki_on_efs:
+                # EFS volume for Loki
+                loki_task_def.add_volume(
+                    name="loki-efs",
+                    efs_volume_configuration=ecs.EfsVolumeConfiguration(
+                        file_system_id=efs.file_system_id,
+                        authorization_config=ecs.AuthorizationConfig(
+                            access_point_id=efs_loki_ap.access_point_id,
+                            iam="ENABLED"
+                        ),
+                        transit_encryption="ENABLED"
+                    )
+                )
+                loki_container.add_mount_points(
+                    ecs.MountPoint(
+                        container_path="/var/loki",
+                        source_volume="loki-efs",
+                        read_only=False
+                    )
+                )
+            # Loki Service
+            loki_service = ecs.FargateService(
+                self, "LokiService",
+                service_name="loki-service",
+                cluster=self.cluster,
+                task_definition=loki_task_def,
+                security_groups=[ecs_sg],
+                desired_count=loki_scaling["min_tasks"],
+                assign_public_ip=False,
+                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
+            )
+        else:
+            self.loki_services = add_scalable_loki(
+                self, self.cluster, ecs_sg, ecs.ContainerImage.from_ecr_repository(ecr_loki),
+                task_role, execution_role,
+                {"write": alb_stack.loki_write_tg, "read": alb_stack.loki_read_tg}
+            )
+
+        # The services running the Loki image, for the deploy workflow to roll out
+        loki_image_services = [loki_service] if loki_service else [
+            service for target, service in self.loki_services.items() if target != "memcached"
+        ]
+        CfnOutput(self, "LokiServiceNames", value=Fn.join(",", [s.service_name for s in loki_image_services]),
+                  description="Comma-separated ECS services that run the Loki image")
+
+        # How the logger app ships its logs to Loki (cdk deploy -c logger_log_shipping=direct):
+        # "firelens" (default) writes to stdout for a Fluent Bit sidecar; "direct"
+        # pushes batches from the app itself and deploys the task without the sidecar
+        log_shipping = self.node.try_get_context("logger_log_shipping") or "firelens"
+        if log_shipping not in ("firelens", "direct"):
+            raise ValueError(f"logger_log_shipping must be 'firelens' or 'direct', got {log_shipping!r}")
+        loki_push_url = "http://loki.internal.com/loki/api/v1/push"
+
+        # Trace sampling. Head: per-route ratios applied by the app
+        # (-c logger_trace_route_ratios="/health=0,/=0.1"). Tail: the ADOT
+        # collector keeps traces with an error or slower than
+        # logger_trace_slow_ms, plus logger_trace_baseline_percent of the rest
+        # (-c logger_tail_sampling=off exports everything the app sampled)
+        trace_route_ratios = self.node.try_get_context("logger_trace_route_ratios") or "/health=0"
+        tail_sampling = (self.node.try_get_context("logger_tail_sampling") or "on") != "off"
+        trace_slow_ms = int(self.node.try_get_context("logger_trace_slow_ms") or 1000)
+        trace_baseline_percent = float(self.node.try_get_context("logger_trace_baseline_percent") or 0)
+
+        # Event loop, HTTP parser and JSON library of the logger app; the image
+        # installs the "performance" extras unless built without them
+        # (-c logger_runtime_profile=default)
+        runtime_profile = self.node.try_get_context("logger_runtime_profile") or "performance"
+        if runtime_profile not in ("default", "performance"):
+            raise ValueError(f"logger_runtime_profile must be 'default' or 'performance', got {runtime_profile!r}")
+
+        logger_environment = {
+            "LOGGER_RUNTIME_PROFILE": runtime_profile,
+            "OTEL_SERVICE_NAME": "logger-app",
+            "OTEL_EXPORTER_OTLP_ENDPOINT": "http://localhost:4317",
+            "OTEL_TRACES_SAMPLER": "parentbased_always_on",
+            "OTEL_TRACES_SAMPLER_ROUTES": trace_route_ratios,
+            # "AWS_XRAY_DAEMON_ADDRESS": "aws-otel-collector:2000",
+            "AWS_REGION": "us-east-1",
+            "SQS_MESSAGE_QUEUE_URL": sqs_stack.message_queue.queue_url,
+            "DYNAMODB_APP_TABLE": dynamodb_stack.app_table.table_name,
+        }
+        if log_shipping == "direct":
+            logger_environment.update({
+                "LOG_SINK": "loki",
+                "LOKI_PUSH_URL": loki_push_url,
+                "LOKI_LABELS": "job=logger-app,source=direct,ecs_cluster=ecsstack-cluster",
+            })
+            # Only startup errors reach stdout in this mode
+            logger_logging = ecs.LogDrivers.aws_logs(stream_prefix="logger-app")
+        else:
+            logger_logging = ecs.LogDrivers.firelens(
+                options={
+                    "Name": "grafana-loki",
+                    "Url": loki_push_url,
+                    # "Labels": "job=firelens-logs,environment=production",
+                    "LabelKeys": "container_name,ecs_task_definition,source,ecs_cluster",
+                    "LineFormat": "key_value",
+                    "RemoveKeys": "container_id,ecs_task_arn"
+                }
+            )
+
+        # Logger App Task Definition (with a FireLens sidecar in firelens mode)
         logger_task_def = ecs.FargateTaskDefinition(
             self, "LoggerTaskDef",
             memory_limit_mib=1024,
@@ -223,26 +345,8 @@ class EcsStack(Stack):
             "LoggerAppContainer",
             image=ecs.ContainerImage.from_ecr_repository(ecr_logger),
             essential=True,
-            logging=ecs.LogDrivers.firelens(
-                options={
-                    "Name": "grafana-loki",
-                    "Url": "http://loki.internal.com/loki/api/v1/push",
-                    # "Labels": "job=firelens-logs,environment=production",
-                    "LabelKeys": "container_name,ecs_task_definition,source,ecs_cluster",
-                    "LineFormat": "key_value",
-                    "RemoveKeys": "container_id,ecs_task_arn"
-                }
-            ),
-            environment={
-                "OTEL_SERVICE_NAME": "logger-app",
-                "OTEL_EXPORTER_OTLP_ENDPOINT": "http://localhost:4317",
-                "OTEL_TRACES_SAMPLER": "parentbased_always_on",
-                # "AWS_XRAY_DAEMON_ADDRESS": "aws-otel-collector:2000",
-                "AWS_REGION": "us-east-1",
-                "SQS_MESSAGE_QUEUE_URL": sqs_stack.message_queue.queue_url,
-                "DYNAMODB_APP_TABLE": dynamodb_stack.app_table.table_name,
-                
-            }
+            logging=logger_logging,
+            environment=logger_environment
         )
 
         logger_container.add_port_mappings(
@@ -250,15 +354,16 @@ class EcsStack(Stack):
         )
 
         # FireLens log router (sidecar)
-        logger_task_def.add_firelens_log_router(
-            "LogRouter",
-            image=ecs.ContainerImage.from_registry("grafana/fluent-bit-plugin-loki:latest"),
-            essential=True,
-            firelens_config=ecs.FirelensConfig(
-                type=ecs.FirelensLogRouterType.FLUENTBIT, 
-                ),
-            logging=ecs.LogDrivers.aws_logs(stream_prefix="firelens")
-        )
+        if log_shipping == "firelens":
+            logger_task_def.add_firelens_log_router(
+                "LogRouter",
+                image=ecs.ContainerImage.from_registry("grafana/fluent-bit-plugin-loki:latest"),
+                essential=True,
+                firelens_config=ecs.FirelensConfig(
+                    type=ecs.FirelensLogRouterType.FLUENTBIT, 
+                    ),
+                logging=ecs.LogDrivers.aws_logs(stream_prefix="firelens")
+            )
         
         
         logger_service = ecs.FargateService(
@@ -267,11 +372,36 @@ class EcsStack(Stack):
             cluster=self.cluster,
             task_definition=logger_task_def,
             security_groups=[ecs_sg],
-            desired_count=1,
+            desired_count=logger_scaling["min_tasks"],
             assign_public_ip=True,
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
         )
     
+        if tail_sampling:
+            trace_processors = "[tail_sampling, batch]"
+            baseline_policy = f"""
+      - name: baseline
+        type: probabilistic
+        probabilistic:
+          sampling_percentage: {trace_baseline_percent}""" if trace_baseline_percent > 0 else ""
+            tail_sampling_config = f"""
+  tail_sampling:
+    decision_wait: 10s
+    num_traces: 50000
+    expected_new_traces_per_sec: 100
+    policies:
+      - name: errors
+        type: status_code
+        status_code:
+          status_codes: [ERROR]
+      - name: slow
+        type: latency
+        latency:
+          threshold_ms: {trace_slow_ms}{baseline_policy}"""
+        else:
+            trace_processors = "[batch]"
+            tail_sampling_config = ""
+
         adot_collector_container = logger_task_def.add_container(
             "AdotCollector",
             image=ecs.ContainerImage.from_registry("public.ecr.aws/aws-observability/aws-otel-collector:latest"),
@@ -293,7 +423,7 @@ class EcsStack(Stack):
 processors:
   batch:
     timeout: 1s
-    send_batch_size: 1024
+    send_batch_size: 1024{tail_sampling_config}
   filter:
     metrics:
       include:
@@ -328,7 +458,7 @@ service:
   pipelines:
     traces:
       receivers: [otlp]
-      processors: [batch]
+      processors: {trace_processors}
       exporters: [awsxray]
     metrics:
       receivers: [otlp]
@@ -355,5 +485,11 @@ service:
         )
         
         alb_stack.grafana_tg.add_target(grafana_service)
-        alb_stack.loki_tg.add_target(loki_service) 
+        if loki_service:
+            alb_stack.loki_tg.add_target(loki_service)
         alb_stack.logger_tg.add_target(logger_service)
+
+        add_service_scaling(logger_service, logger_scaling, alb_stack.logger_tg, sqs_stack.message_queue)
+        if loki_service:
+            add_service_scaling(loki_service, loki_scaling, alb_stack.loki_tg)
+        add_service_scaling(grafana_service, grafana_scaling, alb_stack.grafana_tg)
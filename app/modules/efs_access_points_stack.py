@@ -6,11 +6,12 @@ from aws_cdk import (
 from constructs import Construct
 
 class EfsAccessPointsStack(Stack):
-    def __init__(self, scope: Construct, id: str, file_system: efs.IFileSystem, **kwargs):
+    def __init__(self, scope: Construct, id: str, file_system: efs.IFileSystem,
+                 grafana_file_system: efs.IFileSystem = None, **kwargs):
         super().__init__(scope, id, **kwargs)
 
-        # Grafana Access Point
-        self.grafana_ap = file_system.add_access_point(
+        # Grafana Access Point (on its own file system with -c grafana_file_system=separate)
+        self.grafana_ap = (grafana_file_system or file_system).add_access_point(
             "GrafanaAccessPoint",
             path="/grafana-data",
             create_acl=efs.Acl(owner_uid="472", owner_gid="472", permissions="750"),
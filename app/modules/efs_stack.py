@@ -1,16 +1,29 @@
 from aws_cdk import (
     aws_efs as efs,
     RemovalPolicy,
+    Size,
     Stack,
     CfnOutput,
     aws_ec2 as ec2
 )
 from constructs import Construct
 
+from app.modules.storage_profiles import storage_profile
+
+THROUGHPUT_MODES = {
+    "bursting": efs.ThroughputMode.BURSTING,
+    "elastic": efs.ThroughputMode.ELASTIC,
+    "provisioned": efs.ThroughputMode.PROVISIONED,
+}
+
 class EfsStack(Stack):
     def __init__(self, scope: Construct, id: str, vpc, sg, **kwargs):
         super().__init__(scope, id, **kwargs)
 
+        # Throughput mode and file system layout (cdk deploy -c storage_profile, see storage_profiles.py)
+        storage = storage_profile(self.node)
+        provisioned = storage["efs_throughput_mode"] == "provisioned"
+
         self.efs = efs.FileSystem(
             self, "GrafanaLokiEfs",
             vpc=vpc,
@@ -18,9 +31,27 @@ class EfsStack(Stack):
             removal_policy=RemovalPolicy.DESTROY,
             lifecycle_policy=efs.LifecyclePolicy.AFTER_7_DAYS,
             performance_mode=efs.PerformanceMode.GENERAL_PURPOSE,
-            throughput_mode=efs.ThroughputMode.BURSTING,
+            throughput_mode=THROUGHPUT_MODES[storage["efs_throughput_mode"]],
+            provisioned_throughput_per_second=(
+                Size.mebibytes(storage["efs_provisioned_throughput_mibps"]) if provisioned else None
+            ),
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
         )
 
+        # Grafana's own file system, or the shared one
+        self.grafana_efs = self.efs
+        if storage["grafana_file_system"] == "separate":
+            self.grafana_efs = efs.FileSystem(
+                self, "GrafanaEfs",
+                vpc=vpc,
+                security_group=sg,
+                removal_policy=RemovalPolicy.DESTROY,
+                lifecycle_policy=efs.LifecyclePolicy.AFTER_7_DAYS,
+                performance_mode=efs.PerformanceMode.GENERAL_PURPOSE,
+                throughput_mode=efs.ThroughputMode.BURSTING,
+                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
+            )
+            CfnOutput(self, "GrafanaFileSystemId", value=self.grafana_efs.file_system_id)
+
         # Output file_system_id
         CfnOutput(self, "FileSystemId", value=self.efs.file_system_id)
@@ -0,0 +1,185 @@
+# Loki deployment modes for EcsStack, AlbStack and SgStack
+#
+# "monolithic" (default) runs every Loki component in one LokiService task
+# with its WAL and index on EFS: cheap, and enough for small environments.
+# "simple-scalable" (cdk deploy -c loki_deployment_mode=simple-scalable) runs
+# the write, read and backend targets as separate services from the same
+# image and loki-config-scalable.yaml. They join one memberlist ring through
+# their Cloud Map names in the loki.local namespace, pushes and queries reach
+# them through separate target groups on the internal ALB, and each scales on
+# its own (loki_write_*, loki_read_* and loki_backend_* context, see
+# service_scaling.py).
+#
+# Both modes cache query results, chunks and index stats. -c loki_cache picks
+# the backend: "embedded" (default) keeps the caches in each Loki process;
+# "memcached" runs memcached as a sidecar of the monolithic task, or as a
+# loki-memcached service shared by the simple scalable tasks. Cache sizes and
+# query parallelism are passed to the config files as environment variables
+# (loki_environment()), along with the ingestion profile (loki_profiles.py).
+from aws_cdk import (
+    aws_ecs as ecs,
+    aws_ec2 as ec2,
+    aws_servicediscovery as servicediscovery,
+    Duration
+)
+
+from app.modules.loki_profiles import loki_profile_environment
+from app.modules.service_scaling import add_service_scaling, scaling_settings
+
+LOKI_DEPLOYMENT_MODES = ("monolithic", "simple-scalable")
+LOKI_CACHE_BACKENDS = ("embedded", "memcached")
+MEMCACHED_IMAGE = "memcached:1.6-alpine"
+MEMCACHED_PORT = 11211
+LOKI_NAMESPACE = "loki.local"
+LOKI_SCALABLE_CONFIG = "/etc/loki/loki-config-scalable.yaml"
+# Paths sent to the write target; everything else on loki.internal.com is a query
+LOKI_PUSH_PATHS = ["/loki/api/v1/push", "/otlp/v1/logs"]
+
+# target -> task size
+LOKI_TARGETS = {
+    "write": {"cpu": 1024, "memory_limit_mib": 2048},
+    "read": {"cpu": 1024, "memory_limit_mib": 2048},
+    "backend": {"cpu": 512, "memory_limit_mib": 1024},
+}
+
+
+def loki_deployment_mode(node):
+    mode = node.try_get_context("loki_deployment_mode") or "monolithic"
+    if mode not in LOKI_DEPLOYMENT_MODES:
+        raise ValueError(f"loki_deployment_mode must be one of {', '.join(LOKI_DEPLOYMENT_MODES)}, got {mode!r}")
+    return mode
+
+
+def loki_cache_backend(node):
+    backend = node.try_get_context("loki_cache") or "embedded"
+    if backend not in LOKI_CACHE_BACKENDS:
+        raise ValueError(f"loki_cache must be one of {', '.join(LOKI_CACHE_BACKENDS)}, got {backend!r}")
+    return backend
+
+
+def memcached_mb(node):
+    return int(node.try_get_context("loki_memcached_mb") or 1024)
+
+
+def loki_environment(node, memcached_addresses=None):
+    """Ingestion profile, cache and query settings read by the Loki config files"""
+    def context(key, default):
+        return str(node.try_get_context(key) or default)
+
+    environment = {
+        **loki_profile_environment(node),
+        "LOKI_RESULTS_CACHE_MB": context("loki_results_cache_mb", 128),
+        "LOKI_CHUNK_CACHE_MB": context("loki_chunk_cache_mb", 512),
+        "LOKI_SPLIT_QUERIES_BY_INTERVAL": context("loki_split_queries_by_interval", "30m"),
+        "LOKI_MAX_QUERY_PARALLELISM": context("loki_max_query_parallelism", 32),
+        "LOKI_TSDB_MAX_QUERY_PARALLELISM": context("loki_tsdb_max_query_parallelism", 128),
+        "LOKI_QUERIER_MAX_CONCURRENT": context("loki_querier_max_concurrent", 8),
+    }
+    if memcached_addresses:
+        environment.update({"LOKI_EMBEDDED_CACHE": "false", "LOKI_MEMCACHED_ADDRESSES": memcached_addresses})
+    return environment
+
+
+def add_memcached_container(task_def, size_mb, essential=False):
+    """memcached on port 11211 in ``task_def``; as a sidecar Loki carries on without it"""
+    container = task_def.add_container(
+        "LokiMemcached",
+        image=ecs.ContainerImage.from_registry(MEMCACHED_IMAGE),
+        # Chunks can be larger than the default 1 MB item limit
+        command=["-m", str(size_mb), "-I", "4m", "-c", "4096"],
+        essential=essential,
+        memory_limit_mib=size_mb + 128,
+        logging=ecs.LogDriver.aws_logs(stream_prefix="loki-memcached")
+    )
+    container.add_port_mappings(ecs.PortMapping(container_port=MEMCACHED_PORT, protocol=ecs.Protocol.TCP))
+    return container
+
+
+def fargate_memory_with_memcached(memory_limit_mib, size_mb):
+    """Task memory rounded up to a whole GB so the memcached container fits"""
+    extra = size_mb + 128
+    return memory_limit_mib + -(-extra // 1024) * 1024
+
+
+def add_scalable_loki(scope, cluster, ecs_sg, image, task_role, execution_role, target_groups):
+    """The write, read and backend services; ``target_groups`` maps a target to its ALB target group"""
+    cluster.add_default_cloud_map_namespace(name=LOKI_NAMESPACE, vpc=cluster.vpc)
+    services = {}
+    memcached_addresses = None
+    if loki_cache_backend(scope.node) == "memcached":
+        services["memcached"] = add_memcached_service(scope, cluster, ecs_sg, task_role, execution_role)
+        memcached_addresses = f"dns+loki-memcached.{LOKI_NAMESPACE}:{MEMCACHED_PORT}"
+    environment = loki_environment(scope.node, memcached_addresses)
+    for target, size in LOKI_TARGETS.items():
+        name = target.capitalize()
+        task_def = ecs.FargateTaskDefinition(
+            scope, f"Loki{name}TaskDef",
+            task_role=task_role,
+            execution_role=execution_role,
+            **size
+        )
+        container = task_def.add_container(
+            f"Loki{name}Container",
+            image=image,
+            command=[f"-config.file={LOKI_SCALABLE_CONFIG}", "-config.expand-env=true", f"-target={target}"],
+            environment=environment,
+            logging=ecs.LogDriver.aws_logs(stream_prefix=f"loki-{target}"),
+            # Time for an ingester to flush its chunks when it is scaled in
+            stop_timeout=Duration.seconds(120)
+        )
+        container.add_port_mappings(
+            ecs.PortMapping(container_port=3100, protocol=ecs.Protocol.TCP),
+            ecs.PortMapping(container_port=9095, protocol=ecs.Protocol.TCP),
+            ecs.PortMapping(container_port=7946, protocol=ecs.Protocol.TCP),
+            ecs.PortMapping(container_port=7946, protocol=ecs.Protocol.UDP)
+        )
+        settings = scaling_settings(scope.node, f"loki_{target}")
+        service = ecs.FargateService(
+            scope, f"Loki{name}Service",
+            service_name=f"loki-{target}-service",
+            cluster=cluster,
+            task_definition=task_def,
+            security_groups=[ecs_sg],
+            desired_count=settings["min_tasks"],
+            assign_public_ip=False,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+            cloud_map_options=ecs.CloudMapOptions(
+                name=f"loki-{target}",
+                dns_record_type=servicediscovery.DnsRecordType.A,
+                dns_ttl=Duration.seconds(10)
+            )
+        )
+        target_group = target_groups.get(target)
+        if target_group is not None:
+            target_group.add_target(service)
+        add_service_scaling(service, settings, target_group)
+        services[target] = service
+    return services
+
+
+def add_memcached_service(scope, cluster, ecs_sg, task_role, execution_role):
+    """One memcached task shared by every read and write task, found as loki-memcached.loki.local"""
+    size_mb = memcached_mb(scope.node)
+    task_def = ecs.FargateTaskDefinition(
+        scope, "LokiMemcachedTaskDef",
+        cpu=512,
+        memory_limit_mib=fargate_memory_with_memcached(0, size_mb),
+        task_role=task_role,
+        execution_role=execution_role
+    )
+    add_memcached_container(task_def, size_mb, essential=True)
+    return ecs.FargateService(
+        scope, "LokiMemcachedService",
+        service_name="loki-memcached-service",
+        cluster=cluster,
+        task_definition=task_def,
+        security_groups=[ecs_sg],
+        desired_count=1,
+        assign_public_ip=False,
+        vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+        cloud_map_options=ecs.CloudMapOptions(
+            name="loki-memcached",
+            dns_record_type=servicediscovery.DnsRecordType.A,
+            dns_ttl=Duration.seconds(10)
+        )
+    )
@@ -0,0 +1,73 @@
+# Loki ingestion profiles for EcsStack
+#
+# The Loki config files are templates: chunk and ingestion settings are
+# ${LOKI_...} placeholders filled from the task environment when Loki starts
+# (-config.expand-env=true). A profile names one set of values, picked with
+# cdk deploy -c loki_profile=<name>, and any single value can be overridden
+# with loki_<setting> context, e.g. -c loki_ingestion_rate_mb=32:
+#
+#   chunk_encoding                 snappy is cheap on CPU; zstd packs more lines
+#                                  into each chunk for fewer, smaller S3 objects
+#   chunk_target_size              compressed bytes a chunk is cut at
+#   chunk_idle_period / max_chunk_age   when a quiet or old chunk is flushed anyway
+#   concurrent_flushes / flush_check_period   chunk uploads in parallel, and how often
+#   ingestion_rate_mb / ingestion_burst_size_mb   per tenant push limits (MB/s)
+#   per_stream_rate_limit / per_stream_rate_limit_burst   the same for one stream
+#   max_global_streams_per_user    active streams per tenant, counted across
+#                                  ingesters (max_streams_per_user per ingester)
+#
+# Higher profiles keep more chunk data in the ingesters' memory; size the Loki
+# tasks (or the write service) to match.
+LOKI_PROFILES = {
+    # The defaults Loki ships with, but chunks idle for 30m rather than 5m
+    "small": {
+        "chunk_encoding": "snappy", "chunk_target_size": 1572864, "chunk_idle_period": "30m",
+        "max_chunk_age": "2h", "concurrent_flushes": 16, "flush_check_period": "30s",
+        "ingestion_rate_mb": 4, "ingestion_burst_size_mb": 6,
+        "per_stream_rate_limit": "3MB", "per_stream_rate_limit_burst": "15MB",
+        "max_global_streams_per_user": 5000,
+    },
+    "medium": {
+        "chunk_encoding": "snappy", "chunk_target_size": 3145728, "chunk_idle_period": "1h",
+        "max_chunk_age": "2h", "concurrent_flushes": 32, "flush_check_period": "30s",
+        "ingestion_rate_mb": 16, "ingestion_burst_size_mb": 32,
+        "per_stream_rate_limit": "5MB", "per_stream_rate_limit_burst": "20MB",
+        "max_global_streams_per_user": 20000,
+    },
+    # Sustained heavy pushes: bigger zstd chunks and more flush workers
+    "high-ingest": {
+        "chunk_encoding": "zstd", "chunk_target_size": 4194304, "chunk_idle_period": "1h",
+        "max_chunk_age": "2h", "concurrent_flushes": 64, "flush_check_period": "15s",
+        "ingestion_rate_mb": 64, "ingestion_burst_size_mb": 128,
+        "per_stream_rate_limit": "10MB", "per_stream_rate_limit_burst": "40MB",
+        "max_global_streams_per_user": 100000,
+    },
+}
+
+CHUNK_ENCODINGS = ("none", "gzip", "lz4-64k", "snappy", "lz4-256k", "lz4-1M", "lz4", "flate", "zstd")
+
+
+def loki_profile(node):
+    """The loki_profile context value, "small" by default"""
+    name = node.try_get_context("loki_profile") or "small"
+    if name not in LOKI_PROFILES:
+        raise ValueError(f"loki_profile must be one of {', '.join(LOKI_PROFILES)}, got {name!r}")
+    return name
+
+
+def loki_profile_settings(node):
+    """LOKI_PROFILES[loki_profile] overridden by loki_<setting> context values"""
+    settings = dict(LOKI_PROFILES[loki_profile(node)])
+    for name in settings:
+        value = node.try_get_context(f"loki_{name}")
+        if value not in (None, ""):
+            settings[name] = value
+    if settings["chunk_encoding"] not in CHUNK_ENCODINGS:
+        raise ValueError(f"loki_chunk_encoding must be one of {', '.join(CHUNK_ENCODINGS)}, "
+                         f"got {settings['chunk_encoding']!r}")
+    return settings
+
+
+def loki_profile_environment(node):
+    """The profile as the LOKI_<SETTING> variables the config files read"""
+    return {f"LOKI_{name.upper()}": str(value) for name, value in loki_profile_settings(node).items()}
@@ -0,0 +1,131 @@
+# ECS service autoscaling for EcsStack
+#
+# Each service reads its task range and policies from CDK context under a
+# prefix ("logger", "loki", "grafana", and "loki_write", "loki_read" and
+# "loki_backend" in Loki's simple scalable mode), e.g.
+# cdk deploy -c logger_max_tasks=8:
+#
+#   <prefix>_min_tasks / <prefix>_max_tasks    task count range
+#   <prefix>_scale_cpu_percent                 target average CPU, 0 disables
+#   <prefix>_scale_memory_percent              target average memory, 0 disables
+#   <prefix>_scale_requests_per_target         target ALB requests per task per minute, 0 disables
+#   <prefix>_scale_in_cooldown / <prefix>_scale_out_cooldown   seconds
+#   <prefix>_sqs_backlog_per_task              step scaling on visible SQS messages per
+#                                              running task, 0 disables (queue consumers only)
+#
+# A service whose max equals its min gets no scalable target and keeps its
+# desired count. With several policies ECS scales out when any of them asks
+# and in only when all of them allow it.
+from aws_cdk import (
+    aws_applicationautoscaling as appscaling,
+    aws_cloudwatch as cloudwatch,
+    Duration
+)
+
+SETTINGS = ("min_tasks", "max_tasks", "scale_cpu_percent", "scale_memory_percent", "scale_requests_per_target",
+            "scale_in_cooldown", "scale_out_cooldown", "sqs_backlog_per_task")
+
+DEFAULTS = {
+    # Stateless, and the consumer of logger-app-messages
+    "logger": {"min_tasks": 1, "max_tasks": 4, "scale_cpu_percent": 60, "scale_memory_percent": 75,
+               "scale_requests_per_target": 500, "scale_in_cooldown": 120, "scale_out_cooldown": 30,
+               "sqs_backlog_per_task": 100},
+    # Single instances: Loki's monolithic mode owns its EFS index and Grafana's
+    # SQLite database lives on EFS. Raising max_tasks adds the policies.
+    "loki": {"min_tasks": 1, "max_tasks": 1, "scale_cpu_percent": 70, "scale_memory_percent": 80,
+             "scale_requests_per_target": 0, "scale_in_cooldown": 300, "scale_out_cooldown": 60,
+             "sqs_backlog_per_task": 0},
+    "grafana": {"min_tasks": 1, "max_tasks": 1, "scale_cpu_percent": 70, "scale_memory_percent": 80,
+                "scale_requests_per_target": 0, "scale_in_cooldown": 300, "scale_out_cooldown": 60,
+                "sqs_backlog_per_task": 0},
+    # Ingesters: at least the replication factor (3). Scale-in is slow so
+    # chunks are flushed and the ring settles between tasks
+    "loki_write": {"min_tasks": 3, "max_tasks": 6, "scale_cpu_percent": 70, "scale_memory_percent": 75,
+                   "scale_requests_per_target": 0, "scale_in_cooldown": 600, "scale_out_cooldown": 60,
+                   "sqs_backlog_per_task": 0},
+    # Queriers and query frontends, stateless
+    "loki_read": {"min_tasks": 2, "max_tasks": 6, "scale_cpu_percent": 70, "scale_memory_percent": 80,
+                  "scale_requests_per_target": 0, "scale_in_cooldown": 300, "scale_out_cooldown": 60,
+                  "sqs_backlog_per_task": 0},
+    # Compactor, index gateway, query scheduler and ruler
+    "loki_backend": {"min_tasks": 1, "max_tasks": 2, "scale_cpu_percent": 70, "scale_memory_percent": 80,
+                     "scale_requests_per_target": 0, "scale_in_cooldown": 300, "scale_out_cooldown": 60,
+                     "sqs_backlog_per_task": 0},
+}
+
+
+def scaling_settings(node, prefix):
+    """DEFAULTS[prefix] overridden by <prefix>_<setting> context values"""
+    settings = {}
+    for name in SETTINGS:
+        value = node.try_get_context(f"{prefix}_{name}")
+        settings[name] = float(value) if value not in (None, "") else DEFAULTS[prefix][name]
+    for name in ("min_tasks", "max_tasks", "scale_in_cooldown", "scale_out_cooldown"):
+        settings[name] = int(settings[name])
+    if not 0 < settings["min_tasks"] <= settings["max_tasks"]:
+        raise ValueError(f"{prefix}_min_tasks and {prefix}_max_tasks must satisfy 0 < min <= max, "
+                         f"got {settings['min_tasks']} and {settings['max_tasks']}")
+    return settings
+
+
+def sqs_backlog_per_task(queue, cluster_name, service_name):
+    """Visible messages divided by running tasks (RunningTaskCount needs Container Insights)"""
+    return cloudwatch.MathExpression(
+        expression="visible / IF(tasks > 0, tasks, 1)",
+        label="SQS backlog per task",
+        period=Duration.minutes(1),
+        using_metrics={
+            "visible": queue.metric_approximate_number_of_messages_visible(
+                period=Duration.minutes(1), statistic="Maximum"
+            ),
+            "tasks": cloudwatch.Metric(
+                namespace="ECS/ContainerInsights",
+                metric_name="RunningTaskCount",
+                dimensions_map={"ClusterName": cluster_name, "ServiceName": service_name},
+                period=Duration.minutes(1),
+                statistic="Average"
+            ),
+        }
+    )
+
+
+def add_service_scaling(service, settings, target_group=None, queue=None):
+    """Scalable target and policies for ``service``; returns the target, or None at a fixed count"""
+    if settings["max_tasks"] == settings["min_tasks"]:
+        return None
+    scale_in = Duration.seconds(settings["scale_in_cooldown"])
+    scale_out = Duration.seconds(settings["scale_out_cooldown"])
+    scaling = service.auto_scale_task_count(min_capacity=settings["min_tasks"], max_capacity=settings["max_tasks"])
+
+    if settings["scale_cpu_percent"]:
+        scaling.scale_on_cpu_utilization(
+            "CpuScaling", target_utilization_percent=settings["scale_cpu_percent"],
+            scale_in_cooldown=scale_in, scale_out_cooldown=scale_out
+        )
+    if settings["scale_memory_percent"]:
+        scaling.scale_on_memory_utilization(
+            "MemoryScaling", target_utilization_percent=settings["scale_memory_percent"],
+            scale_in_cooldown=scale_in, scale_out_cooldown=scale_out
+        )
+    if settings["scale_requests_per_target"] and target_group is not None:
+        scaling.scale_on_request_count(
+            "RequestCountScaling", requests_per_target=int(settings["scale_requests_per_target"]),
+            target_group=target_group, scale_in_cooldown=scale_in, scale_out_cooldown=scale_out
+        )
+    backlog = settings["sqs_backlog_per_task"]
+    if backlog and queue is not None:
+        # Remove a task below half the target backlog; add 1, 2 or 4 as it
+        # passes 1x, 2x and 4x the target
+        scaling.scale_on_metric(
+            "SqsBacklogScaling",
+            metric=sqs_backlog_per_task(queue, service.cluster.cluster_name, service.service_name),
+            scaling_steps=[
+                appscaling.ScalingInterval(upper=backlog / 2, change=-1),
+                appscaling.ScalingInterval(lower=backlog, change=+1),
+                appscaling.ScalingInterval(lower=backlog * 2, change=+2),
+                appscaling.ScalingInterval(lower=backlog * 4, change=+4),
+            ],
+            adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+            cooldown=scale_out
+        )
+    return scaling
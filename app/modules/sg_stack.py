@@ -4,6 +4,8 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from app.modules.loki_deployment import loki_cache_backend, loki_deployment_mode
+
 class SgStack(Stack):
     def __init__(self, scope: Construct, id: str, vpc, **kwargs):
         super().__init__(scope, id, **kwargs)
@@ -61,3 +63,12 @@ class SgStack(Stack):
         self.ecs_sg.add_ingress_rule(self.internal_alb_sg, ec2.Port.tcp(3000), "Allow Grafana from ALB")
         self.ecs_sg.add_ingress_rule(self.internal_alb_sg, ec2.Port.tcp(3100), "Allow Loki from ALB")
         self.ecs_sg.add_ingress_rule(self.internal_alb_sg, ec2.Port.tcp(9090), "Allow Prometheus from ALB")
+
+        # Loki's simple scalable mode: HTTP, gRPC and memberlist between its tasks
+        if loki_deployment_mode(self.node) == "simple-scalable":
+            self.ecs_sg.add_ingress_rule(self.ecs_sg, ec2.Port.tcp(3100), "Allow Loki HTTP between tasks")
+            self.ecs_sg.add_ingress_rule(self.ecs_sg, ec2.Port.tcp(9095), "Allow Loki gRPC between tasks")
+            self.ecs_sg.add_ingress_rule(self.ecs_sg, ec2.Port.tcp(7946), "Allow Loki memberlist (TCP)")
+            self.ecs_sg.add_ingress_rule(self.ecs_sg, ec2.Port.udp(7946), "Allow Loki memberlist (UDP)")
+            if loki_cache_backend(self.node) == "memcached":
+                self.ecs_sg.add_ingress_rule(self.ecs_sg, ec2.Port.tcp(11211), "Allow Loki memcached")
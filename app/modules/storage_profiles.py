@@ -0,0 +1,49 @@
+# Storage profiles for EfsStack, EfsAccessPointsStack and EcsStack
+#
+# Monolithic Loki keeps its WAL, TSDB index and compactor directories under
+# /var/loki. On a bursting EFS file system those fsyncs slow down once the
+# burst credits run out, and ingestion stalls. cdk deploy -c storage_profile=<name>
+# picks where that data lives, and any one setting can be overridden with
+# its own context key, e.g. -c grafana_file_system=separate:
+#
+#   efs_throughput_mode   bursting, elastic (pay per use, no credits) or
+#                         provisioned (efs_provisioned_throughput_mibps, default 64)
+#   loki_storage          efs, or ephemeral: Fargate task storage
+#                         (loki_ephemeral_storage_gib, default 50) with S3 as the
+#                         only durable store; open chunks are flushed on shutdown
+#                         and lost only if the task dies without stopping
+#   grafana_file_system   shared with Loki, or separate: its own bursting file
+#                         system, so Grafana's SQLite is not slowed by Loki's
+#                         writes or tied to Loki's throughput mode
+#
+# Loki's simple scalable mode never uses EFS (see loki_deployment.py).
+STORAGE_PROFILES = {
+    # The original layout: one bursting file system for both
+    "bursting": {"efs_throughput_mode": "bursting", "loki_storage": "efs", "grafana_file_system": "shared"},
+    "elastic": {"efs_throughput_mode": "elastic", "loki_storage": "efs", "grafana_file_system": "shared"},
+    "provisioned": {"efs_throughput_mode": "provisioned", "loki_storage": "efs", "grafana_file_system": "separate"},
+    # The shared file system only holds Grafana, so bursting is enough
+    "ephemeral": {"efs_throughput_mode": "bursting", "loki_storage": "ephemeral", "grafana_file_system": "shared"},
+}
+
+CHOICES = {
+    "efs_throughput_mode": ("bursting", "elastic", "provisioned"),
+    "loki_storage": ("efs", "ephemeral"),
+    "grafana_file_system": ("shared", "separate"),
+}
+
+
+def storage_profile(node):
+    """STORAGE_PROFILES[storage_profile] ("bursting" by default) overridden by context values"""
+    # Bursting is what existing deployments run; the others change throughput billing, so they are opt-in
+    name = node.try_get_context("storage_profile") or "bursting"
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"storage_profile must be one of {', '.join(STORAGE_PROFILES)}, got {name!r}")
+    settings = dict(STORAGE_PROFILES[name])
+    for key, choices in CHOICES.items():
+        settings[key] = node.try_get_context(key) or settings[key]
+        if settings[key] not in choices:
+            raise ValueError(f"{key} must be one of {', '.join(choices)}, got {settings[key]!r}")
+    settings["efs_provisioned_throughput_mibps"] = int(node.try_get_context("efs_provisioned_throughput_mibps") or 64)
+    settings["loki_ephemeral_storage_gib"] = int(node.try_get_context("loki_ephemeral_storage_gib") or 50)
+    return settings
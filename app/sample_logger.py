@@ -1,96 +1,81 @@
+import asyncio
+import hmac
 import logging
 import random
 import time
 import os
-import json
 import uuid
+import functools
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query
 import threading
 import uvicorn
-import requests
-import boto3
 from botocore.exceptions import ClientError
 
-# Configure standard logger first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    datefmt='%Y-%m-%dT%H:%M:%S%z'
+from app.logger_app.aws_clients import (
+    AwsCallExecutor, AsyncAwsProxy, LazyAwsClient, boto3_factory, max_concurrency_from_env
 )
+from app.logger_app.simulated_work import SimulatedWork, UniformLatency, shutdown_cpu_pool
+from app.logger_app.sqs_producer import SqsBatchProducer
+from app.logger_app.sqs_consumer import SqsConsumer
+from app.logger_app.dynamodb_writer import DynamoDbWriteBehind, WriteQueueFull
+from app.logger_app.read_cache import ReadThroughCache
+from app.logger_app.pagination import InvalidPageToken, decode_page_token, encode_page_token
+from app.logger_app.workflow import WorkflowStep, run_workflow
+from app.logger_app.tracing import Tracing, mark_error
+from app.logger_app.log_generator import random_log
+from app.logger_app.logging_pipeline import configure_logging
+from app.logger_app.log_sampling import SharedLimits, update_from_json
+from app.logger_app.middleware import RequestContextMiddleware, RequestMetrics, request_elapsed
+from app.logger_app.runtime_profile import RuntimeProfile
+
+# Configure logging first: records go through a ring buffer to a writer thread
+log_handler = configure_logging()
 logger = logging.getLogger("sample_logger")
+# Admin changes to the sampling limits reach every worker through this file
+shared_log_limits = SharedLimits.from_env() if log_handler.sampler is not None else None
+
+# Response and message body serialization (LOGGER_RUNTIME_PROFILE)
+runtime_profile = RuntimeProfile.from_env()
 
-# Optional OpenTelemetry imports (with graceful fallback)
+# Optional OpenTelemetry imports (with graceful fallback). Exporters and
+# instrumentations are imported later, and only when they are enabled.
 try:
-    logger.info("Attempting to import OpenTelemetry packages...")
     from opentelemetry import trace
-    logger.info("✓ opentelemetry.trace imported")
     from opentelemetry import metrics
-    logger.info("✓ opentelemetry.metrics imported")
-    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-    logger.info("✓ opentelemetry.instrumentation.fastapi imported")
-    from opentelemetry.instrumentation.requests import RequestsInstrumentor
-    logger.info("✓ opentelemetry.instrumentation.requests imported")
-    from opentelemetry.instrumentation.boto3sqs import Boto3SQSInstrumentor
-    logger.info("✓ opentelemetry.instrumentation.boto3sqs imported")
-    from opentelemetry.instrumentation.botocore import BotocoreInstrumentor
-    logger.info("✓ opentelemetry.instrumentation.botocore imported")
-    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-    logger.info("✓ opentelemetry.exporter.otlp.proto.grpc.trace_exporter imported")
-    from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
-    logger.info("✓ opentelemetry.exporter.otlp.proto.grpc.metric_exporter imported")
     from opentelemetry.sdk.trace import TracerProvider
-    logger.info("✓ opentelemetry.sdk.trace imported")
     from opentelemetry.sdk.trace.export import BatchSpanProcessor
-    logger.info("✓ opentelemetry.sdk.trace.export imported")
     from opentelemetry.sdk.metrics import MeterProvider
-    logger.info("✓ opentelemetry.sdk.metrics imported")
     from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-    logger.info("✓ opentelemetry.sdk.metrics.export imported")
     from opentelemetry.sdk.resources import Resource
-    logger.info("✓ opentelemetry.sdk.resources imported")
+    from app.logger_app.telemetry import (
+        CollectorProbe, GatedMetricExporter, GatedSpanExporter, instrument, otlp_exporter, sampler_from_env
+    )
     OPENTELEMETRY_AVAILABLE = True
-    logger.info("✅ All OpenTelemetry imports successful!")
 except ImportError as e:
-    logger.error(f"❌ OpenTelemetry import failed: {e}")
-    import traceback
-    logger.error(f"Import traceback: {traceback.format_exc()}")
+    logger.error("OpenTelemetry import failed: %s", e)
     OPENTELEMETRY_AVAILABLE = False
 
-LOG_LEVELS = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL]
-LOG_LEVEL_NAMES = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-SAMPLE_MESSAGES = [
-    "User login succeeded",
-    "User login failed",
-    "File uploaded successfully",
-    "File upload failed",
-    "Database connection established",
-    "Database connection lost",
-    "Cache miss",
-    "Cache hit",
-    "API request received",
-    "API request failed",
-    "Background job started",
-    "Background job completed",
-    "Unexpected exception occurred"
-]
-
 # Simple OpenTelemetry setup (only if enabled via environment)
 def setup_opentelemetry():
     if not OPENTELEMETRY_AVAILABLE:
         logger.info("OpenTelemetry not available, skipping setup")
         return None
+    if os.getenv("OTEL_SDK_DISABLED", "false").lower() == "true":
+        logger.info("OpenTelemetry disabled by OTEL_SDK_DISABLED")
+        return None
     
     # Only setup if OTLP endpoint is configured
     otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
-    logger.info(f"OTEL_EXPORTER_OTLP_ENDPOINT: {otlp_endpoint}")
+    logger.info("OTEL_EXPORTER_OTLP_ENDPOINT: %s", otlp_endpoint)
     if not otlp_endpoint:
         # Use default endpoint for testing
         otlp_endpoint = "http://localhost:4317"
-        logger.info(f"Using default OTLP endpoint: {otlp_endpoint}")
+        logger.info("Using default OTLP endpoint: %s", otlp_endpoint)
     
     try:
-        logger.info(f"Setting up OpenTelemetry with endpoint: {otlp_endpoint}")
+        logger.info("Setting up OpenTelemetry with endpoint: %s", otlp_endpoint)
         
         # Create resource
         logger.info("Creating OpenTelemetry resource...")
@@ -103,49 +88,63 @@ def setup_opentelemetry():
         
         # Setup tracing
         logger.info("Setting up tracing...")
-        trace.set_tracer_provider(TracerProvider(resource=resource))
+        # Providers are shut down (and flushed) by the app lifespan. Without
+        # OTEL_TRACES_SAMPLER_ROUTES the SDK applies OTEL_TRACES_SAMPLER.
+        sampler = sampler_from_env()
+        if sampler is not None:
+            logger.info("Trace sampler: %s", sampler.get_description())
+        trace.set_tracer_provider(TracerProvider(resource=resource, sampler=sampler, shutdown_on_exit=False))
         tracer = trace.get_tracer(__name__)
         logger.info("Tracer created successfully")
         
-        # Setup OTLP trace exporter with retry configuration
-        logger.info("Setting up OTLP trace exporter...")
-        otlp_trace_exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
-        span_processor = BatchSpanProcessor(
-            otlp_trace_exporter,
-            max_export_batch_size=512,
-            export_timeout_millis=30000,
-            schedule_delay_millis=5000
-        )
-        trace.get_tracer_provider().add_span_processor(span_processor)
-        logger.info("Trace exporter setup completed")
+        # Exports are held until the collector answers, and the OTLP exporters
+        # are only imported then (see app/logger_app/telemetry.py)
+        global collector_probe
+        collector_probe = CollectorProbe(otlp_endpoint)
+        if os.getenv("OTEL_TRACES_EXPORTER", "otlp").lower() == "otlp":
+            logger.info("Setting up OTLP trace exporter...")
+            otlp_trace_exporter = GatedSpanExporter(
+                lambda: otlp_exporter("trace_exporter", "OTLPSpanExporter", otlp_endpoint), collector_probe
+            )
+            span_processor = BatchSpanProcessor(
+                otlp_trace_exporter,
+                max_export_batch_size=512,
+                export_timeout_millis=30000,
+                schedule_delay_millis=5000
+            )
+            trace.get_tracer_provider().add_span_processor(span_processor)
+            logger.info("Trace exporter setup completed")
         
         # Setup metrics with retry configuration
         logger.info("Setting up metrics...")
-        otlp_metric_exporter = OTLPMetricExporter(endpoint=otlp_endpoint)
-        metric_reader = PeriodicExportingMetricReader(
-            otlp_metric_exporter, 
-            export_interval_millis=15000,  # Increased interval to reduce load
-            export_timeout_millis=30000
-        )
-        meter_provider = MeterProvider(resource=resource, metric_readers=[metric_reader])
+        metric_readers = []
+        if os.getenv("OTEL_METRICS_EXPORTER", "otlp").lower() == "otlp":
+            otlp_metric_exporter = GatedMetricExporter(
+                lambda: otlp_exporter("metric_exporter", "OTLPMetricExporter", otlp_endpoint), collector_probe
+            )
+            metric_readers.append(PeriodicExportingMetricReader(
+                otlp_metric_exporter, 
+                export_interval_millis=15000,  # Increased interval to reduce load
+                export_timeout_millis=30000
+            ))
+        meter_provider = MeterProvider(resource=resource, metric_readers=metric_readers, shutdown_on_exit=False)
         metrics.set_meter_provider(meter_provider)
         meter = metrics.get_meter(__name__)
         logger.info("Meter created successfully")
         
+        collector_probe.start()
         logger.info("OpenTelemetry setup completed successfully")
         return tracer, meter
         
     except Exception as e:
-        logger.error(f"Failed to setup OpenTelemetry: {e}")
+        logger.error("Failed to setup OpenTelemetry: %s", e)
         import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Traceback: %s", traceback.format_exc())
         return None
 
-# Initialize OpenTelemetry (optional)
-# Add a small delay to let ADOT collector start first
-import time
-time.sleep(5)  # Give ADOT collector time to start
-
+# Initialize OpenTelemetry (optional). This does not wait for the ADOT
+# collector: telemetry is buffered until it accepts connections.
+collector_probe = None
 telemetry_result = setup_opentelemetry()
 if telemetry_result:
     tracer, meter = telemetry_result
@@ -154,20 +153,93 @@ else:
     tracer, meter = None, None
     logger.info("OpenTelemetry not available - running without telemetry")
 
-app = FastAPI()
+# Handlers open spans through the facade; they are no-ops without a tracer
+tracing = Tracing(tracer)
+
+def shutdown_telemetry():
+    """Flush pending spans and metrics; called when the worker shuts down"""
+    if not telemetry_result:
+        return
+    try:
+        trace.get_tracer_provider().shutdown()
+        metrics.get_meter_provider().shutdown()
+    except Exception as e:
+        logger.error("Failed to flush telemetry on shutdown: %s", e)
 
-# Create metrics (if available)
-request_counter = None
-response_time_histogram = None
+# Bounded pool that keeps blocking boto3 calls off the event loop
+aws_executor = AwsCallExecutor(max_concurrency_from_env())
+
+# Background consumer settings; its long polls get their own threads so they
+# never tie up the pool used by request handlers
+sqs_consumer_enabled = os.getenv("SQS_CONSUMER_ENABLED", "true").lower() == "true"
+sqs_consumer_pollers = int(os.getenv("SQS_CONSUMER_POLLERS", "2"))
+sqs_consumer_workers = int(os.getenv("SQS_CONSUMER_WORKERS", "8"))
+consumer_executor = AwsCallExecutor(sqs_consumer_pollers + 2)
+
+# Simulated work for the demo endpoints (see app/logger_app/simulated_work.py)
+index_work = SimulatedWork.from_env("index", UniformLatency(0.1, 0.5))
+telemetry_work = SimulatedWork.from_env("test_telemetry", UniformLatency(0.1, 0.3))
+
+async def sync_log_limits(interval=float(os.getenv("LOG_SAMPLING_SYNC_SECONDS", "1"))):
+    """Pick up sampling limits another worker published"""
+    while True:
+        try:
+            if shared_log_limits.sync(log_handler.sampler):
+                logger.info("Log sampling limits reloaded: %s", log_handler.sampler.limits())
+        except Exception as e:
+            logger.warning("Could not reload log sampling limits: %s", e)
+        await asyncio.sleep(interval)
+
+@asynccontextmanager
+async def lifespan(app):
+    if sqs_consumer:
+        await sqs_consumer.start()
+    if dynamodb_writer:
+        await dynamodb_writer.start()
+    limits_sync = asyncio.create_task(sync_log_limits()) if shared_log_limits else None
+    yield
+    if limits_sync:
+        limits_sync.cancel()
+    if sqs_consumer:
+        await sqs_consumer.stop()
+    if dynamodb_writer:
+        await dynamodb_writer.stop()
+    if sqs_producer:
+        await sqs_producer.close()
+    aws_executor.shutdown(wait=False)
+    consumer_executor.shutdown(wait=False)
+    shutdown_cpu_pool()
+    if collector_probe:
+        collector_probe.stop()
+    shutdown_telemetry()
+
+app = FastAPI(lifespan=lifespan, default_response_class=runtime_profile.response_class)
+app_instrumented = False
+
+def create_app():
+    """uvicorn app factory: instruments the app once per worker process"""
+    global app_instrumented
+    if OPENTELEMETRY_AVAILABLE and tracer and not app_instrumented:
+        instrument(app)
+        app_instrumented = True
+    return app
+
+# Create metrics (if available). Request count and duration for every
+# endpoint are recorded by RequestContextMiddleware through request_metrics.
+request_metrics = RequestMetrics()
 
 if meter:
     try:
-        request_counter = meter.create_counter(
+        from opentelemetry.metrics import Observation
+        meter.create_observable_counter(
             name="http_requests_total",
+            callbacks=[lambda options: [
+                Observation(count, attributes) for attributes, count in request_metrics.counts()
+            ]],
             description="Total number of HTTP requests",
             unit="1"
         )
-        response_time_histogram = meter.create_histogram(
+        request_metrics.histogram = meter.create_histogram(
             name="http_request_duration_seconds",
             description="HTTP request duration in seconds",
             unit="s"
@@ -203,17 +275,68 @@ if meter:
             description="Duration of AWS service calls",
             unit="s"
         )
+        dynamodb_batch_fill_ratio = meter.create_histogram(
+            name="dynamodb_write_batch_fill_ratio",
+            description="Items per BatchWriteItem call divided by the 25 item maximum",
+            unit="1"
+        )
+        dynamodb_unprocessed_retries = meter.create_counter(
+            name="dynamodb_unprocessed_retries_total",
+            description="UnprocessedItems re-sent by the write-behind writer",
+            unit="1"
+        )
+        cache_hits = meter.create_counter(
+            name="read_cache_hits_total",
+            description="Reads served from the in-process cache",
+            unit="1"
+        )
+        cache_misses = meter.create_counter(
+            name="read_cache_misses_total",
+            description="Reads that went to DynamoDB",
+            unit="1"
+        )
+        cache_evictions = meter.create_counter(
+            name="read_cache_evictions_total",
+            description="Entries removed from the in-process cache",
+            unit="1"
+        )
+        dynamodb_access_path_latency = meter.create_histogram(
+            name="dynamodb_access_path_duration_seconds",
+            description="Duration of DynamoDB reads by access path",
+            unit="s"
+        )
+        meter.create_observable_counter(
+            name="log_records_dropped_total",
+            callbacks=[lambda options: [Observation(log_handler.dropped)]],
+            description="Log records dropped because the log buffer was full",
+            unit="1"
+        )
+        if log_handler.sampler is not None:
+            meter.create_observable_counter(
+                name="log_records_suppressed_total",
+                callbacks=[lambda options: [
+                    Observation(count, {"level": level})
+                    for level, count in log_handler.sampler.suppressed_totals().items()
+                ]],
+                description="Log records suppressed by the log sampler",
+                unit="1"
+            )
         logger.info("Metrics created successfully")
     except Exception as e:
-        logger.error(f"Failed to create metrics: {e}")
-        request_counter = None
-        response_time_histogram = None
+        logger.error("Failed to create metrics: %s", e)
+        request_metrics.histogram = None
         user_actions_counter = None
         error_counter = None
         sqs_messages_sent = None
         sqs_messages_received = None
         dynamodb_operations = None
         aws_service_latency = None
+        dynamodb_batch_fill_ratio = None
+        dynamodb_unprocessed_retries = None
+        cache_hits = None
+        cache_misses = None
+        cache_evictions = None
+        dynamodb_access_path_latency = None
 else:
     user_actions_counter = None
     error_counter = None
@@ -221,659 +344,642 @@ else:
     sqs_messages_received = None
     dynamodb_operations = None
     aws_service_latency = None
+    dynamodb_batch_fill_ratio = None
+    dynamodb_unprocessed_retries = None
+    cache_hits = None
+    cache_misses = None
+    cache_evictions = None
+    dynamodb_access_path_latency = None
+
+app.add_middleware(
+    RequestContextMiddleware,
+    access_log=os.getenv("LOG_ACCESS", "true").lower() == "true",
+    metrics=request_metrics
+)
+
+@functools.lru_cache(maxsize=None)
+def aws_call_attributes(service, operation, error_code=None):
+    attributes = {"service": service, "operation": operation, "status": "error" if error_code else "success"}
+    if error_code:
+        attributes["error_code"] = error_code
+    return attributes
+
+def aws_error_code(error):
+    """The AWS error code of a failed call, or the exception type when there was no response"""
+    if error is None:
+        return None
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") or "ClientError"
+    return type(error).__name__
+
+def record_aws_call(service, operation, duration, error):
+    """on_call hook of the AsyncAwsProxy instances: times every AWS call, failed ones tagged with their error"""
+    if aws_service_latency:
+        aws_service_latency.record(duration, aws_call_attributes(service, operation, aws_error_code(error)))
+
+def record_sqs_batch(batch_size, sent, failed):
+    """Count messages per SendMessageBatch call, tagged with the batch size"""
+    if not sqs_messages_sent:
+        return
+    if sent:
+        sqs_messages_sent.add(sent, {"queue": "message-queue", "status": "success", "batch_size": batch_size})
+    if failed:
+        sqs_messages_sent.add(failed, {"queue": "message-queue", "status": "failed", "batch_size": batch_size})
+
+def record_sqs_received(count):
+    if sqs_messages_received:
+        sqs_messages_received.add(count, {"queue": "message-queue", "status": "success"})
+
+def record_dynamodb_batch(size):
+    if dynamodb_batch_fill_ratio:
+        dynamodb_batch_fill_ratio.record(size / 25, {"table": "app-table"})
+
+def record_dynamodb_unprocessed(count):
+    if dynamodb_unprocessed_retries:
+        dynamodb_unprocessed_retries.add(count, {"table": "app-table"})
+
+def record_cache_hit():
+    if cache_hits:
+        cache_hits.add(1, {"cache": "get-data"})
+
+def record_cache_miss():
+    if cache_misses:
+        cache_misses.add(1, {"cache": "get-data"})
+
+def record_cache_eviction(reason):
+    if cache_evictions:
+        cache_evictions.add(1, {"cache": "get-data", "reason": reason})
+
+# Read-through cache in front of /get-data (READ_CACHE_MAX_ENTRIES=0 disables it)
+read_cache_max_entries = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+if read_cache_max_entries > 0:
+    read_cache = ReadThroughCache(
+        max_entries=read_cache_max_entries,
+        ttl=float(os.getenv("READ_CACHE_TTL_SECONDS", "30")),
+        negative_ttl=float(os.getenv("READ_CACHE_NEGATIVE_TTL_SECONDS", "2")),
+        on_hit=record_cache_hit,
+        on_miss=record_cache_miss,
+        on_evict=record_cache_eviction
+    )
+else:
+    read_cache = None
 
 # Initialize AWS services
 try:
     aws_region = os.getenv("AWS_REGION", "us-east-1")
-    sqs_client = boto3.client('sqs', region_name=aws_region)
-    dynamodb = boto3.resource('dynamodb', region_name=aws_region)
+    # Size the HTTP connection pool to match the executors so calls never queue on it
+    aws_pool_size = aws_executor.max_concurrency + consumer_executor.max_concurrency
+    # Clients are created on first use, on an executor thread (see LazyAwsClient)
+    sqs_client = LazyAwsClient(boto3_factory("client", "sqs", aws_region, aws_pool_size))
+    dynamodb = LazyAwsClient(boto3_factory("resource", "dynamodb", aws_region, aws_pool_size))
     
     # Get queue URLs and table names from environment
     message_queue_url = os.getenv("SQS_MESSAGE_QUEUE_URL")
     app_table_name = os.getenv("DYNAMODB_APP_TABLE")
     
     if app_table_name:
-        app_table = dynamodb.Table(app_table_name)
+        app_table = LazyAwsClient(lambda: dynamodb.resolve().Table(app_table_name))
     else:
         app_table = None
             
-    logger.info(f"AWS services initialized - Region: {aws_region}")
-    logger.info(f"SQS Queue - Message: {message_queue_url}")
-    logger.info(f"DynamoDB Tables - App: {app_table_name}")
+    # Async views used by the request handlers
+    async_sqs = AsyncAwsProxy(sqs_client, aws_executor, "sqs", record_aws_call)
+    async_app_table = AsyncAwsProxy(app_table, aws_executor, "dynamodb", record_aws_call) if app_table else None
+    
+    # Messages from concurrent requests are sent together with SendMessageBatch
+    if message_queue_url:
+        sqs_producer = SqsBatchProducer(
+            async_sqs,
+            message_queue_url,
+            linger=float(os.getenv("SQS_PRODUCER_LINGER_MS", "5")) / 1000,
+            max_retries=int(os.getenv("SQS_PRODUCER_MAX_RETRIES", "3")),
+            on_batch=record_sqs_batch
+        )
+    else:
+        sqs_producer = None
+    
+    # Long-poll consumer that feeds /receive-messages from an in-memory buffer
+    if message_queue_url and sqs_consumer_enabled:
+        sqs_consumer = SqsConsumer(
+            AsyncAwsProxy(sqs_client, consumer_executor, "sqs", record_aws_call),
+            message_queue_url,
+            pollers=sqs_consumer_pollers,
+            workers=sqs_consumer_workers,
+            buffer_size=int(os.getenv("SQS_CONSUMER_BUFFER_SIZE", "1000")),
+            visibility_timeout=int(os.getenv("SQS_CONSUMER_VISIBILITY_TIMEOUT", "30")),
+            on_receive=record_sqs_received
+        )
+    else:
+        sqs_consumer = None
+    
+    # Optional write-behind mode for /save-data and /workflow
+    dynamodb_write_mode = os.getenv("DYNAMODB_WRITE_MODE", "sync").lower()
+    if app_table_name and dynamodb_write_mode == "write_behind":
+        dynamodb_writer = DynamoDbWriteBehind(
+            AsyncAwsProxy(dynamodb, aws_executor, "dynamodb", record_aws_call),
+            app_table_name,
+            max_queue=int(os.getenv("DYNAMODB_WRITE_QUEUE_SIZE", "1000")),
+            linger=float(os.getenv("DYNAMODB_WRITE_LINGER_MS", "50")) / 1000,
+            on_batch=record_dynamodb_batch,
+            on_unprocessed=record_dynamodb_unprocessed,
+            on_written=lambda item: invalidate_cached_item(item)
+        )
+        if meter:
+            from opentelemetry.metrics import Observation
+            meter.create_observable_gauge(
+                name="dynamodb_write_queue_depth",
+                callbacks=[lambda options: [Observation(dynamodb_writer.depth, {"table": "app-table"})]],
+                description="Items waiting in the write-behind queue",
+                unit="1"
+            )
+    else:
+        dynamodb_writer = None
+            
+    logger.info("AWS services initialized - Region: %s", aws_region)
+    logger.info("SQS Queue - Message: %s", message_queue_url)
+    logger.info("DynamoDB Tables - App: %s (write mode: %s)", app_table_name, dynamodb_write_mode)
+    logger.info("AWS client concurrency limit: %s", aws_executor.max_concurrency)
     
 except Exception as e:
-    logger.error(f"Failed to initialize AWS services: {e}")
+    logger.error("Failed to initialize AWS services: %s", e)
     sqs_client = None
     app_table = None
+    async_sqs = None
+    async_app_table = None
+    sqs_producer = None
+    sqs_consumer = None
+    dynamodb_writer = None
 
-def random_log():
-    while True:
-        level = random.choice(LOG_LEVELS)
-        level_name = LOG_LEVEL_NAMES[LOG_LEVELS.index(level)]
-        msg = random.choice(SAMPLE_MESSAGES)
-        logger.log(level, f"[{level_name}] {msg}")
-        time.sleep(30)
+async def put_app_item(item, sync=False):
+    """Write an item directly, or queue it when write-behind mode is on.
+
+    Returns the write mode used. Raises a 503 when the write-behind queue is full.
+    The cached item is dropped before the write and again once it is written, so
+    a read racing the write cannot cache what it replaced.
+    """
+    if read_cache is not None:
+        read_cache.invalidate(item["id"])
+    if dynamodb_writer and not sync:
+        try:
+            dynamodb_writer.submit(item)
+        except WriteQueueFull as e:
+            logger.warning("Rejecting write: %s", e)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        # Invalidated again by the writer's on_written hook
+        return "write_behind"
+    await async_app_table.put_item(Item=item)
+    invalidate_cached_item(item)
+    return "sync"
+
+def invalidate_cached_item(item):
+    if read_cache is not None:
+        read_cache.invalidate(item["id"])
+
+ACCESS_PATH_ATTRIBUTES = {
+    access_path: {"table": "app-table", "access_path": access_path}
+    for access_path in ("latest_by_id", "user_index")
+}
+
+def record_access_path(access_path, duration):
+    if dynamodb_access_path_latency:
+        dynamodb_access_path_latency.record(duration, ACCESS_PATH_ATTRIBUTES[access_path])
+
+async def fetch_app_item(data_id):
+    """Latest item for an id (highest timestamp sort key), or None"""
+    start_time = time.perf_counter()
+    response = await async_app_table.query(
+        KeyConditionExpression="#id = :id",
+        ExpressionAttributeNames={"#id": "id"},
+        ExpressionAttributeValues={":id": data_id},
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    item = items[0] if items else None
+    
+    if dynamodb_operations:
+        dynamodb_operations.add(1, {"table": "app-table", "operation": "query", "status": "success" if item else "not_found"})
+    record_access_path("latest_by_id", time.perf_counter() - start_time)
+    
+    return item
+
+async def get_app_item(data_id):
+    """Read an item through the read-through cache when it is enabled"""
+    if read_cache is not None:
+        return await read_cache.get(data_id, lambda: fetch_app_item(data_id))
+    return await fetch_app_item(data_id)
+
+# A user-index LastEvaluatedKey: the table key plus the index key
+USER_INDEX_KEY = ("id", "timestamp", "user_id", "created_at")
+
+async def query_user_items(user_id, limit, next_token=None):
+    """One page of a user's items from the user-index GSI, newest first"""
+    start_time = time.perf_counter()
+    query_args = {
+        "IndexName": "user-index",
+        "KeyConditionExpression": "user_id = :user_id",
+        "ExpressionAttributeValues": {":user_id": user_id},
+        "ScanIndexForward": False,
+        "Limit": limit,
+        # Only the attributes the endpoint returns; timestamp and data are reserved words
+        "ProjectionExpression": "#id, #ts, user_id, created_at, #data",
+        "ExpressionAttributeNames": {"#id": "id", "#ts": "timestamp", "#data": "data"}
+    }
+    if next_token:
+        start_key = decode_page_token(next_token, USER_INDEX_KEY)
+        if start_key["user_id"] != user_id:
+            raise InvalidPageToken("Page token belongs to another user")
+        query_args["ExclusiveStartKey"] = start_key
+    response = await async_app_table.query(**query_args)
+    items = response.get('Items', [])
+    
+    if dynamodb_operations:
+        dynamodb_operations.add(1, {"table": "app-table", "operation": "query_user_index", "status": "success"})
+    record_access_path("user_index", time.perf_counter() - start_time)
+    
+    return items, encode_page_token(response.get('LastEvaluatedKey'))
+
+# /workflow steps; steps without depends_on run concurrently
+async def workflow_save_item(context):
+    return await put_app_item(context["item"], sync=context["sync"])
+
+async def workflow_delete_item(context):
+    item = context["item"]
+    key = {"id": item["id"], "timestamp": item["timestamp"]}
+    if dynamodb_writer and not context["sync"]:
+        # Queued behind the put, so the put cannot land after the delete
+        dynamodb_writer.submit_delete(key)
+        return
+    await async_app_table.delete_item(Key=key)
+    invalidate_cached_item(item)
+
+async def workflow_send_message(context):
+    return await sqs_producer.send(
+        runtime_profile.dumps(context["message"]),
+        {
+            'MessageType': {
+                'StringValue': 'workflow-message',
+                'DataType': 'String'
+            }
+        }
+    )
+
+workflow_step_timeout = float(os.getenv("WORKFLOW_STEP_TIMEOUT_SECONDS", "5"))
+workflow_steps = []
+if app_table:
+    workflow_steps.append(WorkflowStep(
+        "dynamodb_save", workflow_save_item, timeout=workflow_step_timeout, compensate=workflow_delete_item
+    ))
+if sqs_producer:
+    # A sent message cannot be recalled, so this step is only reported on failure
+    workflow_steps.append(WorkflowStep("sqs_send", workflow_send_message, timeout=workflow_step_timeout))
+workflow_step_names = ",".join(step.name for step in workflow_steps)
 
 @app.get("/")
 async def index(request: Request):
-    start_time = time.time()
-    
-    # Use tracing if available
-    if tracer:
-        with tracer.start_as_current_span("index_endpoint") as span:
-            span.set_attribute("http.method", "GET")
+    client_host = request.client.host
+    with tracing.span("index_endpoint", {"http.method": "GET", "client.host": client_host}) as span:
+        if span.is_recording():
             span.set_attribute("http.url", str(request.url))
-            span.set_attribute("client.host", request.client.host)
-            
-            now = datetime.utcnow().isoformat()
-            client_host = request.client.host
-            logger.info(f"[INFO] Web endpoint visited at {now} from {client_host}. Deployed with Github workflow")
-            
-            # Record metrics if available
-            if request_counter:
-                request_counter.add(1, {"method": "GET", "endpoint": "/"})
-            
-            # Simulate some work
-            time.sleep(random.uniform(0.1, 0.5))
-            
-            response_time = time.time() - start_time
-            if response_time_histogram:
-                response_time_histogram.record(response_time, {"method": "GET", "endpoint": "/"})
-            
-            return {"message": f"Logger app running. Visit time: {now}. Deployed with Github workflow"}
-    else:
-        # No tracing, just log normally
-        now = datetime.utcnow().isoformat()
-        client_host = request.client.host
-        logger.info(f"[INFO] Web endpoint visited at {now} from {client_host}. Deployed with Github workflow. f")
         
-        # Record metrics if available
-        if request_counter:
-            request_counter.add(1, {"method": "GET", "endpoint": "/"})
+        now = datetime.utcnow().isoformat()
+        logger.info("[INFO] Web endpoint visited at %s from %s. Deployed with Github workflow", now, client_host)
         
         # Simulate some work
-        time.sleep(random.uniform(0.1, 0.5))
-        
-        response_time = time.time() - start_time
-        if response_time_histogram:
-            response_time_histogram.record(response_time, {"method": "GET", "endpoint": "/"})
-        
-        return {"message": f"Logger app running. Visit time: {now}. Deployed with Github workflow. f"}
+        await index_work.run()
+    
+    return {"message": f"Logger app running. Visit time: {now}. Deployed with Github workflow"}
 
 @app.get("/test-telemetry")
 async def test_telemetry():
     """Test endpoint to generate custom metrics and traces"""
-    start_time = time.time()
+    with tracing.span("test_telemetry_endpoint", {"test.type": "telemetry"}) as span:
+        span.set_attribute("test.timestamp", datetime.utcnow().isoformat())
+        
+        # Simulate some work
+        await telemetry_work.run()
+        
+        # Generate custom metrics
+        if user_actions_counter:
+            user_actions_counter.add(1, {"action": "test_telemetry", "endpoint": "/test-telemetry"})
+        
+        if error_counter and random.random() < 0.1:  # 10% chance of error
+            error_counter.add(1, {"error_type": "simulated", "endpoint": "/test-telemetry"})
+            span.set_attribute("test.error", "simulated_error")
     
-    if tracer:
-        with tracer.start_as_current_span("test_telemetry_endpoint") as span:
-            span.set_attribute("test.type", "telemetry")
-            span.set_attribute("test.timestamp", datetime.utcnow().isoformat())
-            
-            # Simulate some work
-            time.sleep(random.uniform(0.1, 0.3))
-            
-            # Generate custom metrics
-            if user_actions_counter:
-                user_actions_counter.add(1, {"action": "test_telemetry", "endpoint": "/test-telemetry"})
-            
-            if error_counter and random.random() < 0.1:  # 10% chance of error
-                error_counter.add(1, {"error_type": "simulated", "endpoint": "/test-telemetry"})
-                span.set_attribute("test.error", "simulated_error")
-            
-            response_time = time.time() - start_time
-            if response_time_histogram:
-                response_time_histogram.record(response_time, {"endpoint": "/test-telemetry"})
-            
-            return {
-                "message": "Telemetry test completed",
-                "timestamp": datetime.utcnow().isoformat(),
-                "response_time": response_time,
-                "telemetry_enabled": True
-            }
-    else:
-        return {
-            "message": "Telemetry test completed (no tracing)",
-            "timestamp": datetime.utcnow().isoformat(),
-            "telemetry_enabled": False
-        }
+    return {
+        "message": "Telemetry test completed",
+        "timestamp": datetime.utcnow().isoformat(),
+        "response_time": request_elapsed(),
+        "telemetry_enabled": tracing.enabled
+    }
 
 @app.get("/health")
 async def health():
-    if tracer:
-        with tracer.start_as_current_span("health_check") as span:
-            span.set_attribute("health.status", "healthy")
-            return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
-    else:
-        return {"status": "healthy. No tracing", "timestamp": datetime.utcnow().isoformat()}
+    with tracing.span("health_check", {"health.status": "healthy"}):
+        return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 @app.post("/send-message")
 async def send_message(request: Request):
     """Send a message to SQS queue"""
-    start_time = time.time()
-    
-    if not sqs_client or not message_queue_url:
+    if not sqs_producer:
         raise HTTPException(status_code=500, detail="SQS not configured")
     
-    if tracer:
-        with tracer.start_as_current_span("send_sqs_message") as span:
-            try:
-                # Generate message data
-                message_id = str(uuid.uuid4())
-                message_data = {
-                    "id": message_id,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "source": "logger-app",
-                    "content": f"Test message {message_id}",
-                    "client_ip": request.client.host
-                }
-                
-                span.set_attribute("sqs.queue_url", message_queue_url)
-                span.set_attribute("sqs.message_id", message_id)
-                
-                # Send message to SQS
-                response = sqs_client.send_message(
-                    QueueUrl=message_queue_url,
-                    MessageBody=json.dumps(message_data),
-                    MessageAttributes={
-                        'MessageType': {
-                            'StringValue': 'test-message',
-                            'DataType': 'String'
-                        },
-                        'Source': {
-                            'StringValue': 'logger-app',
-                            'DataType': 'String'
-                        }
+    message_id = str(uuid.uuid4())
+    message_data = {
+        "id": message_id,
+        "timestamp": datetime.utcnow().isoformat(),
+        "source": "logger-app",
+        "content": f"Test message {message_id}",
+        "client_ip": request.client.host
+    }
+    
+    with tracing.span("send_sqs_message", {"sqs.queue_url": message_queue_url, "sqs.message_id": message_id}) as span:
+        try:
+            # Send message to SQS (batched with other requests)
+            sqs_message_id = await sqs_producer.send(
+                runtime_profile.dumps(message_data),
+                {
+                    'MessageType': {
+                        'StringValue': 'test-message',
+                        'DataType': 'String'
+                    },
+                    'Source': {
+                        'StringValue': 'logger-app',
+                        'DataType': 'String'
                     }
-                )
-                
-                # Record metrics
-                if sqs_messages_sent:
-                    sqs_messages_sent.add(1, {"queue": "message-queue", "status": "success"})
-                
-                if aws_service_latency:
-                    aws_service_latency.record(time.time() - start_time, {"service": "sqs", "operation": "send_message"})
-                
-                span.set_attribute("sqs.message_id_response", response['MessageId'])
-                
-                logger.info(f"Message sent to SQS: {response['MessageId']}")
-                
-                return {
-                    "message": "Message sent successfully",
-                    "message_id": response['MessageId'],
-                    "sqs_message_id": message_id,
-                    "timestamp": datetime.utcnow().isoformat()
                 }
-                
-            except ClientError as e:
-                span.set_attribute("error", True)
-                span.set_attribute("error.message", str(e))
-                
-                if error_counter:
-                    error_counter.add(1, {"service": "sqs", "operation": "send_message"})
-                
-                logger.error(f"Failed to send SQS message: {e}")
-                raise HTTPException(status_code=500, detail=f"SQS error: {str(e)}")
-    else:
-        # No tracing fallback
-        try:
-            message_id = str(uuid.uuid4())
-            message_data = {
-                "id": message_id,
-                "timestamp": datetime.utcnow().isoformat(),
-                "source": "logger-app",
-                "content": f"Test message {message_id}",
-                "client_ip": request.client.host
-            }
-            
-            response = sqs_client.send_message(
-                QueueUrl=message_queue_url,
-                MessageBody=json.dumps(message_data)
             )
-            
-            if sqs_messages_sent:
-                sqs_messages_sent.add(1, {"queue": "message-queue", "status": "success"})
-            
-            logger.info(f"Message sent to SQS: {response['MessageId']}")
-            
-            return {
-                "message": "Message sent successfully",
-                "message_id": response['MessageId'],
-                "sqs_message_id": message_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
         except ClientError as e:
+            mark_error(span, e)
             if error_counter:
                 error_counter.add(1, {"service": "sqs", "operation": "send_message"})
-            logger.error(f"Failed to send SQS message: {e}")
+            logger.error("Failed to send SQS message: %s", e)
             raise HTTPException(status_code=500, detail=f"SQS error: {str(e)}")
+        
+        span.set_attribute("sqs.message_id_response", sqs_message_id)
+    
+    logger.info("Message sent to SQS: %s", sqs_message_id)
+    
+    return {
+        "message": "Message sent successfully",
+        "message_id": sqs_message_id,
+        "sqs_message_id": message_id,
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
 @app.get("/receive-messages")
-async def receive_messages():
-    """Receive messages from SQS queue"""
-    start_time = time.time()
+async def receive_messages(limit: int = 10):
+    """Return messages processed by the background SQS consumer"""
+    if not sqs_consumer:
+        raise HTTPException(status_code=500, detail="SQS consumer not configured")
     
-    if not sqs_client or not message_queue_url:
-        raise HTTPException(status_code=500, detail="SQS not configured")
+    with tracing.span("receive_sqs_messages", {"sqs.queue_url": message_queue_url}) as span:
+        # Read from the consumer buffer; no SQS call on the request path
+        messages = sqs_consumer.drain(limit)
+        span.set_attribute("sqs.messages_received", len(messages))
     
-    if tracer:
-        with tracer.start_as_current_span("receive_sqs_messages") as span:
-            try:
-                span.set_attribute("sqs.queue_url", message_queue_url)
-                
-                # Receive messages from SQS
-                response = sqs_client.receive_message(
-                    QueueUrl=message_queue_url,
-                    MaxNumberOfMessages=10,
-                    WaitTimeSeconds=5
-                )
-                
-                messages = response.get('Messages', [])
-                
-                # Record metrics
-                if sqs_messages_received:
-                    sqs_messages_received.add(len(messages), {"queue": "message-queue", "status": "success"})
-                
-                if aws_service_latency:
-                    aws_service_latency.record(time.time() - start_time, {"service": "sqs", "operation": "receive_message"})
-                
-                span.set_attribute("sqs.messages_received", len(messages))
-                
-                # Delete messages after processing
-                for message in messages:
-                    sqs_client.delete_message(
-                        QueueUrl=message_queue_url,
-                        ReceiptHandle=message['ReceiptHandle']
-                    )
-                
-                logger.info(f"Received {len(messages)} messages from SQS")
-                
-                return {
-                    "message": f"Received {len(messages)} messages",
-                    "messages": [json.loads(msg['Body']) for msg in messages],
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
-            except ClientError as e:
-                span.set_attribute("error", True)
-                span.set_attribute("error.message", str(e))
-                
-                if error_counter:
-                    error_counter.add(1, {"service": "sqs", "operation": "receive_message"})
-                
-                logger.error(f"Failed to receive SQS messages: {e}")
-                raise HTTPException(status_code=500, detail=f"SQS error: {str(e)}")
-    else:
-        # No tracing fallback
-        try:
-            response = sqs_client.receive_message(
-                QueueUrl=message_queue_url,
-                MaxNumberOfMessages=10,
-                WaitTimeSeconds=5
-            )
-            
-            messages = response.get('Messages', [])
-            
-            if sqs_messages_received:
-                sqs_messages_received.add(len(messages), {"queue": "message-queue", "status": "success"})
-            
-            # Delete messages after processing
-            for message in messages:
-                sqs_client.delete_message(
-                    QueueUrl=message_queue_url,
-                    ReceiptHandle=message['ReceiptHandle']
-                )
-            
-            logger.info(f"Received {len(messages)} messages from SQS")
-            
-            return {
-                "message": f"Received {len(messages)} messages",
-                "messages": [json.loads(msg['Body']) for msg in messages],
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-        except ClientError as e:
-            if error_counter:
-                error_counter.add(1, {"service": "sqs", "operation": "receive_message"})
-            logger.error(f"Failed to receive SQS messages: {e}")
-            raise HTTPException(status_code=500, detail=f"SQS error: {str(e)}")
+    logger.info("Returned %s buffered SQS messages", len(messages))
+    
+    return {
+        "message": f"Received {len(messages)} messages",
+        "messages": messages,
+        "consumer": sqs_consumer.snapshot(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/consumer-stats")
+async def consumer_stats():
+    """Counters and queue depths of the background SQS consumer"""
+    if not sqs_consumer:
+        raise HTTPException(status_code=500, detail="SQS consumer not configured")
+    return {"consumer": sqs_consumer.snapshot(), "timestamp": datetime.utcnow().isoformat()}
+
+def check_admin_token(request):
+    """The admin endpoints only exist when ADMIN_TOKEN is set, and need it in X-Admin-Token"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(supplied.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/log-sampling")
+async def get_log_sampling(request: Request):
+    """Current log sampling limits, and the suppression counts of this worker"""
+    check_admin_token(request)
+    if log_handler.sampler is None:
+        raise HTTPException(status_code=404, detail="Log sampling is disabled")
+    if shared_log_limits:
+        shared_log_limits.sync(log_handler.sampler)
+    return {"sampling": log_handler.sampler.snapshot(), "pid": os.getpid()}
+
+@app.put("/admin/log-sampling")
+async def update_log_sampling(request: Request):
+    """Change log sampling limits at runtime, for every worker"""
+    check_admin_token(request)
+    if log_handler.sampler is None:
+        raise HTTPException(status_code=404, detail="Log sampling is disabled")
+    try:
+        update = update_from_json(await request.json())
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid log sampling limits: {e}")
+    if shared_log_limits:
+        # Start from what the other workers published, so their changes are kept
+        shared_log_limits.sync(log_handler.sampler)
+    log_handler.sampler.update(**update)
+    if shared_log_limits:
+        shared_log_limits.publish(log_handler.sampler)
+    logger.warning("Log sampling limits changed: %s", log_handler.sampler.snapshot())
+    return {"sampling": log_handler.sampler.snapshot(), "pid": os.getpid()}
 
 @app.post("/save-data")
-async def save_data(request: Request):
-    """Save data to DynamoDB"""
-    start_time = time.time()
-    
+async def save_data(request: Request, sync: bool = False):
+    """Save data to DynamoDB (sync=true forces a direct write for read-after-write)"""
     if not app_table:
         raise HTTPException(status_code=500, detail="DynamoDB not configured")
     
-    if tracer:
-        with tracer.start_as_current_span("save_dynamodb_data") as span:
-            try:
-                # Generate data
-                data_id = str(uuid.uuid4())
-                timestamp = datetime.utcnow().isoformat()
-                
-                item = {
-                    "id": data_id,
-                    "timestamp": timestamp,
-                    "user_id": f"user-{random.randint(1000, 9999)}",
-                    "created_at": timestamp,
-                    "data": {
-                        "message": f"Sample data {data_id}",
-                        "value": random.randint(1, 100),
-                        "client_ip": request.client.host
-                    },
-                    "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))  # 24 hours
-                }
-                
-                span.set_attribute("dynamodb.table_name", app_table.table_name)
-                span.set_attribute("dynamodb.item_id", data_id)
-                
-                # Save to DynamoDB
-                app_table.put_item(Item=item)
-                
-                # Record metrics
-                if dynamodb_operations:
-                    dynamodb_operations.add(1, {"table": "app-table", "operation": "put_item", "status": "success"})
-                
-                if aws_service_latency:
-                    aws_service_latency.record(time.time() - start_time, {"service": "dynamodb", "operation": "put_item"})
-                
-                logger.info(f"Data saved to DynamoDB: {data_id}")
-                
-                return {
-                    "message": "Data saved successfully",
-                    "id": data_id,
-                    "timestamp": timestamp
-                }
-                
-            except ClientError as e:
-                span.set_attribute("error", True)
-                span.set_attribute("error.message", str(e))
-                
-                if error_counter:
-                    error_counter.add(1, {"service": "dynamodb", "operation": "put_item"})
-                
-                logger.error(f"Failed to save DynamoDB data: {e}")
-                raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
-    else:
-        # No tracing fallback
+    # Generate data
+    data_id = str(uuid.uuid4())
+    timestamp = datetime.utcnow().isoformat()
+    item = {
+        "id": data_id,
+        "timestamp": timestamp,
+        "user_id": f"user-{random.randint(1000, 9999)}",
+        "created_at": timestamp,
+        "data": {
+            "message": f"Sample data {data_id}",
+            "value": random.randint(1, 100),
+            "client_ip": request.client.host
+        },
+        "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))  # 24 hours
+    }
+    
+    with tracing.span("save_dynamodb_data", {"dynamodb.table_name": app_table_name, "dynamodb.item_id": data_id}) as span:
         try:
-            data_id = str(uuid.uuid4())
-            timestamp = datetime.utcnow().isoformat()
-            
-            item = {
-                "id": data_id,
-                "timestamp": timestamp,
-                "user_id": f"user-{random.randint(1000, 9999)}",
-                "created_at": timestamp,
-                "data": {
-                    "message": f"Sample data {data_id}",
-                    "value": random.randint(1, 100),
-                    "client_ip": request.client.host
-                },
-                "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))
-            }
-            
-            app_table.put_item(Item=item)
-            
-            if dynamodb_operations:
-                dynamodb_operations.add(1, {"table": "app-table", "operation": "put_item", "status": "success"})
-            
-            logger.info(f"Data saved to DynamoDB: {data_id}")
-            
-            return {
-                "message": "Data saved successfully",
-                "id": data_id,
-                "timestamp": timestamp
-            }
-            
+            write_mode = await put_app_item(item, sync=sync)
         except ClientError as e:
+            mark_error(span, e)
             if error_counter:
                 error_counter.add(1, {"service": "dynamodb", "operation": "put_item"})
-            logger.error(f"Failed to save DynamoDB data: {e}")
+            logger.error("Failed to save DynamoDB data: %s", e)
             raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
+        
+        span.set_attribute("dynamodb.write_mode", write_mode)
+    
+    # Record metrics
+    if dynamodb_operations:
+        dynamodb_operations.add(1, {"table": "app-table", "operation": "put_item", "status": "success"})
+    
+    logger.info("Data saved to DynamoDB: %s", data_id)
+    
+    return {
+        "message": "Data saved successfully",
+        "id": data_id,
+        "timestamp": timestamp,
+        "write_mode": write_mode
+    }
 
 @app.get("/get-data/{data_id}")
 async def get_data(data_id: str):
     """Get data from DynamoDB"""
-    start_time = time.time()
-    
     if not app_table:
         raise HTTPException(status_code=500, detail="DynamoDB not configured")
     
-    if tracer:
-        with tracer.start_as_current_span("get_dynamodb_data") as span:
-            try:
-                span.set_attribute("dynamodb.table_name", app_table.table_name)
-                span.set_attribute("dynamodb.item_id", data_id)
-                
-                # Get item from DynamoDB
-                response = app_table.get_item(
-                    Key={
-                        "id": data_id,
-                        "timestamp": "latest"
-                    }
-                )
-                
-                item = response.get('Item')
-                
-                # Record metrics
-                if dynamodb_operations:
-                    dynamodb_operations.add(1, {"table": "app-table", "operation": "get_item", "status": "success" if item else "not_found"})
-                
-                if aws_service_latency:
-                    aws_service_latency.record(time.time() - start_time, {"service": "dynamodb", "operation": "get_item"})
-                
-                if item:
-                    logger.info(f"Data retrieved from DynamoDB: {data_id}")
-                    return {
-                        "message": "Data retrieved successfully",
-                        "data": item,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                else:
-                    logger.info(f"Data not found in DynamoDB: {data_id}")
-                    raise HTTPException(status_code=404, detail="Data not found")
-                    
-            except ClientError as e:
-                span.set_attribute("error", True)
-                span.set_attribute("error.message", str(e))
-                
-                if error_counter:
-                    error_counter.add(1, {"service": "dynamodb", "operation": "get_item"})
-                
-                logger.error(f"Failed to get DynamoDB data: {e}")
-                raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
-    else:
-        # No tracing fallback
+    with tracing.span("get_dynamodb_data", {
+        "dynamodb.table_name": app_table_name,
+        "dynamodb.item_id": data_id,
+        "dynamodb.access_path": "latest_by_id"
+    }) as span:
         try:
-            response = app_table.get_item(
-                Key={
-                    "id": data_id,
-                    "timestamp": "latest"
-                }
-            )
-            
-            item = response.get('Item')
-            
-            if dynamodb_operations:
-                dynamodb_operations.add(1, {"table": "app-table", "operation": "get_item", "status": "success" if item else "not_found"})
-            
-            if item:
-                logger.info(f"Data retrieved from DynamoDB: {data_id}")
-                return {
-                    "message": "Data retrieved successfully",
-                    "data": item,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            else:
-                logger.info(f"Data not found in DynamoDB: {data_id}")
-                raise HTTPException(status_code=404, detail="Data not found")
-                
+            # Get the latest item for the id from the cache or DynamoDB
+            item = await get_app_item(data_id)
         except ClientError as e:
+            mark_error(span, e)
             if error_counter:
-                error_counter.add(1, {"service": "dynamodb", "operation": "get_item"})
-            logger.error(f"Failed to get DynamoDB data: {e}")
+                error_counter.add(1, {"service": "dynamodb", "operation": "query"})
+            logger.error("Failed to get DynamoDB data: %s", e)
             raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
+    
+    # Raised outside the span: a missing item is not a failed DynamoDB call
+    if not item:
+        logger.info("Data not found in DynamoDB: %s", data_id)
+        raise HTTPException(status_code=404, detail="Data not found")
+    
+    logger.info("Data retrieved from DynamoDB: %s", data_id)
+    return {
+        "message": "Data retrieved successfully",
+        "data": item,
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
-@app.get("/workflow")
-async def workflow(request: Request):
-    """Complete workflow: send SQS message, save to DynamoDB, and process"""
-    start_time = time.time()
+@app.get("/users/{user_id}/items")
+async def get_user_items(user_id: str, limit: int = Query(25, ge=1, le=100), next_token: str = None):
+    """List a user's items, newest first, using the user-index GSI"""
+    if not app_table:
+        raise HTTPException(status_code=500, detail="DynamoDB not configured")
     
-    if tracer:
-        with tracer.start_as_current_span("complete_workflow") as span:
-            span.set_attribute("workflow.type", "full_workflow")
-            
-            try:
-                # Step 1: Save data to DynamoDB
-                data_id = str(uuid.uuid4())
-                timestamp = datetime.utcnow().isoformat()
-                
-                if app_table:
-                    item = {
-                        "id": data_id,
-                        "timestamp": timestamp,
-                        "user_id": f"user-{random.randint(1000, 9999)}",
-                        "created_at": timestamp,
-                        "data": {
-                            "message": f"Workflow data {data_id}",
-                            "value": random.randint(1, 100),
-                            "client_ip": request.client.host
-                        },
-                        "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))
-                    }
-                    app_table.put_item(Item=item)
-                    span.set_attribute("workflow.dynamodb_saved", True)
-                
-                # Step 2: Send message to SQS
-                if sqs_client and message_queue_url:
-                    message_data = {
-                        "id": data_id,
-                        "timestamp": timestamp,
-                        "source": "workflow",
-                        "content": f"Workflow message for data {data_id}",
-                        "client_ip": request.client.host
-                    }
-                    
-                    sqs_response = sqs_client.send_message(
-                        QueueUrl=message_queue_url,
-                        MessageBody=json.dumps(message_data),
-                        MessageAttributes={
-                            'MessageType': {
-                                'StringValue': 'workflow-message',
-                                'DataType': 'String'
-                            }
-                        }
-                    )
-                    span.set_attribute("workflow.sqs_sent", True)
-                    span.set_attribute("workflow.sqs_message_id", sqs_response['MessageId'])
-                
-                # Record metrics
-                if user_actions_counter:
-                    user_actions_counter.add(1, {"action": "complete_workflow", "endpoint": "/workflow"})
-                
-                if dynamodb_operations:
-                    dynamodb_operations.add(1, {"table": "app-table", "operation": "put_item", "status": "success"})
-                
-                if sqs_messages_sent:
-                    sqs_messages_sent.add(1, {"queue": "message-queue", "status": "success"})
-                
-                workflow_time = time.time() - start_time
-                if aws_service_latency:
-                    aws_service_latency.record(workflow_time, {"service": "workflow", "operation": "complete"})
-                
-                logger.info(f"Workflow completed: {data_id}")
-                
-                return {
-                    "message": "Workflow completed successfully",
-                    "data_id": data_id,
-                    "workflow_time": workflow_time,
-                    "timestamp": timestamp,
-                    "steps_completed": ["dynamodb_save", "sqs_send"]
-                }
-                
-            except Exception as e:
-                span.set_attribute("error", True)
-                span.set_attribute("error.message", str(e))
-                
-                if error_counter:
-                    error_counter.add(1, {"service": "workflow", "operation": "complete"})
-                
-                logger.error(f"Workflow failed: {e}")
-                raise HTTPException(status_code=500, detail=f"Workflow error: {str(e)}")
-    else:
-        # No tracing fallback
+    with tracing.span("query_user_items", {
+        "dynamodb.table_name": app_table_name,
+        "dynamodb.index_name": "user-index",
+        "app.user_id": user_id
+    }) as span:
         try:
-            data_id = str(uuid.uuid4())
-            timestamp = datetime.utcnow().isoformat()
-            
-            # Save to DynamoDB
-            if app_table:
-                item = {
-                    "id": data_id,
-                    "timestamp": timestamp,
-                    "user_id": f"user-{random.randint(1000, 9999)}",
-                    "created_at": timestamp,
-                    "data": {
-                        "message": f"Workflow data {data_id}",
-                        "value": random.randint(1, 100),
-                        "client_ip": request.client.host
-                    },
-                    "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))
-                }
-                app_table.put_item(Item=item)
-            
-            # Send to SQS
-            if sqs_client and message_queue_url:
-                message_data = {
-                    "id": data_id,
-                    "timestamp": timestamp,
-                    "source": "workflow",
-                    "content": f"Workflow message for data {data_id}",
-                    "client_ip": request.client.host
-                }
-                
-                sqs_response = sqs_client.send_message(
-                    QueueUrl=message_queue_url,
-                    MessageBody=json.dumps(message_data)
-                )
-            
-            if user_actions_counter:
-                user_actions_counter.add(1, {"action": "complete_workflow", "endpoint": "/workflow"})
-            
-            workflow_time = time.time() - start_time
-            
-            logger.info(f"Workflow completed: {data_id}")
-            
-            return {
-                "message": "Workflow completed successfully",
-                "data_id": data_id,
-                "workflow_time": workflow_time,
-                "timestamp": timestamp,
-                "steps_completed": ["dynamodb_save", "sqs_send"]
-            }
-            
-        except Exception as e:
+            items, token = await query_user_items(user_id, limit, next_token)
+        except InvalidPageToken as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ClientError as e:
+            mark_error(span, e)
             if error_counter:
-                error_counter.add(1, {"service": "workflow", "operation": "complete"})
-            logger.error(f"Workflow failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Workflow error: {str(e)}")
+                error_counter.add(1, {"service": "dynamodb", "operation": "query_user_index"})
+            logger.error("Failed to query user items: %s", e)
+            raise HTTPException(status_code=500, detail=f"DynamoDB error: {str(e)}")
+        span.set_attribute("dynamodb.items_returned", len(items))
+    
+    logger.info("Returned %s items for %s", len(items), user_id)
+    return {
+        "items": items,
+        "count": len(items),
+        "next_token": token,
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
-if __name__ == "__main__":
-    # Instrument FastAPI if OpenTelemetry is available
-    if OPENTELEMETRY_AVAILABLE and tracer:
-        try:
-            FastAPIInstrumentor.instrument_app(app)
-            RequestsInstrumentor().instrument()
-            Boto3SQSInstrumentor().instrument()
-            BotocoreInstrumentor().instrument()
-            logger.info("FastAPI and AWS SDK instrumentation enabled")
-        except Exception as e:
-            logger.error(f"Failed to instrument FastAPI/AWS SDK: {e}")
+@app.get("/workflow")
+async def workflow(request: Request, sync: bool = False):
+    """Complete workflow: save to DynamoDB and send an SQS message concurrently"""
+    data_id = str(uuid.uuid4())
+    timestamp = datetime.utcnow().isoformat()
+    context = {
+        "item": {
+            "id": data_id,
+            "timestamp": timestamp,
+            "user_id": f"user-{random.randint(1000, 9999)}",
+            "created_at": timestamp,
+            "data": {
+                "message": f"Workflow data {data_id}",
+                "value": random.randint(1, 100),
+                "client_ip": request.client.host
+            },
+            "ttl": int((datetime.now(timezone.utc).timestamp() + 86400))
+        },
+        "message": {
+            "id": data_id,
+            "timestamp": timestamp,
+            "source": "workflow",
+            "content": f"Workflow message for data {data_id}",
+            "client_ip": request.client.host
+        },
+        "sync": sync
+    }
+    
+    with tracing.span("complete_workflow", {"workflow.type": "full_workflow", "workflow.steps": workflow_step_names}) as span:
+        result = await run_workflow(workflow_steps, context, tracing.tracer)
+        if span.is_recording():
+            span.set_attribute("workflow.steps_completed", ",".join(result.completed))
+            if not result.ok:
+                mark_error(span, ",".join(result.failed))
+                span.set_attribute("workflow.steps_compensated", ",".join(result.compensated))
+            if "dynamodb_save" in result.results:
+                span.set_attribute("workflow.dynamodb_write_mode", result.results["dynamodb_save"])
+            if "sqs_send" in result.results:
+                span.set_attribute("workflow.sqs_message_id", result.results["sqs_send"])
     
+    if not result.ok:
+        if error_counter:
+            error_counter.add(1, {"service": "workflow", "operation": "complete"})
+        logger.error("Workflow failed: %s %s", data_id, result.summary())
+        # A rejected write-behind submit keeps its 503 so clients back off
+        status_code = 500
+        headers = None
+        for error in result.failed.values():
+            if isinstance(error, HTTPException):
+                status_code, headers = error.status_code, error.headers
+                break
+        raise HTTPException(
+            status_code=status_code,
+            detail={"message": "Workflow error", "data_id": data_id, **result.summary()},
+            headers=headers
+        )
+    
+    if user_actions_counter:
+        user_actions_counter.add(1, {"action": "complete_workflow", "endpoint": "/workflow"})
+    if dynamodb_operations and "dynamodb_save" in result.completed:
+        dynamodb_operations.add(1, {"table": "app-table", "operation": "put_item", "status": "success"})
+    
+    logger.info("Workflow completed: %s", data_id)
+    
+    return {
+        "message": "Workflow completed successfully",
+        "data_id": data_id,
+        "workflow_time": request_elapsed(),
+        "timestamp": timestamp,
+        "steps_completed": result.completed
+    }
+
+if __name__ == "__main__":
+    # Single-process development server; containers run app.logger_app.serving
     t = threading.Thread(target=random_log, daemon=True)
     t.start()
-    uvicorn.run(app, host="0.0.0.0", port=8080) 
+    # uvicorn's loggers propagate to the pipeline; access records come from the middleware
+    uvicorn.run(create_app(), host="0.0.0.0", port=int(os.getenv("PORT", "8080")),
+                log_config=None, access_log=False, **runtime_profile.server_options())
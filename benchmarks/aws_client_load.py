@@ -0,0 +1,52 @@
+# Load test: p99 latency of the AWS-backed handlers with and without the async client layer
+#
+#   python -m benchmarks.aws_client_load --rate 500 --requests 200 --latency-ms 20
+#
+# Requests arrive on a fixed open-loop schedule (see benchmarks/load.py).
+# "blocking" calls the stand-in table directly from the coroutine, the way the
+# handlers used to call boto3. "async" goes through AsyncAwsProxy.
+import argparse
+import asyncio
+import json
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from benchmarks.load import drive_open_loop
+from benchmarks.standins import StandInDynamoTable
+
+
+async def run_load(rate=500.0, requests=200, latency=0.02, max_concurrency=32):
+    table = StandInDynamoTable(latency=latency)
+
+    async def blocking_handler(n):
+        table.put_item(Item={"id": str(n), "timestamp": "t"})
+
+    executor = AwsCallExecutor(max_concurrency)
+    async_table = AsyncAwsProxy(table, executor)
+
+    async def async_handler(n):
+        await async_table.put_item(Item={"id": str(n), "timestamp": "t"})
+
+    try:
+        return {
+            "blocking": await drive_open_loop(blocking_handler, rate, requests),
+            "async": await drive_open_loop(async_handler, rate, requests),
+        }
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AWS client layer load test")
+    parser.add_argument("--rate", type=float, default=500.0, help="arrivals per second")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in round trip")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    args = parser.parse_args()
+    results = asyncio.run(run_load(
+        args.rate, args.requests, args.latency_ms / 1000, args.max_concurrency
+    ))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# HTTP load helpers for the benchmarks that run the real server
+#
+# start_server() launches the app the way the container does. closed_loop()
+# keeps a fixed number of keep-alive connections busy for a duration; run_clients()
+# spreads those connections over several processes so the client is not the
+# bottleneck.
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.stats import summarize
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, extra_env=None, module="app.logger_app.serving"):
+    """Start the logger app on ``port`` with no AWS services or collector to talk to"""
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "AWS_REGION": os.getenv("AWS_REGION", "us-east-1"),
+        "SQS_CONSUMER_ENABLED": "false",
+        "SIMULATED_WORK_MODE": "off",
+        # Nothing listens here, like a collector that has not started yet
+        "OTEL_EXPORTER_OTLP_ENDPOINT": f"http://127.0.0.1:{free_port()}",
+        **(extra_env or {}),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", module],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(process, port, path="/health", timeout=60.0, poll_interval=0.02):
+    """Poll until ``path`` returns 200; returns the seconds waited"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(poll_interval)
+    raise TimeoutError(f"app did not answer within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _connection(port, path, deadline, latencies, errors, method="GET"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\n\r\n".encode()
+    loop = asyncio.get_running_loop()
+    try:
+        while loop.time() < deadline:
+            sent = loop.time()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if head.startswith(b"HTTP/1.1 200"):
+                latencies.append(loop.time() - sent)
+            else:
+                errors.append(head.split(b"\r\n", 1)[0])
+    finally:
+        writer.close()
+
+
+async def closed_loop(port, path="/health", connections=32, duration=5.0, method="GET"):
+    """(latencies, errors) from ``connections`` keep-alive clients running for ``duration``"""
+    latencies, errors = [], []
+    deadline = asyncio.get_running_loop().time() + duration
+    await asyncio.gather(*(
+        _connection(port, path, deadline, latencies, errors, method) for _ in range(connections)
+    ))
+    return latencies, len(errors)
+
+
+def _client_process(args):
+    return asyncio.run(closed_loop(*args))
+
+
+def run_clients(port, path="/health", connections=32, duration=5.0, processes=2, method="GET"):
+    """Summary of a closed-loop run split over ``processes`` client processes"""
+    processes = max(1, min(processes, connections))
+    per_process = max(1, connections // processes)
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        results = pool.map(_client_process, [(port, path, per_process, duration, method)] * processes)
+    latencies = [latency for result, _ in results for latency in result]
+    summary = summarize(latencies, duration)
+    summary["errors"] = sum(errors for _, errors in results)
+    return summary
@@ -0,0 +1,24 @@
+# Open-loop load driver shared by the in-process benchmarks
+import asyncio
+
+from benchmarks.stats import summarize
+
+
+async def drive_open_loop(handler, rate, requests):
+    """Call ``handler(n)`` for n in range(requests) at a fixed arrival rate.
+
+    Latency is measured from each request's scheduled arrival, so time spent
+    waiting for a blocked event loop shows up in the percentiles.
+    """
+    loop = asyncio.get_running_loop()
+    latencies = []
+    start = loop.time()
+
+    async def one(n):
+        arrival = start + n / rate
+        await asyncio.sleep(max(0.0, arrival - loop.time()))
+        await handler(n)
+        latencies.append(loop.time() - arrival)
+
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    return summarize(latencies, loop.time() - start)
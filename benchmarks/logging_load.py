@@ -0,0 +1,65 @@
+# Logging benchmark: time spent in logger.info() on the request path
+#
+#   python -m benchmarks.logging_load --records 2000 --write-delay-ms 1
+#
+# The stream sleeps on every write, like stdout when the log router applies
+# backpressure. "stream_handler" is the stdlib handler set up by basicConfig;
+# "ring_buffer" is the pipeline's RingBufferHandler.
+import argparse
+import json
+import logging
+import time
+
+from app.logger_app.logging_pipeline import JsonFormatter, RingBufferHandler
+from benchmarks.stats import summarize
+
+
+class SlowStream:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, data):
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def _measure(handler, records):
+    logger = logging.getLogger(f"benchmarks.logging_load.{type(handler).__name__}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    latencies = []
+    started = time.perf_counter()
+    for n in range(records):
+        call = time.perf_counter()
+        logger.info("Request %s handled for %s", n, "client-1")
+        latencies.append(time.perf_counter() - call)
+    summary = summarize(latencies, time.perf_counter() - started)
+    handler.close()
+    return summary
+
+
+def run(records=2000, write_delay=0.001, capacity=10000):
+    stream_handler = logging.StreamHandler(SlowStream(write_delay))
+    stream_handler.setFormatter(JsonFormatter())
+    ring_handler = RingBufferHandler(SlowStream(write_delay), capacity=capacity)
+    ring_handler.setFormatter(JsonFormatter())
+    return {
+        "stream_handler": _measure(stream_handler, records),
+        "ring_buffer": {**_measure(ring_handler, records), "dropped": ring_handler.dropped},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging pipeline benchmark")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--write-delay-ms", type=float, default=1.0, help="time each stream write blocks")
+    parser.add_argument("--capacity", type=int, default=10000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.records, args.write_delay_ms / 1000, args.capacity), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Loki push benchmark: ingested lines per second and the S3 objects they became
+#
+#   python -m benchmarks.loki_ingest --url http://loki.internal.com --streams 100 --duration 60 \
+#       --bucket serverless-log-bucket-cdk --flush
+#
+# Needs a running Loki, like loki_queries.py. --threads pushers send gzip JSON
+# batches of --batch-lines lines, spread over --streams label sets
+# ({job="loki-benchmark", stream="<n>"}), to /loki/api/v1/push for --duration
+# seconds. Lines in 204 responses count as accepted and lines in 429 responses
+# as rate limited, which is where the profile's ingestion limits show.
+#
+# Before and after, the counters Loki exposes on /metrics are read:
+# lines received by the distributors, lines discarded and chunks flushed by
+# the ingesters. In simple scalable mode the metrics come from whichever task
+# answers, so pass --metrics-url pointing at one write task. With --flush the
+# ingesters are asked to flush every open chunk at the end, and with --bucket
+# the objects under --prefix are counted before and after (plus --settle
+# seconds for the uploads to finish), which shows how many S3 objects a
+# profile's chunk size and encoding turn the same lines into.
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stats import summarize
+
+# Prometheus counters read from /metrics (summed over their label sets)
+COUNTERS = {
+    "lines_received": "loki_distributor_lines_received_total",
+    "lines_discarded": "loki_discarded_samples_total",
+    "chunks_flushed": "loki_ingester_chunks_flushed_total",
+}
+
+WORDS = ("request", "handled", "user", "item", "saved", "queue", "message", "workflow", "step", "completed",
+         "cache", "miss", "retry", "timeout", "payload", "received")
+
+
+def log_line(line_bytes, rng):
+    """A JSON line shaped like the app's access log, padded to about ``line_bytes``"""
+    line = json.dumps({
+        "level": rng.choice(("info", "info", "info", "warning", "error")),
+        "method": rng.choice(("GET", "POST")),
+        "status": rng.choice((200, 200, 200, 201, 404, 500)),
+        "latency_ms": round(rng.uniform(1, 250), 2),
+        "message": "",
+    })
+    words = []
+    while len(line) + sum(len(w) + 1 for w in words) < line_bytes:
+        words.append(rng.choice(WORDS))
+    return line.replace('"message": ""', f'"message": "{" ".join(words)}"')
+
+
+def push_payload(streams, batch_lines, line_bytes, rng):
+    """gzip-compressed push body: ``batch_lines`` lines spread over ``streams`` label sets"""
+    values = {}
+    now = time.time_ns()
+    for n in range(batch_lines):
+        values.setdefault(rng.randrange(streams), []).append([str(now + n), log_line(line_bytes, rng)])
+    body = {"streams": [{"stream": {"job": "loki-benchmark", "stream": str(s)}, "values": v}
+                        for s, v in values.items()]}
+    return gzip.compress(json.dumps(body).encode())
+
+
+def push(url, body, timeout=30.0):
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/loki/api/v1/push", data=body, method="POST",
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def read_counters(metrics_url, timeout=10.0):
+    """COUNTERS summed from a Prometheus text /metrics page"""
+    with urllib.request.urlopen(f"{metrics_url.rstrip('/')}/metrics", timeout=timeout) as response:
+        text = response.read().decode()
+    return parse_counters(text)
+
+
+def parse_counters(text):
+    totals = {name: 0.0 for name in COUNTERS}
+    metrics = {metric: name for name, metric in COUNTERS.items()}
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+        metric = line.split("{", 1)[0].split(" ", 1)[0]
+        if metric in metrics:
+            totals[metrics[metric]] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+def count_objects(bucket, prefix=""):
+    """Number and total size of the objects under ``prefix``"""
+    import boto3
+
+    count = size = 0
+    for page in boto3.client("s3").get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            count += 1
+            size += item["Size"]
+    return {"objects": count, "bytes": size}
+
+
+def flush(url, timeout=30.0):
+    """Ask the ingesters to flush every open chunk"""
+    request = urllib.request.Request(f"{url.rstrip('/')}/flush", data=b"", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def run(url, streams=100, batch_lines=1000, line_bytes=200, duration=30.0, threads=4, metrics_url=None,
+        bucket=None, prefix="", do_flush=False, settle=30.0):
+    metrics_url = metrics_url or url
+    before = read_counters(metrics_url)
+    objects_before = count_objects(bucket, prefix) if bucket else None
+
+    lock = threading.Lock()
+    outcome = {"accepted_lines": 0, "rate_limited_lines": 0, "failed_lines": 0, "pushed_bytes": 0}
+    latencies = []
+    deadline = time.monotonic() + duration
+
+    def pusher(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            body = push_payload(streams, batch_lines, line_bytes, rng)
+            started = time.perf_counter()
+            try:
+                status = push(url, body)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - started
+            key = ("accepted_lines" if status == 204 else
+                   "rate_limited_lines" if status == 429 else "failed_lines")
+            with lock:
+                outcome[key] += batch_lines
+                outcome["pushed_bytes"] += len(body)
+                latencies.append(elapsed)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(pusher, range(threads)))
+    elapsed = time.monotonic() - started
+
+    if do_flush:
+        flush(metrics_url)
+    if do_flush or bucket:
+        time.sleep(settle)
+    after = read_counters(metrics_url)
+    report = {
+        "url": url,
+        "config": {"streams": streams, "batch_lines": batch_lines, "line_bytes": line_bytes,
+                   "duration": duration, "threads": threads, "flush": do_flush},
+        "push": {**outcome, "accepted_lines_per_s": round(outcome["accepted_lines"] / elapsed, 1),
+                 "batch_latency": summarize(latencies)},
+        "loki": {name: after[name] - before[name] for name in COUNTERS},
+    }
+    if bucket:
+        objects_after = count_objects(bucket, prefix)
+        report["s3"] = {
+            "bucket": bucket,
+            "prefix": prefix,
+            "objects_written": objects_after["objects"] - objects_before["objects"],
+            "bytes_written": objects_after["bytes"] - objects_before["bytes"],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loki push throughput and the S3 objects it produces")
+    parser.add_argument("--url", default="http://loki.internal.com", help="Loki base URL")
+    parser.add_argument("--metrics-url", help="Loki to read /metrics from and flush (default --url)")
+    parser.add_argument("--streams", type=int, default=100)
+    parser.add_argument("--batch-lines", type=int, default=1000)
+    parser.add_argument("--line-bytes", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--bucket", help="count the objects written to this S3 bucket")
+    parser.add_argument("--prefix", default="", help="only count objects under this prefix")
+    parser.add_argument("--flush", action="store_true", help="flush the ingesters' open chunks at the end")
+    parser.add_argument("--settle", type=float, default=30.0, help="seconds to wait for uploads before counting")
+    args = parser.parse_args()
+    report = run(args.url, args.streams, args.batch_lines, args.line_bytes, args.duration, args.threads,
+                 args.metrics_url, args.bucket, args.prefix, args.flush, args.settle)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# LogQL query benchmark: cold and warm latency of typical dashboard queries
+#
+#   python -m benchmarks.loki_queries --url http://loki.internal.com --range 6h --repeats 5
+#
+# Unlike the other benchmarks this one needs a running Loki holding logger-app
+# logs (over the Client VPN, or a local Loki fed by the app with
+# LOG_SINK=loki). Each query in QUERIES is run as a range query over --range
+# ending at the current time, aligned to --step so repeats ask for exactly the
+# same window:
+#
+# - cold: the first run of a window. Each round moves the window back by
+#   --range, so rounds after the first reach data no earlier run has cached.
+#   The first round can still hit the caches after a previous benchmark run;
+#   restart Loki (or flush memcached) for truly cold numbers.
+# - warm: the same window again --repeats times, answered from the results
+#   cache, with the chunk and index caches behind it.
+#
+# Loki's own statistics for each request are summed from the response's
+# data.stats.cache, so the report shows which caches answered as well as the
+# latency. Compare loki_cache settings (or split_queries_by_interval and
+# max_query_parallelism, see loki_deployment.py) by running this before and
+# after a deploy.
+import argparse
+import json
+import statistics
+import time
+import urllib.parse
+import urllib.request
+
+from benchmarks.stats import percentile
+
+# name -> LogQL; labels and fields as pushed by LokiPushSink and the request middleware
+QUERIES = {
+    "error_lines": '{job="logger-app"} |= "error"',
+    "lines_by_level": 'sum by (level) (count_over_time({job="logger-app"}[5m]))',
+    "error_rate": 'sum(rate({job="logger-app"} |= "error" [5m]))',
+    "top_statuses": 'topk(5, sum by (status) (count_over_time({job="logger-app"} | json | __error__="" [5m])))',
+    "p99_latency": ('quantile_over_time(0.99, {job="logger-app"} | json | unwrap latency_ms | __error__="" [5m])'
+                    ' by (method)'),
+}
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value):
+    """"6h" -> 21600 seconds"""
+    return int(value[:-1]) * UNITS[value[-1]] if value[-1] in UNITS else int(value)
+
+
+def cache_stats(response):
+    """entriesFound/entriesRequested per cache (result, chunk, index, ...) from a query response"""
+    caches = response.get("data", {}).get("stats", {}).get("cache", {})
+    return {name: {"found": stats.get("entriesFound", 0), "requested": stats.get("entriesRequested", 0)}
+            for name, stats in caches.items()}
+
+
+def _add_cache_stats(total, stats):
+    for name, counts in stats.items():
+        entry = total.setdefault(name, {"found": 0, "requested": 0})
+        entry["found"] += counts["found"]
+        entry["requested"] += counts["requested"]
+
+
+def query_range(url, query, start, end, step, limit=1000, timeout=120.0):
+    """Seconds taken by one /loki/api/v1/query_range request, and its decoded response"""
+    params = urllib.parse.urlencode({
+        "query": query, "start": f"{start}000000000", "end": f"{end}000000000", "step": step, "limit": limit,
+    })
+    started = time.perf_counter()
+    with urllib.request.urlopen(f"{url.rstrip('/')}/loki/api/v1/query_range?{params}", timeout=timeout) as response:
+        body = response.read()
+    return time.perf_counter() - started, json.loads(body)
+
+
+def _summary(samples):
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 1) if samples else 0.0,
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+    }
+
+
+def run(url, queries=tuple(QUERIES), range_seconds=6 * 3600, step=60, rounds=3, repeats=5, now=None):
+    end = int((now or time.time()) // step * step)
+    results = {}
+    for name in queries:
+        cold, warm = [], []
+        cold_cache, warm_cache = {}, {}
+        for round_number in range(rounds):
+            window_end = end - round_number * range_seconds
+            window = (window_end - range_seconds, window_end)
+            elapsed, response = query_range(url, QUERIES[name], *window, step)
+            cold.append(elapsed)
+            _add_cache_stats(cold_cache, cache_stats(response))
+            for _ in range(repeats):
+                elapsed, response = query_range(url, QUERIES[name], *window, step)
+                warm.append(elapsed)
+                _add_cache_stats(warm_cache, cache_stats(response))
+        results[name] = {
+            "query": QUERIES[name],
+            "cold": {**_summary(cold), "cache": cold_cache},
+            "warm": {**_summary(warm), "cache": warm_cache},
+            "speedup": round(statistics.median(cold) / statistics.median(warm), 1) if warm else None,
+        }
+    return {
+        "url": url,
+        "config": {"range_seconds": range_seconds, "step": step, "rounds": rounds, "repeats": repeats},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold and warm latency of typical LogQL queries against Loki")
+    parser.add_argument("--url", default="http://loki.internal.com", help="Loki base URL")
+    parser.add_argument("--queries", nargs="+", choices=list(QUERIES), default=list(QUERIES))
+    parser.add_argument("--range", default="6h", help="query window, e.g. 1h, 6h, 1d")
+    parser.add_argument("--step", default="60s", help="query step; windows are aligned to it")
+    parser.add_argument("--rounds", type=int, default=3, help="cold windows per query, each further back")
+    parser.add_argument("--repeats", type=int, default=5, help="warm repeats per window")
+    args = parser.parse_args()
+    report = run(args.url, args.queries, parse_duration(args.range), parse_duration(args.step), args.rounds,
+                 args.repeats)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Metrics micro-benchmark: cost of the metric recording done for one request
+#
+#   python -m benchmarks.metrics_overhead --requests 200000
+#
+# "per_endpoint" is what the handlers used to do: time.time() around the
+# handler, a fresh attribute dict for every counter add and histogram record,
+# and the same again for the AWS call. "middleware" is RequestMetrics as called
+# by RequestContextMiddleware plus the AsyncAwsProxy hook: interned attribute
+# sets, perf_counter, and a request count that is an integer increment read by
+# an observable counter at export time. Both record into a real SDK
+# MeterProvider, whose attribute validation is most of the cost.
+import argparse
+import functools
+import json
+import time
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from app.logger_app.middleware import RequestMetrics
+
+
+class Route:
+    path = "/get-data/{data_id}"
+
+
+def _instruments():
+    meter = MeterProvider(metric_readers=[InMemoryMetricReader()]).get_meter("benchmark")
+    return (
+        meter.create_counter("http_requests_total"),
+        meter.create_histogram("http_request_duration_seconds"),
+        meter.create_histogram("aws_service_duration_seconds"),
+    )
+
+
+def per_endpoint(requests):
+    counter, histogram, aws_latency = _instruments()
+    for _ in range(requests):
+        start_time = time.time()
+        counter.add(1, {"method": "GET", "endpoint": "/get-data/{data_id}"})
+        aws_latency.record(time.time() - start_time, {"service": "dynamodb", "operation": "query"})
+        histogram.record(time.time() - start_time, {"method": "GET", "endpoint": "/get-data/{data_id}"})
+
+
+def middleware(requests):
+    _, histogram, aws_latency = _instruments()
+    metrics = RequestMetrics(histogram)
+
+    @functools.lru_cache(maxsize=None)
+    def aws_call_attributes(service, operation):
+        return {"service": service, "operation": operation}
+
+    scope = {"type": "http", "method": "GET", "route": Route()}
+    for _ in range(requests):
+        start = time.perf_counter()
+        aws_latency.record(time.perf_counter() - start, aws_call_attributes("dynamodb", "query"))
+        metrics.record(scope, 200, time.perf_counter() - start)
+
+
+def _ns_per_request(fn, requests, repeats):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(requests)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / requests * 1e9)
+
+
+def run(requests=200000, repeats=3):
+    before = _ns_per_request(per_endpoint, requests, repeats)
+    after = _ns_per_request(middleware, requests, repeats)
+    return {
+        "requests": requests,
+        "per_endpoint_ns_per_request": before,
+        "middleware_ns_per_request": after,
+        "saved_pct": round((before - after) / before * 100, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metric recording cost per request")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
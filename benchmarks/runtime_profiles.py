@@ -0,0 +1,55 @@
+# Throughput benchmark: requests per second for each runtime profile
+#
+#   python -m benchmarks.runtime_profiles --profiles default performance --duration 10
+#
+# Each run starts app.logger_app.serving with LOGGER_RUNTIME_PROFILE set and
+# one worker, then drives every path with keep-alive clients from separate
+# processes. The resolved loop, HTTP parser and JSON library are reported next
+# to the numbers, since "performance" falls back to the defaults for any extra
+# that is not installed (pip install -r requirements-performance.txt).
+import argparse
+import json
+import os
+
+from app.logger_app.runtime_profile import RuntimeProfile
+from benchmarks.http_load import free_port, run_clients, start_server, stop_server, wait_until_ready
+
+
+def run(profiles=("default", "performance"), paths=("/health", "/"), connections=64, duration=10.0,
+        client_processes=2, workers=1):
+    results = {}
+    for name in profiles:
+        profile = RuntimeProfile(name)
+        result = {"runtime": profile.describe()}
+        port = free_port()
+        process = start_server(port, {
+            "LOGGER_RUNTIME_PROFILE": name,
+            "LOGGER_WORKERS": str(workers),
+            "LOG_ACCESS": os.getenv("LOG_ACCESS", "false"),
+        })
+        try:
+            wait_until_ready(process, port)
+            for path in paths:
+                result[path] = run_clients(port, path, connections, duration, client_processes)
+        finally:
+            stop_server(process)
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logger app runtime profile benchmark")
+    parser.add_argument("--profiles", nargs="+", default=["default", "performance"])
+    parser.add_argument("--paths", nargs="+", default=["/health", "/"])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per profile and path")
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run(
+        args.profiles, args.paths, args.connections, args.duration, args.client_processes, args.workers
+    ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
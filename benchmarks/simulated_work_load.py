@@ -0,0 +1,49 @@
+# Load test: blocking time.sleep work simulation versus SimulatedWork
+#
+#   python -m benchmarks.simulated_work_load --rate 100 --requests 200 --mode sleep
+#
+# Uses the same default distribution as index() (uniform 100-500 ms).
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.logger_app.simulated_work import SimulatedWork, UniformLatency, shutdown_cpu_pool
+from benchmarks.load import drive_open_loop
+
+
+async def run_load(rate=100.0, requests=200, mode="sleep", low=0.1, high=0.5):
+    async def blocking_handler(n):
+        time.sleep(random.uniform(low, high))
+
+    work = SimulatedWork(UniformLatency(low, high), mode)
+
+    async def simulated_handler(n):
+        await work.run()
+
+    try:
+        return {
+            "time.sleep": await drive_open_loop(blocking_handler, rate, requests),
+            f"simulated_{mode}": await drive_open_loop(simulated_handler, rate, requests),
+        }
+    finally:
+        shutdown_cpu_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated work load test")
+    parser.add_argument("--rate", type=float, default=100.0, help="arrivals per second")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--mode", choices=("sleep", "cpu"), default="sleep")
+    parser.add_argument("--min-ms", type=float, default=100.0)
+    parser.add_argument("--max-ms", type=float, default=500.0)
+    args = parser.parse_args()
+    results = asyncio.run(run_load(
+        args.rate, args.requests, args.mode, args.min_ms / 1000, args.max_ms / 1000
+    ))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Network stand-ins for the services the logger app talks to
+#
+# The benchmark suite runs the real server, so the in-memory stand-ins in
+# standins.py are put behind the wire protocols boto3, the OTLP exporter and
+# LokiPushSink speak:
+#
+# - AwsStandInServer: SQS and DynamoDB over their JSON protocols (X-Amz-Target)
+#   on one HTTP port. Point the app at it with AWS_ENDPOINT_URL_SQS and
+#   AWS_ENDPOINT_URL_DYNAMODB; see aws_environment().
+# - OtlpStandIn: an OTLP/gRPC collector that accepts and counts spans and
+#   metric data points.
+# - LokiStandIn: the Loki push API, counting streams, lines and bytes.
+#
+# Each runs on background threads in the calling process and binds to
+# 127.0.0.1 on a free port unless one is given.
+import gzip
+import json
+import re
+import threading
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.standins import StandInDynamoResource, StandInSqsClient
+
+ACCOUNT_ID = "000000000000"
+
+
+def _snake_case(operation):
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", operation).lower()
+
+
+class _HttpStandIn:
+    """A ThreadingHTTPServer on a background thread"""
+
+    def __init__(self, handler, port=0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.server.standin = self
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _AwsHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real endpoints, so boto3 reuses its connections.
+    # Headers and body are separate writes; without TCP_NODELAY the body
+    # waits for a delayed ACK
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        service, _, operation = self.headers.get("X-Amz-Target", "").partition(".")
+        try:
+            status, response = 200, self.server.standin.dispatch(service, operation, json.loads(body or b"{}"))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            status, response = 400, {"__type": "ValidationException", "message": f"{operation}: {e}"}
+        payload = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class AwsStandInServer(_HttpStandIn):
+    """SQS and DynamoDB on one port, backed by StandInSqsClient and StandInDynamoResource"""
+
+    def __init__(self, latency=0.0, port=0):
+        super().__init__(_AwsHandler, port)
+        self.sqs = StandInSqsClient(latency)
+        self.dynamodb = StandInDynamoResource(latency)
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+        self._deserialize = TypeDeserializer().deserialize
+        self._serialize = TypeSerializer().serialize
+
+    def queue_url(self, name="logger-app-messages"):
+        return f"{self.url}/{ACCOUNT_ID}/{name}"
+
+    def aws_environment(self, queue_name="logger-app-messages", table_name="logger-app-data"):
+        """Environment that points the app's boto3 clients here"""
+        return {
+            "AWS_ENDPOINT_URL_SQS": self.url,
+            "AWS_ENDPOINT_URL_DYNAMODB": self.url,
+            "AWS_ACCESS_KEY_ID": "standin",
+            "AWS_SECRET_ACCESS_KEY": "standin",
+            "SQS_MESSAGE_QUEUE_URL": self.queue_url(queue_name),
+            "DYNAMODB_APP_TABLE": table_name,
+        }
+
+    def dispatch(self, service, operation, params):
+        if service == "AmazonSQS":
+            return getattr(self.sqs, _snake_case(operation))(**params)
+        if service.startswith("DynamoDB_"):
+            return self._dynamodb(_snake_case(operation), params)
+        raise ValueError(f"unknown service {service!r}")
+
+    def _to_python(self, item):
+        return {k: self._deserialize(v) for k, v in item.items()}
+
+    def _to_wire(self, item):
+        return {k: self._serialize(v) for k, v in item.items()}
+
+    def _dynamodb(self, operation, params):
+        if operation == "batch_write_item":
+            request_items = {
+                table: [{"PutRequest": {"Item": self._to_python(r["PutRequest"]["Item"])}} for r in requests]
+                for table, requests in params["RequestItems"].items()
+            }
+            return self.dynamodb.batch_write_item(RequestItems=request_items)
+
+        table = self.dynamodb.Table(params.pop("TableName"))
+        for key in ("Item", "Key", "ExpressionAttributeValues", "ExclusiveStartKey"):
+            if key in params:
+                params[key] = self._to_python(params[key])
+        response = getattr(table, operation)(**params)
+        if "Item" in response:
+            response["Item"] = self._to_wire(response["Item"])
+        if "Items" in response:
+            response["Items"] = [self._to_wire(item) for item in response["Items"]]
+            response["Count"] = len(response["Items"])
+        if "LastEvaluatedKey" in response:
+            response["LastEvaluatedKey"] = self._to_wire(response["LastEvaluatedKey"])
+        return json.loads(json.dumps(response, default=str))
+
+    def stats(self):
+        return {
+            "sqs_calls": dict(self.sqs.calls),
+            "dynamodb_calls": {
+                **self.dynamodb.calls,
+                **{op: n for table in self.dynamodb.tables.values() for op, n in table.calls.items()},
+            },
+        }
+
+
+class _LokiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.server.standin.record(json.loads(body), len(body))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class LokiStandIn(_HttpStandIn):
+    """Accepts Loki push requests (JSON, optionally gzip-compressed)"""
+
+    def __init__(self, port=0):
+        super().__init__(_LokiHandler, port)
+        self.pushes = 0
+        self.streams = 0
+        self.lines = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def push_url(self):
+        return f"{self.url}/loki/api/v1/push"
+
+    def record(self, payload, size):
+        streams = payload.get("streams", [])
+        with self._lock:
+            self.pushes += 1
+            self.streams += len(streams)
+            self.lines += sum(len(stream.get("values", [])) for stream in streams)
+            self.bytes += size
+
+    def stats(self):
+        return {"pushes": self.pushes, "streams": self.streams, "lines": self.lines, "bytes": self.bytes}
+
+
+class OtlpStandIn:
+    """OTLP/gRPC collector that counts what it receives"""
+
+    def __init__(self, port=0):
+        import grpc
+        from opentelemetry.proto.collector.metrics.v1 import metrics_service_pb2, metrics_service_pb2_grpc
+        from opentelemetry.proto.collector.trace.v1 import trace_service_pb2, trace_service_pb2_grpc
+
+        self.spans = 0
+        self.data_points = 0
+        self._lock = threading.Lock()
+        standin = self
+
+        class TraceService(trace_service_pb2_grpc.TraceServiceServicer):
+            def Export(self, request, context):
+                count = sum(len(scope.spans) for rs in request.resource_spans for scope in rs.scope_spans)
+                with standin._lock:
+                    standin.spans += count
+                return trace_service_pb2.ExportTraceServiceResponse()
+
+        class MetricsService(metrics_service_pb2_grpc.MetricsServiceServicer):
+            def Export(self, request, context):
+                count = 0
+                for rm in request.resource_metrics:
+                    for scope in rm.scope_metrics:
+                        for metric in scope.metrics:
+                            data = getattr(metric, metric.WhichOneof("data"))
+                            count += len(data.data_points)
+                with standin._lock:
+                    standin.data_points += count
+                return metrics_service_pb2.ExportMetricsServiceResponse()
+
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        trace_service_pb2_grpc.add_TraceServiceServicer_to_server(TraceService(), self.server)
+        metrics_service_pb2_grpc.add_MetricsServiceServicer_to_server(MetricsService(), self.server)
+        self.port = self.server.add_insecure_port(f"127.0.0.1:{port}")
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def stats(self):
+        return {"spans": self.spans, "metric_data_points": self.data_points}
@@ -0,0 +1,171 @@
+# Local stand-ins for the AWS services used by the logger app
+#
+# They keep state in memory and sleep for a fixed latency on every call, which
+# is enough to reproduce the blocking behaviour of a real boto3 round trip.
+import threading
+import time
+import uuid
+
+
+class StandInSqsClient:
+    """In-memory replacement for a boto3 SQS client"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self.deleted = []
+        self._messages = []
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+
+    def _call(self, operation):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, **kwargs):
+        self._call("send_message")
+        message_id = str(uuid.uuid4())
+        with self._lock:
+            self._messages.append({
+                "MessageId": message_id,
+                "ReceiptHandle": str(uuid.uuid4()),
+                "Body": MessageBody,
+                "MessageAttributes": MessageAttributes or {}
+            })
+            self._arrived.notify_all()
+        return {"MessageId": message_id}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._call("send_message_batch")
+        successful = []
+        with self._lock:
+            for entry in Entries:
+                message_id = str(uuid.uuid4())
+                self._messages.append({
+                    "MessageId": message_id,
+                    "ReceiptHandle": str(uuid.uuid4()),
+                    "Body": entry["MessageBody"],
+                    "MessageAttributes": entry.get("MessageAttributes", {})
+                })
+                successful.append({"Id": entry["Id"], "MessageId": message_id})
+            self._arrived.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, WaitTimeSeconds=0, **kwargs):
+        self._call("receive_message")
+        with self._arrived:
+            # Long polling: wait for a message to arrive, up to WaitTimeSeconds
+            self._arrived.wait_for(lambda: self._messages, timeout=WaitTimeSeconds)
+            messages = self._messages[:MaxNumberOfMessages]
+            del self._messages[:MaxNumberOfMessages]
+        return {"Messages": messages} if messages else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._call("delete_message")
+        with self._lock:
+            self.deleted.append(ReceiptHandle)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._call("delete_message_batch")
+        with self._lock:
+            self.deleted.extend(entry["ReceiptHandle"] for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self._call("change_message_visibility_batch")
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+
+class StandInDynamoTable:
+    """In-memory replacement for a boto3 DynamoDB Table resource"""
+
+    def __init__(self, table_name="logger-app-data", latency=0.0):
+        self.table_name = table_name
+        self.latency = latency
+        self.calls = {}
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_item(self, Item, **kwargs):
+        self._call("put_item")
+        with self._lock:
+            self.items[(Item["id"], Item["timestamp"])] = Item
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self._call("get_item")
+        with self._lock:
+            item = self.items.get((Key["id"], Key["timestamp"]))
+        return {"Item": item} if item else {}
+
+    def delete_item(self, Key, **kwargs):
+        self._call("delete_item")
+        with self._lock:
+            self.items.pop((Key["id"], Key["timestamp"]), None)
+        return {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+              IndexName=None, ScanIndexForward=True, Limit=None, ExclusiveStartKey=None, **kwargs):
+        """Partition-key equality queries ("name = :value") on the table or the user-index GSI"""
+        self._call("query")
+        name, placeholder = (part.strip() for part in KeyConditionExpression.split("="))
+        name = (ExpressionAttributeNames or {}).get(name, name)
+        value = ExpressionAttributeValues[placeholder]
+        if IndexName == "user-index":
+            key_names = ("user_id", "created_at", "id", "timestamp")
+        else:
+            key_names = ("id", "timestamp")
+        with self._lock:
+            matches = [item for item in self.items.values() if item.get(name) == value]
+        matches.sort(key=lambda item: item[key_names[1]], reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            position = [tuple(item[k] for k in key_names) for item in matches]
+            start = position.index(tuple(ExclusiveStartKey[k] for k in key_names)) + 1
+            matches = matches[start:]
+        response = {"Items": matches[:Limit] if Limit else matches}
+        if Limit and len(matches) > Limit:
+            last = matches[Limit - 1]
+            response["LastEvaluatedKey"] = {k: last[k] for k in key_names}
+        return response
+
+
+class StandInDynamoResource:
+    """In-memory replacement for a boto3 DynamoDB service resource"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def Table(self, name):
+        with self._lock:
+            if name not in self.tables:
+                self.tables[name] = StandInDynamoTable(name, self.latency)
+            return self.tables[name]
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            self.calls["batch_write_item"] = self.calls.get("batch_write_item", 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            with table._lock:
+                for request in requests:
+                    if "DeleteRequest" in request:
+                        key = request["DeleteRequest"]["Key"]
+                        table.items.pop((key["id"], key["timestamp"]), None)
+                        continue
+                    item = request["PutRequest"]["Item"]
+                    table.items[(item["id"], item["timestamp"])] = item
+        return {"UnprocessedItems": {}}
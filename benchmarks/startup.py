@@ -0,0 +1,48 @@
+# Startup benchmark: time from process start to the first 200 on /
+#
+#   python -m benchmarks.startup --runs 3
+#
+# Starts the logger app the way the container does, with no collector
+# listening, which is the situation during an ECS task start before the ADOT
+# sidecar is up, and polls / until it answers.
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.http_load import free_port, start_server, stop_server, wait_until_ready
+from benchmarks.stats import percentile
+
+
+def measure_startup(timeout=60.0, extra_env=None):
+    """Seconds from spawning the app until GET / returns 200"""
+    port = free_port()
+    started = time.perf_counter()
+    process = start_server(port, {"LOGGER_WORKERS": "1", **(extra_env or {})})
+    try:
+        wait_until_ready(process, port, path="/", timeout=timeout)
+        return time.perf_counter() - started
+    finally:
+        stop_server(process)
+
+
+def run(runs=3, timeout=60.0):
+    samples = [measure_startup(timeout) * 1000 for _ in range(runs)]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 1),
+        "p99_ms": round(percentile(samples, 99), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logger app startup benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run limit in seconds")
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.timeout), indent=2))
+
+
+if __name__ == "__main__":
+    main()
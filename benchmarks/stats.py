@@ -0,0 +1,24 @@
+# Latency summary helpers shared by the benchmarks
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed=None):
+    """p50/p99/max in milliseconds, plus throughput when elapsed seconds are given"""
+    summary = {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(latencies) / elapsed, 1)
+    return summary
@@ -0,0 +1,229 @@
+# End-to-end benchmark suite: every endpoint at several concurrency levels
+#
+#   python -m benchmarks.suite --concurrency 1 16 64 --duration 5 --output results.json
+#   python -m benchmarks.suite --baseline benchmarks/baseline.json
+#   python -m benchmarks.suite --baseline benchmarks/baseline.json --save-baseline
+#
+# Runs fully offline: SQS and DynamoDB, the OTLP collector and the Loki push
+# API are local stand-ins (standin_servers.py), each AWS call taking
+# --aws-latency-ms. The app is started as in the container
+# (app.logger_app.serving) with logs pushed to the Loki stand-in, and each
+# endpoint is driven by keep-alive clients from separate processes. For every
+# endpoint and concurrency level the results record throughput, p50/p99
+# latency, errors and the app's resident memory (all worker processes), then
+# what the stand-ins received.
+#
+# With --baseline the run is compared against a stored results file: a
+# throughput drop beyond --max-throughput-drop or a p99 increase beyond
+# --max-p99-increase is a regression and the exit status is 1. Baselines are
+# only comparable on the same machine with the same options, which are stored
+# in the file's "config".
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from benchmarks.http_load import free_port, run_clients, start_server, stop_server, wait_until_ready
+from benchmarks.standin_servers import AwsStandInServer, LokiStandIn, OtlpStandIn
+
+SEED_ITEM_ID = "benchmark-item"
+SEED_USER_ID = "benchmark-user"
+
+# name -> (method, path)
+ENDPOINTS = {
+    "index": ("GET", "/"),
+    "health": ("GET", "/health"),
+    "test_telemetry": ("GET", "/test-telemetry"),
+    "send_message": ("POST", "/send-message"),
+    "receive_messages": ("GET", "/receive-messages"),
+    "consumer_stats": ("GET", "/consumer-stats"),
+    "save_data": ("POST", "/save-data"),
+    "get_data": ("GET", f"/get-data/{SEED_ITEM_ID}"),
+    "user_items": ("GET", f"/users/{SEED_USER_ID}/items"),
+    "workflow": ("GET", "/workflow"),
+}
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def process_tree_rss(pid):
+    """Resident memory of ``pid`` and its descendants in bytes (None off Linux)"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            if current == pid:
+                return None
+            continue
+        pending.extend(_children(current))
+    return total
+
+
+class RssSampler:
+    """Peak resident memory of a process tree, sampled on a thread"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_tree_rss(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def _mb(value):
+    return None if value is None else round(value / 2**20, 1)
+
+
+def seed(aws, table_name="logger-app-data", items=25):
+    """Items for /get-data and /users/{user_id}/items to find"""
+    table = aws.dynamodb.Table(table_name)
+    for n in range(items):
+        timestamp = f"2025-01-01T00:00:{n:02d}"
+        table.items[(SEED_ITEM_ID if n == 0 else f"{SEED_ITEM_ID}-{n}", timestamp)] = {
+            "id": SEED_ITEM_ID if n == 0 else f"{SEED_ITEM_ID}-{n}",
+            "timestamp": timestamp,
+            "user_id": SEED_USER_ID,
+            "created_at": timestamp,
+            "data": {"message": f"Seeded item {n}", "value": n},
+        }
+
+
+def run(endpoints=tuple(ENDPOINTS), concurrency=(1, 16, 64), duration=5.0, client_processes=2, workers=1,
+        aws_latency_ms=5.0, extra_env=None):
+    aws = AwsStandInServer(aws_latency_ms / 1000).start()
+    otlp = OtlpStandIn().start()
+    loki = LokiStandIn().start()
+    seed(aws)
+    env = {
+        **aws.aws_environment(),
+        "OTEL_EXPORTER_OTLP_ENDPOINT": otlp.endpoint,
+        "LOG_SINK": "loki",
+        "LOKI_PUSH_URL": loki.push_url,
+        "LOKI_SPILL_DIR": os.path.join(os.getenv("TMPDIR", "/tmp"), f"benchmark-loki-spill-{os.getpid()}"),
+        "LOGGER_WORKERS": str(workers),
+        "SQS_CONSUMER_ENABLED": "true",
+        **(extra_env or {}),
+    }
+    port = free_port()
+    process = start_server(port, env)
+    results = {}
+    try:
+        wait_until_ready(process, port)
+        for name in endpoints:
+            method, path = ENDPOINTS[name]
+            results[name] = {}
+            for connections in concurrency:
+                with RssSampler(process.pid) as rss:
+                    summary = run_clients(port, path, connections, duration, client_processes, method)
+                summary["rss_mb"] = _mb(process_tree_rss(process.pid))
+                summary["peak_rss_mb"] = _mb(rss.peak)
+                results[name][str(connections)] = summary
+    finally:
+        stop_server(process)
+        aws.stop()
+        otlp.stop()
+        loki.stop()
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {
+            "concurrency": list(concurrency),
+            "duration": duration,
+            "client_processes": client_processes,
+            "workers": workers,
+            "aws_latency_ms": aws_latency_ms,
+            "env": extra_env or {},
+        },
+        "results": results,
+        "standins": {**aws.stats(), **otlp.stats(), "loki": loki.stats()},
+    }
+
+
+def compare(current, baseline, max_throughput_drop=0.15, max_p99_increase=0.25):
+    """Per endpoint and concurrency changes against ``baseline``, and the regressions among them"""
+    changes = {}
+    regressions = []
+    for name, levels in current["results"].items():
+        for connections, summary in levels.items():
+            base = baseline.get("results", {}).get(name, {}).get(connections)
+            if not base:
+                continue
+            throughput = (summary["throughput_rps"] / base["throughput_rps"] - 1) if base["throughput_rps"] else 0.0
+            p99 = (summary["p99_ms"] / base["p99_ms"] - 1) if base["p99_ms"] else 0.0
+            change = {"throughput_change_pct": round(throughput * 100, 1), "p99_change_pct": round(p99 * 100, 1)}
+            changes.setdefault(name, {})[connections] = change
+            if throughput < -max_throughput_drop or p99 > max_p99_increase or summary["errors"] > base["errors"]:
+                regressions.append(f"{name} @ {connections}: {change}, errors {base['errors']} -> {summary['errors']}")
+    return {"changes": changes, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark suite for the logger app")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per endpoint and concurrency level")
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--aws-latency-ms", type=float, default=5.0)
+    parser.add_argument("--env", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="extra app settings, e.g. LOGGER_RUNTIME_PROFILE=performance")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="stored results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.15)
+    parser.add_argument("--max-p99-increase", type=float, default=0.25)
+    args = parser.parse_args()
+
+    extra_env = dict(pair.split("=", 1) for pair in args.env)
+    report = run(args.endpoints, args.concurrency, args.duration, args.client_processes, args.workers,
+                 args.aws_latency_ms, extra_env)
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.max_throughput_drop, args.max_p99_increase)
+
+    text = json.dumps(report, indent=2)
+    for path in filter(None, (args.output, args.baseline if args.save_baseline else None)):
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if report.get("comparison", {}).get("regressions"):
+        print("Regressions against %s:\n  %s" % (args.baseline, "\n  ".join(report["comparison"]["regressions"])),
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Trace sampling benchmark: span volume and export CPU with and without sampling
+#
+#   python -m benchmarks.trace_sampling --requests 20000 --routes "/health=0,/=0.1"
+#
+# Each simulated request creates the spans a real one does: the FastAPI server
+# span (with http.route), a manual handler span and two botocore client spans.
+# Exported spans are encoded to OTLP protobuf, as the gRPC exporter would, and
+# the CPU time of span creation plus encoding is reported. "tail_kept" is how
+# many of the exported traces the ADOT tail sampler would keep (errors and
+# traces slower than --slow-ms), i.e. what reaches X-Ray.
+import argparse
+import json
+import random
+import time
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult, SimpleSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON, ParentBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.logger_app.telemetry import RouteRatioSampler, parse_route_ratios
+
+# route -> share of requests
+ROUTE_MIX = {"/health": 0.3, "/": 0.4, "/get-data/{data_id}": 0.2, "/workflow": 0.1}
+
+
+class EncodingExporter(SpanExporter):
+    """Encodes spans to OTLP protobuf in batches and counts them"""
+
+    def __init__(self, batch_size=512):
+        self.batch_size = batch_size
+        self.spans = 0
+        self.bytes = 0
+        self._pending = []
+
+    def export(self, spans):
+        self._pending.extend(spans)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return SpanExportResult.SUCCESS
+
+    def flush(self):
+        if self._pending:
+            self.spans += len(self._pending)
+            self.bytes += len(encode_spans(self._pending).SerializeToString())
+            self._pending = []
+
+    def shutdown(self):
+        self.flush()
+
+
+def _simulate(sampler, requests, slow_ms, error_rate, seed):
+    rng = random.Random(seed)
+    exporter = EncodingExporter()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("benchmark")
+    routes, weights = list(ROUTE_MIX), list(ROUTE_MIX.values())
+    traces = tail_kept = 0
+
+    started = time.process_time()
+    for _ in range(requests):
+        route = rng.choices(routes, weights)[0]
+        latency_ms = rng.lognormvariate(5.0, 0.8)
+        failed = rng.random() < error_rate
+        with tracer.start_as_current_span(f"GET {route}", kind=SpanKind.SERVER,
+                                          attributes={"http.route": route, "http.method": "GET"}) as span:
+            with tracer.start_as_current_span("handler"):
+                for operation in ("Query", "SendMessageBatch"):
+                    with tracer.start_as_current_span(operation, kind=SpanKind.CLIENT,
+                                                      attributes={"rpc.method": operation}):
+                        pass
+            if failed:
+                span.set_status(Status(StatusCode.ERROR))
+            if span.is_recording():
+                traces += 1
+                tail_kept += failed or latency_ms > slow_ms
+    provider.shutdown()
+    cpu = time.process_time() - started
+
+    return {
+        "traces_exported": traces,
+        "spans_exported": exporter.spans,
+        "otlp_bytes": exporter.bytes,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+        "tail_kept": tail_kept,
+    }
+
+
+def run(requests=20000, routes="/health=0,/=0.1", default_ratio=1.0, slow_ms=1000, error_rate=0.02, seed=1):
+    sampled = ParentBased(RouteRatioSampler(parse_route_ratios(routes), default_ratio))
+    return {
+        "requests": requests,
+        "always_on": _simulate(ParentBased(ALWAYS_ON), requests, slow_ms, error_rate, seed),
+        "route_ratio": {"routes": routes, **_simulate(sampled, requests, slow_ms, error_rate, seed)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace sampling benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--routes", default="/health=0,/=0.1", help="OTEL_TRACES_SAMPLER_ROUTES value")
+    parser.add_argument("--default-ratio", type=float, default=1.0)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.routes, args.default_ratio, args.slow_ms, args.error_rate), indent=2))
+
+
+if __name__ == "__main__":
+    main()
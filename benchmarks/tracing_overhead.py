@@ -0,0 +1,67 @@
+# Tracing facade micro-benchmark: cost of a handler span per request
+#
+#   python -m benchmarks.tracing_overhead --requests 200000
+#
+# "no_span" is the handler body alone, as the old untraced branches ran it.
+# "facade_disabled" wraps it in Tracing(None).span(), the path taken when
+# telemetry is off; "facade_enabled" and "facade_unsampled" use a real SDK
+# tracer that records, or drops, every span (no exporter attached).
+import argparse
+import json
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+
+from app.logger_app.tracing import Tracing
+
+
+def _body(client_host):
+    # Stands in for the handler's own work besides awaiting I/O
+    return {"message": "Message sent successfully", "client": client_host}
+
+
+def no_span(requests):
+    for _ in range(requests):
+        _body("10.0.0.1")
+
+
+def _with_facade(tracing, requests):
+    for _ in range(requests):
+        with tracing.span("send_sqs_message", {"sqs.queue_url": "queue-url", "sqs.message_id": "id"}) as span:
+            _body("10.0.0.1")
+            span.set_attribute("sqs.message_id_response", "sqs-id")
+
+
+def _ns_per_request(fn, requests, repeats):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(requests)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / requests * 1e9)
+
+
+def run(requests=200000, repeats=3):
+    enabled = Tracing(TracerProvider(sampler=ALWAYS_ON).get_tracer("benchmark"))
+    unsampled = Tracing(TracerProvider(sampler=ALWAYS_OFF).get_tracer("benchmark"))
+    return {
+        "requests": requests,
+        "no_span_ns": _ns_per_request(no_span, requests, repeats),
+        "facade_disabled_ns": _ns_per_request(lambda n: _with_facade(Tracing(None), n), requests, repeats),
+        "facade_unsampled_ns": _ns_per_request(lambda n: _with_facade(unsampled, n), requests // 10, repeats),
+        "facade_enabled_ns": _ns_per_request(lambda n: _with_facade(enabled, n), requests // 10, repeats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracing facade overhead per request")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
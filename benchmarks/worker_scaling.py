@@ -0,0 +1,41 @@
+# Throughput benchmark: the serving mode with 1..N worker processes
+#
+#   python -m benchmarks.worker_scaling --workers 1 2 4 --duration 10
+#
+# Each run starts app.logger_app.serving with LOGGER_WORKERS set and drives
+# /health with keep-alive clients from separate processes. Scaling is bounded
+# by the CPUs of the machine running the benchmark, clients included.
+import argparse
+import json
+
+from benchmarks.http_load import free_port, run_clients, start_server, stop_server, wait_until_ready
+
+
+def run(workers=(1, 2, 4), path="/health", connections=64, duration=10.0, client_processes=2):
+    results = {}
+    for count in workers:
+        port = free_port()
+        process = start_server(port, {"LOGGER_WORKERS": str(count)})
+        try:
+            wait_until_ready(process, port)
+            results[str(count)] = run_clients(port, path, connections, duration, client_processes)
+        finally:
+            stop_server(process)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logger app worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--client-processes", type=int, default=2)
+    args = parser.parse_args()
+    print(json.dumps(run(
+        args.workers, args.path, args.connections, args.duration, args.client_processes
+    ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Load test: /workflow latency with the steps run one after the other vs concurrently
+#
+#   python -m benchmarks.workflow_load --rate 200 --requests 200 --latency-ms 20
+#
+# Both variants save an item to the stand-in table and send a message to the
+# stand-in queue through AsyncAwsProxy; only the step scheduling differs.
+import argparse
+import asyncio
+import json
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from app.logger_app.workflow import WorkflowStep, run_workflow
+from benchmarks.load import drive_open_loop
+from benchmarks.standins import StandInDynamoTable, StandInSqsClient
+
+QUEUE_URL = "http://sqs.local/queue"
+
+
+async def run_load(rate=200.0, requests=200, latency=0.02, max_concurrency=64):
+    executor = AwsCallExecutor(max_concurrency)
+    table = AsyncAwsProxy(StandInDynamoTable(latency=latency), executor)
+    sqs = AsyncAwsProxy(StandInSqsClient(latency=latency), executor)
+
+    async def save(context):
+        await table.put_item(Item={"id": str(context["n"]), "timestamp": "t"})
+
+    async def send(context):
+        return (await sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=str(context["n"])))["MessageId"]
+
+    steps = [WorkflowStep("dynamodb_save", save), WorkflowStep("sqs_send", send)]
+
+    async def sequential_handler(n):
+        await save({"n": n})
+        await send({"n": n})
+
+    async def concurrent_handler(n):
+        result = await run_workflow(steps, {"n": n})
+        assert result.ok
+
+    try:
+        return {
+            "sequential": await drive_open_loop(sequential_handler, rate, requests),
+            "concurrent": await drive_open_loop(concurrent_handler, rate, requests),
+        }
+    finally:
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow step scheduling load test")
+    parser.add_argument("--rate", type=float, default=200.0, help="arrivals per second")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in round trip")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    args = parser.parse_args()
+    results = asyncio.run(run_load(
+        args.rate, args.requests, args.latency_ms / 1000, args.max_concurrency
+    ))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import importlib
+import logging
+import os
+from unittest import mock
+
+import aws_cdk as core
+import pytest
+
+from app.modules.vpc_stack import VpcStack
+from app.modules.sg_stack import SgStack
+from app.modules.efs_stack import EfsStack
+from app.modules.efs_access_points_stack import EfsAccessPointsStack
+from app.modules.s3_stack import S3Stack
+from app.modules.ecr_stack import EcrStack
+from app.modules.alb_stack import AlbStack
+from app.modules.ecs_stack import EcsStack
+from app.modules.amp_stack import AmpStack
+from app.modules.sqs_stack import SqsStack
+from app.modules.dynamodb_stack import DynamoDbStack
+
+
+def _build_stacks(context=None):
+    """The stacks from app.py that EcsStack depends on, with optional CDK context"""
+    app = core.App(context=context or {})
+    stacks = {"app": app}
+    stacks["vpc"] = VpcStack(app, "VpcStack")
+    stacks["sg"] = SgStack(app, "SgStack", vpc=stacks["vpc"].vpc)
+    stacks["s3"] = S3Stack(app, "S3Stack")
+    stacks["ecr"] = EcrStack(app, "EcrStack")
+    stacks["alb"] = AlbStack(app, "AlbStack", vpc=stacks["vpc"].vpc, alb_sg=stacks["sg"].alb_sg,
+                             internal_alb_sg=stacks["sg"].internal_alb_sg)
+    stacks["efs"] = EfsStack(app, "EfsStack", vpc=stacks["vpc"].vpc, sg=stacks["sg"].efs_sg)
+    stacks["efs_ap"] = EfsAccessPointsStack(app, "EfsAccessPointsStack", file_system=stacks["efs"].efs,
+                                           grafana_file_system=stacks["efs"].grafana_efs)
+    stacks["amp"] = AmpStack(app, "AmpStack")
+    stacks["sqs"] = SqsStack(app, "SqsStack")
+    stacks["dynamodb"] = DynamoDbStack(app, "DynamoDbStack")
+    stacks["ecs"] = EcsStack(
+        app, "EcsStack",
+        vpc=stacks["vpc"].vpc,
+        ecs_sg=stacks["sg"].ecs_sg,
+        efs=stacks["efs"].efs,
+        grafana_efs=stacks["efs"].grafana_efs,
+        efs_grafana_ap=stacks["efs_ap"].grafana_ap,
+        efs_loki_ap=stacks["efs_ap"].loki_ap,
+        s3_bucket=stacks["s3"].bucket,
+        ecr_grafana=stacks["ecr"].grafana_repo,
+        ecr_loki=stacks["ecr"].loki_repo,
+        ecr_logger=stacks["ecr"].logger_repo,
+        alb_stack=stacks["alb"],
+        amp_workspace=stacks["amp"].workspace,
+        sqs_stack=stacks["sqs"],
+        dynamodb_stack=stacks["dynamodb"]
+    )
+    return stacks
+
+
+@pytest.fixture
+def build_stacks():
+    return _build_stacks
+
+
+class StubTable:
+    """Async stand-in for the app table: records calls and answers query() from ``items``, newest first"""
+
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.calls = []
+
+    async def query(self, **kwargs):
+        from botocore.exceptions import ClientError
+
+        self.calls.append(("query", kwargs))
+        values = kwargs["ExpressionAttributeValues"]
+        if kwargs.get("IndexName") == "user-index":
+            key_names = ("id", "timestamp", "user_id", "created_at")
+            items = [i for i in self.items if i["user_id"] == values[":user_id"]]
+            items.sort(key=lambda i: i["created_at"], reverse=True)
+        else:
+            key_names = ("id", "timestamp")
+            items = [i for i in self.items if i["id"] == values[":id"]]
+            items.sort(key=lambda i: i["timestamp"], reverse=True)
+        start = kwargs.get("ExclusiveStartKey")
+        if start:
+            if set(start) != set(key_names):
+                raise ClientError({"Error": {"Code": "ValidationException", "Message": "bad start key"}}, "Query")
+            keys = [{k: i[k] for k in key_names} for i in items]
+            items = items[keys.index(start) + 1:]
+        limit = kwargs.get("Limit", len(items))
+        response = {"Items": items[:limit]}
+        if len(items) > limit:
+            response["LastEvaluatedKey"] = {k: items[limit - 1][k] for k in key_names}
+        return response
+
+    async def put_item(self, Item):
+        self.calls.append(("put_item", Item))
+        self.items.append(Item)
+
+
+@pytest.fixture(scope="session")
+def sample_logger():
+    """app.sample_logger imported with telemetry, the SQS consumer and log sampling off"""
+    env = {"OTEL_SDK_DISABLED": "true", "SQS_CONSUMER_ENABLED": "false", "AWS_REGION": "us-east-1",
+           "LOG_SAMPLING": "false", "LOG_ACCESS": "false"}
+    with mock.patch.dict(os.environ, env):
+        module = importlib.import_module("app.sample_logger")
+    yield module
+    logging.getLogger().removeHandler(module.log_handler)
+    module.log_handler.close()
+
+
+@pytest.fixture
+def app_table(sample_logger, monkeypatch):
+    """A StubTable behind the app's endpoints, with a fresh read cache and no write-behind"""
+    from app.logger_app.read_cache import ReadThroughCache
+
+    table = StubTable()
+    monkeypatch.setattr(sample_logger, "app_table", table)
+    monkeypatch.setattr(sample_logger, "app_table_name", "logger-app-data")
+    monkeypatch.setattr(sample_logger, "async_app_table", table)
+    monkeypatch.setattr(sample_logger, "dynamodb_writer", None)
+    monkeypatch.setattr(sample_logger, "read_cache", ReadThroughCache())
+    return table
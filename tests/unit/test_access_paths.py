@@ -0,0 +1,82 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.logger_app.pagination import InvalidPageToken, decode_page_token, encode_page_token
+
+
+def test_page_token_round_trip():
+    key = {"id": "a", "timestamp": "2025-01-01T00:00:00", "user_id": "user-1", "created_at": "2025-01-01T00:00:00"}
+    token = encode_page_token(key)
+
+    assert "=" not in token
+    assert decode_page_token(token) == key
+
+
+def test_last_page_has_no_token():
+    assert encode_page_token(None) is None
+    assert encode_page_token({}) is None
+
+
+@pytest.mark.parametrize("token", ["not-base64!", "WzEsMl0"])
+def test_invalid_tokens_are_rejected(token):
+    with pytest.raises(InvalidPageToken):
+        decode_page_token(token)
+
+
+def test_tokens_must_carry_the_expected_key():
+    names = ("id", "timestamp")
+    assert decode_page_token(encode_page_token({"id": "a", "timestamp": "t"}), names) == {"id": "a", "timestamp": "t"}
+    for key in ({"id": "a"}, {"id": "a", "timestamp": "t", "x": "y"}, {"id": 1, "timestamp": "t"}):
+        with pytest.raises(InvalidPageToken):
+            decode_page_token(encode_page_token(key), names)
+
+
+def _item(n, item_id="a", user_id="user-1"):
+    timestamp = f"2025-01-01T00:00:{n:02d}"
+    return {"id": item_id, "timestamp": timestamp, "user_id": user_id, "created_at": timestamp, "data": {"n": n}}
+
+
+def test_get_data_reads_the_latest_item(sample_logger, app_table):
+    app_table.items += [_item(1), _item(3), _item(2)]
+    client = TestClient(sample_logger.app)
+
+    response = client.get("/get-data/a")
+    assert response.status_code == 200
+    assert response.json()["data"]["timestamp"] == "2025-01-01T00:00:03"
+    _, query = app_table.calls[0]
+    assert query["ScanIndexForward"] is False
+    assert query["Limit"] == 1
+    assert query["ExpressionAttributeValues"] == {":id": "a"}
+
+    assert client.get("/get-data/missing").status_code == 404
+
+
+def test_user_items_page_through_the_user_index(sample_logger, app_table):
+    app_table.items += [_item(n, item_id=f"item-{n}") for n in range(5)] + [_item(9, user_id="user-2")]
+    client = TestClient(sample_logger.app)
+
+    first = client.get("/users/user-1/items?limit=3").json()
+    _, query = app_table.calls[0]
+    assert query["IndexName"] == "user-index"
+    assert query["Limit"] == 3
+    assert query["ScanIndexForward"] is False
+    assert query["ProjectionExpression"] == "#id, #ts, user_id, created_at, #data"
+    assert [i["id"] for i in first["items"]] == ["item-4", "item-3", "item-2"]
+
+    second = client.get(f"/users/user-1/items?limit=3&next_token={first['next_token']}").json()
+    _, query = app_table.calls[1]
+    assert query["ExclusiveStartKey"]["id"] == "item-2"
+    assert [i["id"] for i in second["items"]] == ["item-1", "item-0"]
+    assert second["next_token"] is None
+
+
+@pytest.mark.parametrize("key", [
+    None,
+    {"id": "item-1", "timestamp": "t"},
+    {"id": "item-1", "timestamp": "t", "user_id": "user-2", "created_at": "t"},
+])
+def test_bad_user_item_tokens_are_a_400(sample_logger, app_table, key):
+    token = encode_page_token(key) if key else "not-base64!"
+    response = TestClient(sample_logger.app).get(f"/users/user-1/items?next_token={token}")
+    assert response.status_code == 400
+    assert app_table.calls == []
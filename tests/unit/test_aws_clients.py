@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import threading
+
+from botocore.exceptions import ClientError
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from benchmarks.aws_client_load import run_load
+from benchmarks.standins import StandInDynamoTable
+
+
+def test_proxy_runs_calls_off_the_event_loop():
+    table = StandInDynamoTable()
+    loop_thread = threading.get_ident()
+    call_threads = []
+
+    def put_item(Item):
+        call_threads.append(threading.get_ident())
+        return {}
+
+    table.put_item = put_item
+    executor = AwsCallExecutor(max_concurrency=2)
+    proxy = AsyncAwsProxy(table, executor)
+
+    async def scenario():
+        await proxy.put_item(Item={"id": "a", "timestamp": "t"})
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+    assert call_threads and call_threads[0] != loop_thread
+    assert proxy.table_name == "logger-app-data"
+
+
+def test_proxy_propagates_context():
+    request_id = contextvars.ContextVar("request_id")
+    executor = AwsCallExecutor(max_concurrency=1)
+    proxy = AsyncAwsProxy(type("Client", (), {"whoami": staticmethod(request_id.get)})(), executor)
+
+    async def scenario():
+        request_id.set("req-1")
+        return await proxy.whoami()
+
+    assert asyncio.run(scenario()) == "req-1"
+    executor.shutdown()
+
+
+def test_proxy_reports_every_call_to_the_hook():
+    calls = []
+    table = StandInDynamoTable(latency=0.01)
+    executor = AwsCallExecutor(max_concurrency=1)
+    proxy = AsyncAwsProxy(table, executor, "dynamodb", lambda *call: calls.append(call))
+
+    async def scenario():
+        await proxy.put_item(Item={"id": "a", "timestamp": "t"})
+        try:
+            await proxy.get_item(Key={})
+        except KeyError:
+            pass
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+    assert [(service, operation) for service, operation, _, _ in calls] == [
+        ("dynamodb", "put_item"), ("dynamodb", "get_item")
+    ]
+    assert calls[0][2] >= 0.01 and calls[0][3] is None
+    assert isinstance(calls[1][3], KeyError)
+
+
+def test_async_layer_cuts_p99_under_concurrency():
+    results = asyncio.run(run_load(rate=400.0, requests=60, latency=0.02, max_concurrency=16))
+
+    assert results["async"]["p99_ms"] * 4 < results["blocking"]["p99_ms"]
+
+
+def test_failed_aws_calls_are_tagged_with_their_error(sample_logger, monkeypatch):
+    recorded = []
+
+    class Histogram:
+        def record(self, duration, attributes):
+            recorded.append(attributes)
+
+    monkeypatch.setattr(sample_logger, "aws_service_latency", Histogram())
+    throttled = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "Query")
+    sample_logger.record_aws_call("dynamodb", "query", 0.01, None)
+    sample_logger.record_aws_call("dynamodb", "query", 0.01, throttled)
+    sample_logger.record_aws_call("sqs", "send_message_batch", 0.01, ConnectionError("reset"))
+    sample_logger.record_aws_call("dynamodb", "query", 0.01, None)
+
+    assert recorded == [
+        {"service": "dynamodb", "operation": "query", "status": "success"},
+        {"service": "dynamodb", "operation": "query", "status": "error", "error_code": "ThrottlingException"},
+        {"service": "sqs", "operation": "send_message_batch", "status": "error", "error_code": "ConnectionError"},
+        {"service": "dynamodb", "operation": "query", "status": "success"},
+    ]
+    # Attribute sets are interned, as for the request metrics
+    assert recorded[0] is recorded[3]
@@ -0,0 +1,60 @@
+import boto3
+from boto3.dynamodb.conditions import Key
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from benchmarks.standin_servers import AwsStandInServer, OtlpStandIn
+from benchmarks.suite import SEED_ITEM_ID, SEED_USER_ID, compare, seed
+
+
+def test_boto3_talks_to_the_aws_standin(monkeypatch):
+    aws = AwsStandInServer().start()
+    try:
+        for name, value in aws.aws_environment().items():
+            monkeypatch.setenv(name, value)
+        queue_url = aws.queue_url()
+        sqs = boto3.client("sqs", region_name="us-east-1")
+        sqs.send_message_batch(QueueUrl=queue_url, Entries=[{"Id": "0", "MessageBody": '{"n": 0}'}])
+        messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=1)["Messages"]
+        assert [m["Body"] for m in messages] == ['{"n": 0}']
+
+        seed(aws, items=3)
+        table = boto3.resource("dynamodb", region_name="us-east-1").Table("logger-app-data")
+        table.put_item(Item={"id": SEED_ITEM_ID, "timestamp": "2025-02-01", "data": {"value": 7}})
+        latest = table.query(KeyConditionExpression=Key("id").eq(SEED_ITEM_ID), ScanIndexForward=False, Limit=1)
+        assert latest["Items"][0]["data"]["value"] == 7
+        page = table.query(IndexName="user-index", KeyConditionExpression="user_id = :user_id",
+                           ExpressionAttributeValues={":user_id": SEED_USER_ID}, Limit=2)
+        assert len(page["Items"]) == 2 and "LastEvaluatedKey" in page
+        assert aws.stats()["dynamodb_calls"] == {"put_item": 1, "query": 2}
+    finally:
+        aws.stop()
+
+
+def test_otlp_standin_counts_spans():
+    otlp = OtlpStandIn().start()
+    try:
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter(endpoint=otlp.endpoint)))
+        with provider.get_tracer("test").start_as_current_span("parent"):
+            with provider.get_tracer("test").start_as_current_span("child"):
+                pass
+        provider.shutdown()
+        assert otlp.stats()["spans"] == 2
+    finally:
+        otlp.stop()
+
+
+def test_comparison_flags_regressions():
+    def report(rps, p99, errors=0):
+        return {"results": {"health": {"16": {"throughput_rps": rps, "p99_ms": p99, "errors": errors}}}}
+
+    baseline = report(1000.0, 20.0)
+    assert compare(report(950.0, 22.0), baseline)["regressions"] == []
+    assert compare(report(800.0, 20.0), baseline)["changes"]["health"]["16"]["throughput_change_pct"] == -20.0
+    assert len(compare(report(800.0, 20.0), baseline)["regressions"]) == 1
+    assert len(compare(report(1000.0, 30.0), baseline)["regressions"]) == 1
+    assert len(compare(report(1000.0, 20.0, errors=3), baseline)["regressions"]) == 1
+    # Endpoints or levels missing from the baseline are not compared
+    assert compare(report(1.0, 1000.0), {"results": {}}) == {"changes": {}, "regressions": []}
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from app.logger_app.dynamodb_writer import DynamoDbWriteBehind, WriteQueueFull
+from benchmarks.standins import StandInDynamoResource
+
+TABLE = "logger-app-data"
+
+
+def _item(n):
+    return {"id": f"id-{n}", "timestamp": "t", "value": n}
+
+
+def _run(resource, scenario, **writer_kwargs):
+    executor = AwsCallExecutor(max_concurrency=2)
+    fills = []
+    retries = []
+
+    async def main():
+        writer = DynamoDbWriteBehind(
+            AsyncAwsProxy(resource, executor), TABLE,
+            on_batch=fills.append, on_unprocessed=retries.append,
+            **writer_kwargs
+        )
+        await writer.start()
+        try:
+            return await scenario(writer)
+        finally:
+            await writer.stop()
+
+    try:
+        return asyncio.run(main()), fills, retries
+    finally:
+        executor.shutdown()
+
+
+def test_items_are_written_in_batches_of_25():
+    resource = StandInDynamoResource()
+
+    async def scenario(writer):
+        for n in range(60):
+            writer.submit(_item(n))
+        await asyncio.sleep(0.2)
+        return dict(writer.stats)
+
+    stats, fills, _ = _run(resource, scenario, linger=0.05)
+
+    assert len(resource.Table(TABLE).items) == 60
+    assert fills == [25, 25, 10]
+    assert stats["written"] == 60
+
+
+def test_unprocessed_items_are_retried():
+    resource = StandInDynamoResource()
+    write = resource.batch_write_item
+    calls = []
+
+    def throttled_write(RequestItems):
+        calls.append(len(RequestItems[TABLE]))
+        response = write(RequestItems={TABLE: RequestItems[TABLE][:5]})
+        response["UnprocessedItems"] = {TABLE: RequestItems[TABLE][5:]} if len(RequestItems[TABLE]) > 5 else {}
+        return response
+
+    resource.batch_write_item = throttled_write
+
+    async def scenario(writer):
+        for n in range(12):
+            writer.submit(_item(n))
+        await asyncio.sleep(0.5)
+
+    written = []
+    _, _, retries = _run(resource, scenario, linger=0.01, retry_backoff=0.001,
+                         on_written=lambda item: written.append(item["id"]))
+
+    assert calls == [12, 7, 2]
+    assert sorted(written) == sorted(_item(n)["id"] for n in range(12))
+    assert retries == [7, 2]
+    assert len(resource.Table(TABLE).items) == 12
+
+
+def test_full_queue_applies_backpressure():
+    resource = StandInDynamoResource()
+
+    async def scenario(writer):
+        writer.submit(_item(1))
+        writer.submit(_item(2))
+        with pytest.raises(WriteQueueFull):
+            writer.submit(_item(3))
+
+    _run(resource, scenario, max_queue=2, linger=1)
+
+    assert len(resource.Table(TABLE).items) == 2
+
+
+def test_stop_writes_the_batch_being_lingered_on():
+    resource = StandInDynamoResource()
+
+    async def scenario(writer):
+        for n in range(3):
+            writer.submit(_item(n))
+        await asyncio.sleep(0.05)
+
+    _run(resource, scenario, linger=1.0)
+
+    assert len(resource.Table(TABLE).items) == 3
+
+
+def test_stop_waits_for_the_batch_being_written():
+    resource = StandInDynamoResource(latency=0.2)
+
+    async def scenario(writer):
+        writer.submit(_item(0))
+        await asyncio.sleep(0.1)
+        writer.submit(_item(1))
+
+    _run(resource, scenario, linger=0.01)
+
+    assert len(resource.Table(TABLE).items) == 2
+
+
+def test_deletes_are_written_after_earlier_puts():
+    resource = StandInDynamoResource()
+    written = []
+
+    async def scenario(writer):
+        writer.submit(_item(0))
+        writer.submit_delete({"id": "id-0", "timestamp": "t"})
+        writer.submit(_item(1))
+        await asyncio.sleep(0.05)
+        writer.submit_delete({"id": "id-1", "timestamp": "t"})
+        writer.submit(_item(2))
+
+    _run(resource, scenario, linger=0.01, on_written=lambda target: written.append(target["id"]))
+
+    assert set(resource.Table(TABLE).items) == {("id-2", "t")}
+    assert sorted(written) == ["id-0", "id-1", "id-1", "id-2"]
+
+
+def test_failed_calls_are_not_counted_as_unprocessed_items():
+    resource = StandInDynamoResource()
+    write = resource.batch_write_item
+    calls = []
+
+    def flaky_write(RequestItems):
+        calls.append(len(RequestItems[TABLE]))
+        if len(calls) == 1:
+            raise ConnectionError("connection reset")
+        return write(RequestItems=RequestItems)
+
+    resource.batch_write_item = flaky_write
+
+    async def scenario(writer):
+        for n in range(5):
+            writer.submit(_item(n))
+        await asyncio.sleep(0.2)
+        return dict(writer.stats)
+
+    stats, _, retries = _run(resource, scenario, linger=0.01, retry_backoff=0.001)
+
+    assert calls == [5, 5]
+    assert stats["call_errors"] == 1
+    assert stats["unprocessed_retries"] == 0
+    assert retries == []
+    assert len(resource.Table(TABLE).items) == 5
@@ -0,0 +1,259 @@
+import re
+from pathlib import Path
+
+import aws_cdk.assertions as assertions
+import pytest
+
+from app.modules.loki_profiles import LOKI_PROFILES
+
+
+def _logger_containers(template):
+    task_defs = template.find_resources("AWS::ECS::TaskDefinition")
+    for resource in task_defs.values():
+        containers = resource["Properties"]["ContainerDefinitions"]
+        if any(c["Name"] == "LoggerAppContainer" for c in containers):
+            return {c["Name"]: c for c in containers}
+    raise AssertionError("logger task definition not found")
+
+
+def test_firelens_is_the_default_log_shipping(build_stacks):
+    template = assertions.Template.from_stack(build_stacks()["ecs"])
+    containers = _logger_containers(template)
+    assert "LogRouter" in containers
+    assert containers["LoggerAppContainer"]["LogConfiguration"]["LogDriver"] == "awsfirelens"
+    env = {e["Name"]: e["Value"] for e in containers["LoggerAppContainer"]["Environment"]}
+    assert "LOG_SINK" not in env
+    assert env["LOGGER_RUNTIME_PROFILE"] == "performance"
+
+
+def test_direct_log_shipping_drops_the_sidecar(build_stacks):
+    template = assertions.Template.from_stack(build_stacks({"logger_log_shipping": "direct"})["ecs"])
+    containers = _logger_containers(template)
+    assert "LogRouter" not in containers
+    app = containers["LoggerAppContainer"]
+    assert app["LogConfiguration"]["LogDriver"] == "awslogs"
+    env = {e["Name"]: e["Value"] for e in app["Environment"]}
+    assert env["LOG_SINK"] == "loki"
+    assert env["LOKI_PUSH_URL"] == "http://loki.internal.com/loki/api/v1/push"
+
+
+def test_unknown_log_shipping_mode_is_rejected(build_stacks):
+    with pytest.raises(ValueError):
+        build_stacks({"logger_log_shipping": "sidecar"})
+
+
+def _adot_config(template):
+    containers = _logger_containers(template)
+    env = {e["Name"]: e["Value"] for e in containers["AdotCollector"]["Environment"]}
+    config = env["AOT_CONFIG_CONTENT"]
+    # The AMP endpoint makes the config an Fn::Join
+    if isinstance(config, dict):
+        config = "".join(part for part in config["Fn::Join"][1] if isinstance(part, str))
+    return config
+
+
+def test_tail_sampling_keeps_errors_and_slow_traces(build_stacks):
+    stacks = build_stacks({"logger_trace_slow_ms": "500", "logger_trace_baseline_percent": "2"})
+    template = assertions.Template.from_stack(stacks["ecs"])
+    config = _adot_config(template)
+    assert "processors: [tail_sampling, batch]" in config
+    assert "status_codes: [ERROR]" in config
+    assert "threshold_ms: 500" in config
+    assert "sampling_percentage: 2.0" in config
+    env = {e["Name"]: e["Value"] for e in _logger_containers(template)["LoggerAppContainer"]["Environment"]}
+    assert env["OTEL_TRACES_SAMPLER_ROUTES"] == "/health=0"
+
+    config = _adot_config(assertions.Template.from_stack(build_stacks({"logger_tail_sampling": "off"})["ecs"]))
+    assert "tail_sampling" not in config
+
+
+def _scaling_policies(template):
+    policies = template.find_resources("AWS::ApplicationAutoScaling::ScalingPolicy")
+    return {logical_id: resource["Properties"] for logical_id, resource in policies.items()}
+
+
+def test_logger_service_scales_on_cpu_memory_requests_and_sqs_backlog(build_stacks):
+    template = assertions.Template.from_stack(build_stacks()["ecs"])
+
+    # Loki and Grafana stay at one task by default
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 1)
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "MinCapacity": 1, "MaxCapacity": 4, "ScalableDimension": "ecs:service:DesiredCount"
+    })
+    policies = _scaling_policies(template)
+    tracking = {
+        p["TargetTrackingScalingPolicyConfiguration"]["PredefinedMetricSpecification"]["PredefinedMetricType"]:
+            p["TargetTrackingScalingPolicyConfiguration"]
+        for p in policies.values() if p["PolicyType"] == "TargetTrackingScaling"
+    }
+    assert tracking["ECSServiceAverageCPUUtilization"]["TargetValue"] == 60
+    assert tracking["ECSServiceAverageMemoryUtilization"]["TargetValue"] == 75
+    assert tracking["ALBRequestCountPerTarget"]["TargetValue"] == 500
+    assert tracking["ECSServiceAverageCPUUtilization"]["ScaleInCooldown"] == 120
+    assert tracking["ECSServiceAverageCPUUtilization"]["ScaleOutCooldown"] == 30
+
+    steps = [p["StepScalingPolicyConfiguration"] for p in policies.values() if p["PolicyType"] == "StepScaling"]
+    adjustments = sorted(a["ScalingAdjustment"] for s in steps for a in s["StepAdjustments"])
+    assert adjustments == [-1, 1, 2, 4]
+    alarms = template.find_resources("AWS::CloudWatch::Alarm")
+    expressions = [m["Expression"] for a in alarms.values() for m in a["Properties"].get("Metrics", []) if "Expression" in m]
+    assert expressions == ["visible / IF(tasks > 0, tasks, 1)"] * 2
+    template.has_resource_properties("AWS::ECS::Cluster", {
+        "ClusterSettings": [{"Name": "containerInsights", "Value": "enabled"}]
+    })
+
+
+def test_scaling_ranges_come_from_context(build_stacks):
+    template = assertions.Template.from_stack(build_stacks({
+        "logger_max_tasks": "2", "logger_sqs_backlog_per_task": "0", "logger_scale_memory_percent": "0",
+        "loki_max_tasks": "3", "grafana_min_tasks": "2", "grafana_max_tasks": "2",
+    })["ecs"])
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 2)
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {"MinCapacity": 1, "MaxCapacity": 3})
+    policies = _scaling_policies(template)
+    assert all(p["PolicyType"] == "TargetTrackingScaling" for p in policies.values())
+    # logger: CPU and requests; loki: CPU and memory
+    assert len(policies) == 4
+    template.has_resource_properties("AWS::ECS::Service", {"ServiceName": "grafana-service", "DesiredCount": 2})
+    cluster = next(iter(template.find_resources("AWS::ECS::Cluster").values()))
+    assert "ClusterSettings" not in cluster["Properties"]
+
+    with pytest.raises(ValueError):
+        build_stacks({"logger_min_tasks": "3", "logger_max_tasks": "2"})
+
+
+def test_simple_scalable_loki_runs_write_read_and_backend_services(build_stacks):
+    stacks = build_stacks({"loki_deployment_mode": "simple-scalable"})
+    template = assertions.Template.from_stack(stacks["ecs"])
+
+    services = template.find_resources("AWS::ECS::Service")
+    names = {s["Properties"]["ServiceName"]: s["Properties"] for s in services.values()}
+    assert "loki-service" not in names
+    assert names["loki-write-service"]["DesiredCount"] == 3
+    assert names["loki-read-service"]["DesiredCount"] == 2
+    assert all("ServiceRegistries" in names[f"loki-{t}-service"] for t in ("write", "read", "backend"))
+    template.has_resource_properties("AWS::ServiceDiscovery::PrivateDnsNamespace", {"Name": "loki.local"})
+    template.has_resource_properties("AWS::ServiceDiscovery::Service", {"Name": "loki-write"})
+
+    commands = {
+        c["Command"][-1] for td in template.find_resources("AWS::ECS::TaskDefinition").values()
+        for c in td["Properties"]["ContainerDefinitions"] if c["Name"].startswith("Loki")
+    }
+    assert commands == {"-target=write", "-target=read", "-target=backend"}
+    ranges = sorted(
+        (t["Properties"]["MinCapacity"], t["Properties"]["MaxCapacity"])
+        for t in template.find_resources("AWS::ApplicationAutoScaling::ScalableTarget").values()
+    )
+    # logger, backend, read and write each scale on their own
+    assert ranges == [(1, 2), (1, 4), (2, 6), (3, 6)]
+
+    alb = assertions.Template.from_stack(stacks["alb"])
+    alb.resource_count_is("AWS::ElasticLoadBalancingV2::TargetGroup", 4)
+    alb.has_resource_properties("AWS::ElasticLoadBalancingV2::ListenerRule", {
+        "Priority": 1,
+        "Conditions": assertions.Match.array_with([{
+            "Field": "path-pattern", "PathPatternConfig": {"Values": ["/loki/api/v1/push", "/otlp/v1/logs"]}
+        }])
+    })
+    sg = assertions.Template.from_stack(stacks["sg"])
+    sg.has_resource_properties("AWS::EC2::SecurityGroupIngress", {"IpProtocol": "udp", "FromPort": 7946})
+
+
+def test_monolithic_loki_is_the_default(build_stacks):
+    stacks = build_stacks()
+    names = {s["Properties"]["ServiceName"]
+             for s in assertions.Template.from_stack(stacks["ecs"]).find_resources("AWS::ECS::Service").values()}
+    assert "loki-service" in names and "loki-write-service" not in names
+    assertions.Template.from_stack(stacks["alb"]).resource_count_is("AWS::ElasticLoadBalancingV2::TargetGroup", 3)
+
+    with pytest.raises(ValueError):
+        build_stacks({"loki_deployment_mode": "microservices"})
+
+
+def _loki_task(template, container_name):
+    for resource in template.find_resources("AWS::ECS::TaskDefinition").values():
+        containers = {c["Name"]: c for c in resource["Properties"]["ContainerDefinitions"]}
+        if container_name in containers:
+            return resource["Properties"], containers
+    raise AssertionError(f"{container_name} not found")
+
+
+def test_loki_caches_are_embedded_by_default(build_stacks):
+    template = assertions.Template.from_stack(build_stacks()["ecs"])
+    task, containers = _loki_task(template, "LokiContainer")
+    assert set(containers) == {"LokiContainer"}
+    assert task["Memory"] == "2048"
+    env = {e["Name"]: e["Value"] for e in containers["LokiContainer"]["Environment"]}
+    assert env["LOKI_CHUNK_CACHE_MB"] == "512"
+    assert env["LOKI_SPLIT_QUERIES_BY_INTERVAL"] == "30m"
+    assert "LOKI_MEMCACHED_ADDRESSES" not in env
+
+
+def test_memcached_loki_cache(build_stacks):
+    template = assertions.Template.from_stack(
+        build_stacks({"loki_cache": "memcached", "loki_memcached_mb": "1536"})["ecs"]
+    )
+    task, containers = _loki_task(template, "LokiContainer")
+    assert task["Memory"] == "4096"
+    assert containers["LokiMemcached"]["Command"][:2] == ["-m", "1536"]
+    assert containers["LokiMemcached"]["Essential"] is False
+    env = {e["Name"]: e["Value"] for e in containers["LokiContainer"]["Environment"]}
+    assert env["LOKI_MEMCACHED_ADDRESSES"] == "localhost:11211"
+    assert env["LOKI_EMBEDDED_CACHE"] == "false"
+
+    stacks = build_stacks({"loki_deployment_mode": "simple-scalable", "loki_cache": "memcached"})
+    template = assertions.Template.from_stack(stacks["ecs"])
+    template.has_resource_properties("AWS::ECS::Service", {"ServiceName": "loki-memcached-service"})
+    _, containers = _loki_task(template, "LokiReadContainer")
+    env = {e["Name"]: e["Value"] for e in containers["LokiReadContainer"]["Environment"]}
+    assert env["LOKI_MEMCACHED_ADDRESSES"] == "dns+loki-memcached.loki.local:11211"
+    assertions.Template.from_stack(stacks["sg"]).has_resource_properties(
+        "AWS::EC2::SecurityGroupIngress", {"IpProtocol": "tcp", "FromPort": 11211}
+    )
+
+    with pytest.raises(ValueError):
+        build_stacks({"loki_cache": "redis"})
+
+
+def test_loki_profile_sets_chunk_and_ingestion_settings(build_stacks):
+    template = assertions.Template.from_stack(build_stacks()["ecs"])
+    _, containers = _loki_task(template, "LokiContainer")
+    env = {e["Name"]: e["Value"] for e in containers["LokiContainer"]["Environment"]}
+    assert env["LOKI_CHUNK_ENCODING"] == "snappy"
+    assert env["LOKI_CHUNK_IDLE_PERIOD"] == "30m"
+
+    stacks = build_stacks({"loki_deployment_mode": "simple-scalable", "loki_profile": "high-ingest",
+                           "loki_ingestion_rate_mb": "96"})
+    _, containers = _loki_task(assertions.Template.from_stack(stacks["ecs"]), "LokiWriteContainer")
+    env = {e["Name"]: e["Value"] for e in containers["LokiWriteContainer"]["Environment"]}
+    assert env["LOKI_CHUNK_ENCODING"] == "zstd"
+    assert env["LOKI_CHUNK_TARGET_SIZE"] == "4194304"
+    assert env["LOKI_INGESTION_RATE_MB"] == "96"
+
+    with pytest.raises(ValueError):
+        build_stacks({"loki_profile": "huge"})
+    with pytest.raises(ValueError):
+        build_stacks({"loki_chunk_encoding": "brotli"})
+
+
+@pytest.mark.parametrize("config", ["loki-config.yaml", "loki-config-scalable.yaml"])
+def test_loki_config_defaults_match_the_small_profile(config):
+    text = (Path(__file__).parents[2] / "app" / "config" / "loki" / config).read_text()
+    defaults = dict(re.findall(r"\$\{(LOKI_[A-Z_]+):-([^}]*)\}", text))
+    for name, value in LOKI_PROFILES["small"].items():
+        assert defaults[f"LOKI_{name.upper()}"] == str(value)
+
+
+@pytest.mark.parametrize("mode, services", [
+    ("monolithic", ["loki-service"]),
+    ("simple-scalable", ["loki-write-service", "loki-read-service", "loki-backend-service"]),
+])
+def test_loki_services_are_exported_for_the_deploy_workflow(build_stacks, mode, services):
+    stacks = build_stacks({"loki_deployment_mode": mode, "loki_cache": "memcached"})
+    template = assertions.Template.from_stack(stacks["ecs"])
+    names = {logical_id: resource["Properties"]["ServiceName"]
+             for logical_id, resource in template.find_resources("AWS::ECS::Service").items()}
+    value = template.find_outputs("LokiServiceNames")["LokiServiceNames"]["Value"]
+    # A join of one service is just its name
+    refs = value["Fn::Join"][1] if "Fn::Join" in value else [value]
+    assert [names[ref["Fn::GetAtt"][0]] for ref in refs] == services
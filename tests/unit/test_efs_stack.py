@@ -0,0 +1,104 @@
+import re
+from pathlib import Path
+
+import aws_cdk.assertions as assertions
+import pytest
+
+
+def _loki_task(stacks):
+    template = assertions.Template.from_stack(stacks["ecs"])
+    for resource in template.find_resources("AWS::ECS::TaskDefinition").values():
+        containers = {c["Name"]: c for c in resource["Properties"]["ContainerDefinitions"]}
+        if "LokiContainer" in containers:
+            return resource["Properties"], containers["LokiContainer"]
+    raise AssertionError("Loki task definition not found")
+
+
+def _volume_file_systems(stacks):
+    """Task volume name -> the EfsStack file system it mounts"""
+    efs = stacks["efs"]
+    # "shared" wins when Grafana has no file system of its own
+    ids = {efs.resolve(fs.file_system_id)["Ref"]: name
+           for name, fs in (("grafana", efs.grafana_efs), ("shared", efs.efs))}
+    volumes = {}
+    for resource in assertions.Template.from_stack(stacks["ecs"]).find_resources("AWS::ECS::TaskDefinition").values():
+        for volume in resource["Properties"].get("Volumes", []):
+            import_value = volume["EFSVolumeConfiguration"]["FilesystemId"]["Fn::ImportValue"]
+            volumes[volume["Name"]] = next(name for ref, name in ids.items() if ref in import_value)
+    return volumes
+
+
+@pytest.mark.parametrize("profile, throughput, file_systems", [
+    ("bursting", "bursting", 1),
+    ("elastic", "elastic", 1),
+    ("provisioned", "provisioned", 2),
+    ("ephemeral", "bursting", 1),
+])
+def test_storage_profile_file_systems(build_stacks, profile, throughput, file_systems):
+    stacks = build_stacks({"storage_profile": profile})
+    efs = assertions.Template.from_stack(stacks["efs"])
+    efs.resource_count_is("AWS::EFS::FileSystem", file_systems)
+    efs.has_resource_properties("AWS::EFS::FileSystem", {"ThroughputMode": throughput})
+
+
+def test_bursting_is_the_default_and_shares_one_file_system(build_stacks):
+    stacks = build_stacks()
+    assertions.Template.from_stack(stacks["efs"]).has_resource_properties(
+        "AWS::EFS::FileSystem", {"ThroughputMode": "bursting"}
+    )
+    assert _volume_file_systems(stacks) == {"grafana-efs": "shared", "loki-efs": "shared"}
+    task, container = _loki_task(stacks)
+    assert "EphemeralStorage" not in task
+    assert container["MountPoints"][0]["ContainerPath"] == "/var/loki"
+
+
+def test_provisioned_profile_gives_grafana_its_own_file_system(build_stacks):
+    stacks = build_stacks({"storage_profile": "provisioned", "efs_provisioned_throughput_mibps": "128"})
+    efs = assertions.Template.from_stack(stacks["efs"])
+    efs.has_resource_properties("AWS::EFS::FileSystem", {
+        "ThroughputMode": "provisioned", "ProvisionedThroughputInMibps": 128
+    })
+    efs.has_resource_properties("AWS::EFS::FileSystem", {"ThroughputMode": "bursting"})
+    assert _volume_file_systems(stacks) == {"grafana-efs": "grafana", "loki-efs": "shared"}
+    # Access points are created next to their file system
+    efs.has_resource_properties("AWS::EFS::AccessPoint", {
+        "FileSystemId": {"Ref": stacks["efs"].resolve(stacks["efs"].grafana_efs.file_system_id)["Ref"]},
+        "RootDirectory": assertions.Match.object_like({"Path": "/grafana-data"})
+    })
+
+
+def test_ephemeral_profile_keeps_loki_off_efs(build_stacks):
+    stacks = build_stacks({"storage_profile": "ephemeral", "loki_ephemeral_storage_gib": "100"})
+    task, container = _loki_task(stacks)
+    assert task["EphemeralStorage"] == {"SizeInGiB": 100}
+    assert "Volumes" not in task and "MountPoints" not in container
+    assert container["StopTimeout"] == 120
+    env = {e["Name"]: e["Value"] for e in container["Environment"]}
+    assert env["LOKI_FLUSH_ON_SHUTDOWN"] == "true"
+    assert _volume_file_systems(stacks) == {"grafana-efs": "shared"}
+
+
+def test_loki_image_owns_its_data_directory():
+    # Without an EFS mount /var/loki comes from the image, and Loki runs as uid 10001
+    loki = Path(__file__).parents[2] / "app" / "config" / "loki"
+    path_prefix = re.search(r"path_prefix: (\S+)", (loki / "loki-config.yaml").read_text()).group(1)
+    dockerfile = (loki / "Dockerfile").read_text()
+    assert f"mkdir -p {path_prefix} && chown -R 10001:10001 {path_prefix}" in dockerfile
+    assert re.findall(r"^USER (\S+)", dockerfile, re.M)[-1] == "10001"
+
+
+def test_storage_settings_are_validated(build_stacks):
+    stacks = build_stacks({"grafana_file_system": "separate"})
+    assertions.Template.from_stack(stacks["efs"]).resource_count_is("AWS::EFS::FileSystem", 2)
+    with pytest.raises(ValueError):
+        build_stacks({"storage_profile": "fast"})
+    with pytest.raises(ValueError):
+        build_stacks({"efs_throughput_mode": "max-io"})
+
+
+def test_deploy_workflow_keeps_task_storage():
+    # CI re-registers each task definition with a new image; that must not drop the ephemeral profile's storage
+    workflow = (Path(__file__).parents[2] / ".github" / "workflows" / "logger-deploy.yml").read_text()
+    filters = re.findall(r"jq '\.taskDefinition \| \{([^}]*)\}", workflow)
+    assert len(filters) == 3
+    assert all("ephemeralStorage" in fields for fields in filters)
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Startup budget for `import app.sample_logger`, in milliseconds
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1200"))
+
+# Only needed once a request or the collector needs them
+DEFERRED_MODULES = ("boto3", "requests", "grpc", "opentelemetry.exporter", "opentelemetry.instrumentation")
+
+
+def _import_times():
+    """{module: cumulative microseconds} from python -X importtime"""
+    env = {
+        **os.environ,
+        "AWS_REGION": "us-east-1",
+        "SQS_CONSUMER_ENABLED": "false",
+        "OTEL_EXPORTER_OTLP_ENDPOINT": "http://127.0.0.1:9",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.sample_logger"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=60, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    times = _import_times()
+    loaded = [m for m in times if any(m == d or m.startswith(d + ".") for d in DEFERRED_MODULES)]
+    assert loaded == []
+
+
+def test_startup_import_time_is_within_budget():
+    # The first run also writes bytecode caches; keep the best of the rest
+    best_ms = min(_import_times()["app.sample_logger"] for _ in range(3)) / 1000
+    assert best_ms <= IMPORT_TIME_BUDGET_MS, f"import took {best_ms:.0f} ms"
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+
+from app.logger_app.log_generator import BurstProfile, LogLoadGenerator, size_model
+from app.logger_app.log_sampling import LogSampler
+
+
+class FakeClock:
+    """Advances only when the generator sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 1e-4)
+
+
+@pytest.fixture
+def records():
+    collected = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            collected.append(record)
+
+    logger = logging.getLogger("sample_logger")
+    handler = Collect()
+    logger.addHandler(handler)
+    previous = logger.level
+    logger.setLevel(logging.DEBUG)
+    yield collected
+    logger.setLevel(previous)
+    logger.removeHandler(handler)
+
+
+@pytest.mark.parametrize("kind", ["steady", "square", "sine"])
+def test_burst_integral_matches_the_multiplier(kind):
+    profile = BurstProfile(kind, period=10.0, duty=0.3, factor=4.0)
+    step = 0.001
+    numeric = sum(profile.multiplier((n + 0.5) * step) for n in range(25000)) * step
+    assert profile.integral(25.0) == pytest.approx(numeric, rel=1e-3)
+
+
+def test_generator_holds_the_requested_rate_with_labels_and_sizes(records):
+    clock = FakeClock()
+    generator = LogLoadGenerator(rate=200.0, cardinality=3, sizes=size_model("fixed", fixed=120),
+                                 burst=BurstProfile("square", period=1.0, duty=0.5, factor=3.0))
+    result = generator.generate(duration=2.0, clock=clock, sleep=clock.sleep)
+
+    # 2 periods of (0.5 s at 600 lines/s + 0.5 s at 200 lines/s)
+    assert result["requested_lines"] == pytest.approx(800, abs=1)
+    assert abs(result["lines"] - 800) <= 2
+    assert len(records) == result["lines"]
+    assert {r.stream_id for r in records} == {"stream-0", "stream-1", "stream-2"}
+    assert all(len(r.args[1]) == 120 for r in records)
+
+
+def test_generator_records_are_not_sampled(records):
+    sampler = LogSampler(level_limits={"INFO": (0.0, 1.0)}, template_limit=(0.0, 1.0))
+    clock = FakeClock()
+    LogLoadGenerator(rate=100.0).generate(duration=1.0, clock=clock, sleep=clock.sleep)
+
+    assert len(records) >= 100
+    assert all(sampler.filter(r) for r in records)
+    assert sampler.suppressed_totals() == {}
+
+
+@pytest.mark.parametrize("dist", ["fixed", "uniform", "lognormal"])
+def test_size_models_sample_whole_byte_counts(dist):
+    model = size_model(dist, fixed=150, low=100, high=120, median=200, sigma=0.5)
+    sizes = [model.sample() for _ in range(500)]
+    assert all(isinstance(size, int) and size >= 0 for size in sizes)
+    if dist == "uniform":
+        assert min(sizes) >= 100 and max(sizes) <= 120
+    if dist == "fixed":
+        assert set(sizes) == {150}
+    assert size_model("") is None
@@ -0,0 +1,140 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.logger_app.log_sampling import LogSampler, SharedLimits, update_from_json
+from app.logger_app.logging_pipeline import RingBufferHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ListStream:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines.extend(line for line in data.split("\n") if line)
+
+    def flush(self):
+        pass
+
+
+def _record(level, msg, *args, name="sample_logger"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_templates_are_rate_limited_but_errors_are_always_kept():
+    clock = FakeClock()
+    sampler = LogSampler(template_limit=(1.0, 2.0), clock=clock)
+    visited = "Web endpoint visited at %s from %s"
+
+    kept = [sampler.filter(_record(logging.INFO, visited, n, "10.0.0.1")) for n in range(5)]
+    assert kept == [True, True, False, False, False]
+    # Other templates have their own bucket
+    assert sampler.filter(_record(logging.INFO, "Saved %s", "item-1"))
+    assert all(sampler.filter(_record(logging.ERROR, visited, n, "10.0.0.1")) for n in range(5))
+
+    clock.now = 1.0
+    assert sampler.filter(_record(logging.INFO, visited, 5, "10.0.0.1"))
+    assert not sampler.filter(_record(logging.INFO, visited, 6, "10.0.0.1"))
+    assert sampler.suppressed_totals() == {"INFO": 4}
+
+
+def test_level_limits_and_runtime_updates():
+    clock = FakeClock()
+    sampler = LogSampler(level_limits={"DEBUG": (0.0, 0.0)}, clock=clock)
+    assert not sampler.filter(_record(logging.DEBUG, "debug %s", 1))
+    assert sampler.filter(_record(logging.INFO, "info %s", 1))
+
+    sampler.update(**update_from_json({"levels": {"DEBUG": None, "INFO": {"rate": 0, "burst": 1}}}))
+    assert sampler.filter(_record(logging.DEBUG, "debug %s", 2))
+    assert sampler.filter(_record(logging.INFO, "info %s", 2))
+    assert not sampler.filter(_record(logging.INFO, "info %s", 3))
+    assert sampler.snapshot()["levels"] == {"INFO": {"rate": 0.0, "burst": 1.0}}
+
+    with pytest.raises(ValueError):
+        update_from_json({"levels": {"INFO": {"rate": -1}}})
+
+
+def test_suppressed_messages_are_summarised_by_the_writer():
+    clock = FakeClock()
+    sampler = LogSampler(template_limit=(0.0, 1.0), summary_interval=10.0, clock=clock)
+    stream = ListStream()
+    handler = RingBufferHandler(stream, sampler=sampler)
+    logger = logging.getLogger("test_log_sampling.summary")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+
+    for n in range(4):
+        logger.info("visited %s", n)
+    handler.flush()
+    assert stream.lines == ["visited 0"]
+
+    clock.now = 10.0
+    handler.flush()
+    handler.close()
+    assert stream.lines == ["visited 0", "3 similar messages suppressed: visited %s"]
+
+
+def test_default_limits_suppress_a_burst_of_one_template_but_not_the_access_log(monkeypatch):
+    monkeypatch.delenv("LOG_SAMPLING_TEMPLATE_RATE", raising=False)
+    monkeypatch.delenv("LOG_SAMPLING_LEVELS", raising=False)
+    sampler = LogSampler.from_env()
+    visited = "[INFO] Web endpoint visited at %s from %s. Deployed with Github workflow"
+
+    kept = sum(sampler.filter(_record(logging.INFO, visited, n, "10.0.0.1")) for n in range(1000))
+    assert 50 <= kept < 60
+    assert sampler.suppressed_totals() == {"INFO": 1000 - kept}
+    access = [_record(logging.INFO, "%s %s %s", "GET", "/", 200, name="sample_logger.access") for _ in range(1000)]
+    assert all(sampler.filter(r) for r in access)
+
+    monkeypatch.setenv("LOG_SAMPLING_TEMPLATE_RATE", "200:1000")
+    assert LogSampler.from_env().snapshot()["template_default"] == {"rate": 200.0, "burst": 1000.0}
+
+
+def test_shared_limits_reach_the_other_workers(tmp_path):
+    path = str(tmp_path / "limits.json")
+    first, second = LogSampler(), LogSampler(level_limits={"DEBUG": (0.0, 0.0)})
+    first_file, second_file = SharedLimits(path), SharedLimits(path)
+    assert not second_file.sync(second)
+
+    first.update(**update_from_json({"levels": {"INFO": {"rate": 5, "burst": 10}}}))
+    first_file.publish(first)
+    assert second_file.sync(second)
+    # The published limits replace the worker's own, not merge with them
+    assert second.limits() == first.limits() == {
+        "levels": {"INFO": {"rate": 5.0, "burst": 10.0}}, "template_default": None, "templates": {}
+    }
+    assert not second_file.sync(second)
+    assert not first_file.sync(first)
+
+
+def test_admin_endpoint_needs_admin_token(sample_logger, monkeypatch, tmp_path):
+    path = str(tmp_path / "limits.json")
+    monkeypatch.setattr(sample_logger.log_handler, "sampler", LogSampler())
+    monkeypatch.setattr(sample_logger, "shared_log_limits", SharedLimits(path))
+    client = TestClient(sample_logger.app)
+    body = {"levels": {"INFO": {"rate": 5, "burst": 10}}}
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.put("/admin/log-sampling", json=body).status_code == 404
+    assert client.get("/admin/log-sampling").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.put("/admin/log-sampling", json=body).status_code == 403
+    assert client.put("/admin/log-sampling", json=body, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.put("/admin/log-sampling", json=body, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["sampling"]["levels"] == {"INFO": {"rate": 5.0, "burst": 10.0}}
+
+    other_worker = LogSampler()
+    assert SharedLimits(path).sync(other_worker)
+    assert other_worker.limits()["levels"] == {"INFO": {"rate": 5.0, "burst": 10.0}}
@@ -0,0 +1,105 @@
+import json
+import logging
+import threading
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from app.logger_app.logging_pipeline import JsonFormatter, RingBufferHandler, request_context
+
+
+class BlockingStream:
+    def __init__(self):
+        self.lines = []
+        self.unblocked = threading.Event()
+
+    def write(self, data):
+        self.unblocked.wait(5)
+        self.lines.extend(line for line in data.split("\n") if line)
+
+    def flush(self):
+        pass
+
+
+class CountingArg:
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "value"
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def _logger(handler, name):
+    logger = logging.getLogger(f"test_logging_pipeline.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger
+
+
+def test_records_are_written_as_json_with_request_context():
+    stream = BlockingStream()
+    stream.unblocked.set()
+    handler = RingBufferHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = _logger(handler, "json")
+    tracer = TracerProvider().get_tracer("test")
+
+    token = request_context.set({"scope": {"path": "/get-data/abc"}, "start": 0.0})
+    try:
+        with tracer.start_as_current_span("request") as span:
+            logger.info("Saved %s", "item-1", extra={"latency_ms": 12.5})
+    finally:
+        request_context.reset(token)
+    handler.close()
+
+    entry = json.loads(stream.lines[0])
+    assert entry["message"] == "Saved item-1"
+    assert entry["level"] == "INFO"
+    assert entry["endpoint"] == "/get-data/abc"
+    assert entry["latency_ms"] == 12.5
+    assert entry["trace_id"] == format(span.get_span_context().trace_id, "032x")
+
+
+def test_messages_are_formatted_on_the_writer_thread_only_when_enabled():
+    stream = BlockingStream()
+    stream.unblocked.set()
+    handler = RingBufferHandler(stream)
+    logger = _logger(handler, "lazy")
+    arg = CountingArg()
+
+    logger.debug("skipped %s", arg)
+    logger.info("kept %s", arg)
+    assert arg.threads == []
+    _wait_for(lambda: stream.lines)
+    handler.close()
+
+    assert arg.threads == ["log-writer"]
+    assert stream.lines == ["kept value"]
+
+
+def test_full_buffer_drops_oldest_and_reports_it():
+    stream = BlockingStream()
+    handler = RingBufferHandler(stream, capacity=5, flush_interval=0.01)
+    logger = _logger(handler, "drop")
+
+    # The first record blocks the writer inside write(); the rest queue up
+    logger.info("first")
+    _wait_for(lambda: not handler._records)
+    for n in range(8):
+        logger.info("record %s", n)
+    assert handler.dropped == 3
+
+    stream.unblocked.set()
+    handler.close()
+    assert stream.lines[0] == "first"
+    assert stream.lines[1:6] == [f"record {n}" for n in range(3, 8)]
+    assert stream.lines[6] == "Dropped 3 log records: the log buffer was full"
@@ -0,0 +1,153 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.logger_app.loki_push import LokiPushSink, parse_labels
+
+
+class FakeLoki:
+    def __init__(self):
+        self.pushes = []
+        self.status = 204
+        loki = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if loki.status == 204:
+                    assert self.headers["Content-Encoding"] == "gzip"
+                    loki.pushes.append(json.loads(gzip.decompress(body)))
+                self.send_response(loki.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/loki/api/v1/push"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def lines(self):
+        return [v[1] for push in self.pushes for s in push["streams"] for v in s["values"]]
+
+
+@pytest.fixture
+def loki():
+    server = FakeLoki()
+    yield server
+    server.server.shutdown()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _records(*levels):
+    return [logging.makeLogRecord({"levelname": level, "created": 1700000000.0 + n})
+            for n, level in enumerate(levels)]
+
+
+def _sink(loki, tmp_path, **kwargs):
+    return LokiPushSink(url=loki.url, labels={"job": "test"}, spill_dir=str(tmp_path / "spill"), **kwargs)
+
+
+def test_parse_labels():
+    assert parse_labels("job=logger-app, env=prod") == {"job": "logger-app", "env": "prod"}
+
+
+def test_entries_are_grouped_by_labels_and_flushed_by_size_or_age(loki, tmp_path):
+    clock = Clock()
+    sink = _sink(loki, tmp_path, batch_wait=1.0, batch_max_bytes=10000, clock=clock)
+    sink.write(_records("INFO", "ERROR", "INFO"), ["a", "b", "c"])
+    sink.tick()
+    assert loki.pushes == []
+
+    clock.now = 1.5
+    sink.tick()
+    streams = {s["stream"]["level"]: s for s in loki.pushes[0]["streams"]}
+    assert streams["info"]["stream"] == {"job": "test", "level": "info"}
+    assert [v[1] for v in streams["info"]["values"]] == ["a", "c"]
+    assert streams["error"]["values"] == [["1700000001000000000", "b"]]
+
+    sink.write(_records("INFO"), ["x" * 20000])
+    assert loki.lines()[-1] == "x" * 20000
+
+
+def test_outage_spills_to_disk_and_tick_replays_after_recovery(loki, tmp_path):
+    clock = Clock()
+    sink = _sink(loki, tmp_path, retry_backoff=10.0, clock=clock)
+    loki.status = 503
+    sink.write(_records("INFO"), ["first"])
+    sink.flush()
+    # One attempt, then straight to disk: the writer thread never sleeps
+    assert sink.stats["retries"] == 1
+    assert sink.stats["spilled"] == 1
+
+    # Still inside the backoff window: spilled without another push attempt
+    sink.write(_records("INFO"), ["second"])
+    sink.flush()
+    assert sink.stats["retries"] == 1
+    assert sink.stats["spilled"] == 2
+
+    # The replay is the retry; it fails too, so the backoff doubles
+    clock.now = 10.0
+    sink.tick()
+    assert sink.stats["retries"] == 2
+    assert sink._retry_at >= 20.0
+
+    loki.status = 204
+    clock.now = 40.0
+    sink.tick()
+    assert loki.lines() == ["first", "second"]
+    assert sink.stats["replayed"] == 2
+    assert list((tmp_path / "spill").iterdir()) == []
+
+    sink.write(_records("INFO"), ["third"])
+    sink.flush()
+    assert loki.lines() == ["first", "second", "third"]
+
+
+def test_batches_claimed_by_a_dead_process_are_replayed(loki, tmp_path):
+    spill = tmp_path / "spill"
+    spill.mkdir()
+    body = gzip.compress(json.dumps({"streams": [{"stream": {"job": "test"}, "values": [["1", "orphan"]]}]}).encode())
+    # No process has pid 2**22 + 1 (above Linux's pid_max)
+    (spill / f"00000000000000000001-1.json.gz.{2 ** 22 + 1}.sending").write_bytes(body)
+    (spill / f"00000000000000000002-1.json.gz.{os.getpid()}.sending").write_bytes(body)
+
+    sink = _sink(loki, tmp_path)
+    sink.tick()
+    assert loki.lines() == ["orphan"]
+    # Still being sent by a live process
+    assert [p.name for p in spill.iterdir()] == [f"00000000000000000002-1.json.gz.{os.getpid()}.sending"]
+
+
+def test_spill_directory_is_bounded(loki, tmp_path):
+    sink = _sink(loki, tmp_path, spill_max_bytes=1)
+    loki.status = 500
+    for n in range(3):
+        sink._retry_at = 0.0
+        sink.write(_records("INFO"), [f"line {n}"])
+        sink.flush()
+    assert sink.stats["spill_dropped"] >= 2
+    assert len(list((tmp_path / "spill").iterdir())) <= 1
+
+
+def test_label_fields_become_stream_labels(loki, tmp_path):
+    sink = _sink(loki, tmp_path, label_fields=["stream_id"])
+    records = _records("INFO", "INFO")
+    records[0].stream_id = "stream-1"
+    sink.write(records, ["a", "b"])
+    sink.flush()
+    streams = sorted(s["stream"].get("stream_id", "") for s in loki.pushes[0]["streams"])
+    assert streams == ["", "stream-1"]
@@ -0,0 +1,40 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from app.logger_app.middleware import RequestContextMiddleware, RequestMetrics, request_elapsed
+
+
+def test_requests_are_counted_and_timed_per_route_and_status():
+    reader = InMemoryMetricReader()
+    metrics = RequestMetrics(MeterProvider(metric_readers=[reader]).get_meter("test").create_histogram("duration"))
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, access_log=False, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id, "elapsed": request_elapsed()}
+
+    client = TestClient(app)
+    assert client.get("/items/a").json()["elapsed"] > 0
+    client.get("/items/b")
+    client.get("/missing/1")
+    client.get("/missing/2")
+
+    counts = {(a["endpoint"], a["status"]): count for a, count in metrics.counts()}
+    assert counts == {("/items/{item_id}", 200): 2, ("unmatched", 404): 2}
+    # Attribute sets are built once and reused
+    assert len({id(a) for a, _ in metrics.counts()}) == 2
+
+    points = reader.get_metrics_data().resource_metrics[0].scope_metrics[0].metrics[0].data.data_points
+    assert sorted(p.count for p in points) == [2, 2]
+
+
+def test_unknown_methods_share_one_entry():
+    metrics = RequestMetrics()
+    for n in range(50):
+        metrics.record({"method": f"SCAN{n}", "path": "/"}, 405, 0.001)
+    metrics.record({"method": "GET", "path": "/"}, 405, 0.001)
+
+    assert sorted((a["method"], count) for a, count in metrics.counts()) == [("GET", 1), ("_OTHER", 50)]
@@ -0,0 +1,180 @@
+import asyncio
+
+from app.logger_app.read_cache import ReadThroughCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(clock, **kwargs):
+    events = []
+    cache = ReadThroughCache(
+        on_hit=lambda: events.append("hit"),
+        on_miss=lambda: events.append("miss"),
+        on_evict=lambda reason: events.append(f"evict:{reason}"),
+        clock=clock, wall_clock=clock, **kwargs
+    )
+    return cache, events
+
+
+def _loader(value, calls):
+    async def load():
+        calls.append(1)
+        return value
+    return load
+
+
+def test_hits_skip_the_loader_until_ttl_expires():
+    clock = FakeClock()
+    cache, events = _cache(clock, ttl=10)
+    calls = []
+
+    async def scenario():
+        await cache.get("a", _loader({"id": "a"}, calls))
+        await cache.get("a", _loader({"id": "a"}, calls))
+        clock.now += 11
+        await cache.get("a", _loader({"id": "a"}, calls))
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert events == ["miss", "hit", "evict:expired", "miss"]
+
+
+def test_item_ttl_attribute_caps_the_entry_lifetime():
+    clock = FakeClock()
+    cache, _ = _cache(clock, ttl=60)
+    calls = []
+
+    async def scenario():
+        loader = _loader({"id": "a", "ttl": clock.now + 5}, calls)
+        await cache.get("a", loader)
+        clock.now += 6
+        await cache.get("a", loader)
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+
+
+def test_misses_are_cached_for_the_negative_ttl():
+    clock = FakeClock()
+    cache, events = _cache(clock, ttl=60, negative_ttl=2)
+    calls = []
+
+    async def scenario():
+        assert await cache.get("missing", _loader(None, calls)) is None
+        assert await cache.get("missing", _loader(None, calls)) is None
+        clock.now += 3
+        await cache.get("missing", _loader(None, calls))
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    clock = FakeClock()
+    cache, events = _cache(clock, max_entries=2)
+    calls = []
+
+    async def scenario():
+        await cache.get("a", _loader(1, calls))
+        await cache.get("b", _loader(2, calls))
+        await cache.get("a", _loader(1, calls))
+        await cache.get("c", _loader(3, calls))
+        await cache.get("a", _loader(1, calls))
+        await cache.get("b", _loader(2, calls))
+
+    asyncio.run(scenario())
+
+    assert "evict:size" in events
+    assert len(calls) == 4
+
+
+def test_invalidate_drops_the_entry():
+    cache, _ = _cache(FakeClock())
+    calls = []
+
+    async def scenario():
+        await cache.get("a", _loader(None, calls))
+        cache.invalidate("a")
+        await cache.get("a", _loader({"id": "a"}, calls))
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache, _ = _cache(FakeClock())
+    calls = []
+
+    async def slow_load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "a"}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("a", slow_load) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(r == {"id": "a"} for r in results)
+
+
+def test_a_cancelled_load_does_not_cancel_other_waiters():
+    cache, _ = _cache(FakeClock())
+    calls = []
+
+    async def slow_load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "a"}
+
+    async def scenario():
+        first = asyncio.create_task(cache.get("a", slow_load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get("a", slow_load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, cancelled = asyncio.run(scenario())
+
+    assert cancelled
+    assert result == {"id": "a"}
+    assert len(calls) == 2
+
+
+def test_get_data_is_served_from_the_cache(sample_logger, app_table):
+    from fastapi.testclient import TestClient
+
+    app_table.items.append({"id": "a", "timestamp": "2025-01-01T00:00:00", "user_id": "u"})
+    client = TestClient(sample_logger.app)
+    assert client.get("/get-data/a").status_code == 200
+    assert client.get("/get-data/a").json()["data"]["id"] == "a"
+    assert [call for call, _ in app_table.calls] == ["query"]
+    assert len(sample_logger.read_cache) == 1
+
+
+def test_a_read_racing_a_write_does_not_stay_cached(sample_logger, app_table):
+    from fastapi.testclient import TestClient
+
+    put_item = app_table.put_item
+
+    async def racing_put_item(Item):
+        # A /get-data for the item completes while the write is in flight
+        await sample_logger.read_cache.get(Item["id"], _loader(None, []))
+        await put_item(Item)
+
+    app_table.put_item = racing_put_item
+    response = TestClient(sample_logger.app).post("/save-data?sync=true")
+    assert response.status_code == 200
+    assert len(sample_logger.read_cache) == 0
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.logger_app import runtime_profile
+from app.logger_app.runtime_profile import RuntimeProfile
+
+
+def test_default_profile_is_the_stdlib():
+    profile = RuntimeProfile()
+    assert profile.server_options() == {"loop": "asyncio", "http": "h11", "timeout_keep_alive": 5, "backlog": 2048}
+    assert profile.dumps({"id": "a"}) == json.dumps({"id": "a"})
+    with pytest.raises(ValueError):
+        RuntimeProfile("fastest")
+
+
+def test_performance_profile_falls_back_without_extras(monkeypatch):
+    monkeypatch.setattr(runtime_profile, "installed", lambda module: False)
+    monkeypatch.setattr(runtime_profile, "orjson", None)
+    profile = RuntimeProfile("performance")
+    assert profile.server_options() == {"loop": "asyncio", "http": "h11", "timeout_keep_alive": 65, "backlog": 4096}
+    assert profile.json_library == "json"
+    assert "not installed: uvloop, httptools, orjson" in profile.describe()
+
+
+def test_performance_profile_serializes_with_orjson(monkeypatch):
+    pytest.importorskip("orjson")
+    monkeypatch.setenv("LOGGER_RUNTIME_PROFILE", "performance")
+    monkeypatch.setenv("LOGGER_KEEP_ALIVE_SECONDS", "75")
+    profile = RuntimeProfile.from_env()
+    assert profile.keep_alive == 75
+    assert json.loads(profile.dumps({"id": "a", "n": 1})) == {"id": "a", "n": 1}
+
+    app = FastAPI(default_response_class=profile.response_class)
+
+    @app.get("/")
+    async def index():
+        return {"message": "ok", "items": [1, 2]}
+
+    response = TestClient(app).get("/")
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == b'{"message":"ok","items":[1,2]}'
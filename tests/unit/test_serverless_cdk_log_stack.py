@@ -1,15 +0,0 @@
-import aws_cdk as core
-import aws_cdk.assertions as assertions
-
-from serverless_cdk_log.serverless_cdk_log_stack import ServerlessCdkLogStack
-
-# example tests. To run these tests, uncomment this file along with the example
-# resource in serverless_cdk_log/serverless_cdk_log_stack.py
-def test_sqs_queue_created():
-    app = core.App()
-    stack = ServerlessCdkLogStack(app, "serverless-cdk-log")
-    template = assertions.Template.from_stack(stack)
-
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
@@ -0,0 +1,40 @@
+from app.logger_app import serving
+
+
+def _cgroup(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(tmp_path)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    assert serving.cgroup_cpu_limit(_cgroup(tmp_path, {"cpu.max": "150000 100000\n"})) == 1.5
+    assert serving.cgroup_cpu_limit(_cgroup(tmp_path, {"cpu.max": "max 100000\n"})) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    root = _cgroup(tmp_path, {"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"})
+    assert serving.cgroup_cpu_limit(root) == 2.0
+    (tmp_path / "cpu/cpu.cfs_quota_us").write_text("-1")
+    assert serving.cgroup_cpu_limit(root) is None
+
+
+def test_worker_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(serving, "available_cpus", lambda: 4)
+    half_cpu = _cgroup(tmp_path / "half", {"cpu.max": "50000 100000"})
+    monkeypatch.delenv("LOGGER_WORKERS", raising=False)
+    assert serving.worker_count(half_cpu) == 1
+    assert serving.worker_count(_cgroup(tmp_path / "many", {"cpu.max": "800000 100000"})) == 4
+    assert serving.worker_count(str(tmp_path / "none")) == 4
+    monkeypatch.setenv("LOGGER_WORKERS", "3")
+    assert serving.worker_count(half_cpu) == 3
+
+
+def test_workers_start_without_published_limits(tmp_path, monkeypatch):
+    path = tmp_path / "limits.json"
+    path.write_text('{"levels": {"INFO": {"rate": 0, "burst": 0}}}')
+    monkeypatch.setenv("LOG_SAMPLING_SHARED_FILE", str(path))
+    assert serving.shared_limits_file() == str(path)
+    assert not path.exists()
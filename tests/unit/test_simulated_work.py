@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from app.logger_app.simulated_work import (
+    FixedLatency,
+    LognormalLatency,
+    SimulatedWork,
+    TraceLatency,
+    UniformLatency,
+    latency_model_from_env,
+)
+
+
+def test_sleep_mode_does_not_block_the_event_loop():
+    work = SimulatedWork(FixedLatency(0.05), "sleep")
+
+    async def scenario():
+        start = time.perf_counter()
+        await asyncio.gather(*(work.run() for _ in range(20)))
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_endpoint_default_is_kept_without_configuration(monkeypatch):
+    monkeypatch.delenv("SIMULATED_WORK_DIST", raising=False)
+    default = UniformLatency(0.1, 0.5)
+
+    assert latency_model_from_env("index", default) is default
+
+
+def test_per_endpoint_settings_override_global(monkeypatch):
+    monkeypatch.setenv("SIMULATED_WORK_DIST", "fixed")
+    monkeypatch.setenv("SIMULATED_WORK_FIXED_MS", "20")
+    monkeypatch.setenv("SIMULATED_WORK_INDEX_DIST", "lognormal")
+    monkeypatch.setenv("SIMULATED_WORK_INDEX_MEDIAN_MS", "50")
+
+    index_model = latency_model_from_env("index", None)
+    other_model = latency_model_from_env("test_telemetry", None)
+
+    assert isinstance(index_model, LognormalLatency)
+    assert isinstance(other_model, FixedLatency)
+    assert other_model.sample() == pytest.approx(0.02)
+
+
+def test_trace_file_is_replayed_in_order(tmp_path):
+    trace = tmp_path / "latencies.txt"
+    trace.write_text("# ms\n10\n20,GET /\n30\n")
+    model = TraceLatency.from_file(str(trace))
+
+    assert [model.sample() for _ in range(4)] == pytest.approx([0.01, 0.02, 0.03, 0.01])
+
+
+def test_unknown_distribution_is_rejected(monkeypatch):
+    monkeypatch.setenv("SIMULATED_WORK_DIST", "pareto")
+
+    with pytest.raises(ValueError):
+        latency_model_from_env("index", None)
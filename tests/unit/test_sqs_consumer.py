@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from app.logger_app.sqs_consumer import SqsConsumer
+from benchmarks.standins import StandInSqsClient
+
+QUEUE_URL = "http://sqs.local/queue"
+
+
+async def _wait_for(predicate, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def _run(sqs, scenario, **consumer_kwargs):
+    executor = AwsCallExecutor(max_concurrency=4)
+
+    async def main():
+        consumer = SqsConsumer(AsyncAwsProxy(sqs, executor), QUEUE_URL, wait_time=1, **consumer_kwargs)
+        await consumer.start()
+        try:
+            return await scenario(consumer)
+        finally:
+            await consumer.stop()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        executor.shutdown(wait=False)
+
+
+def test_messages_are_buffered_and_deleted_in_batches():
+    sqs = StandInSqsClient()
+    for n in range(25):
+        sqs.send_message(QUEUE_URL, json.dumps({"n": n}))
+
+    async def scenario(consumer):
+        await _wait_for(lambda: consumer.stats["deleted"] == 25)
+        return consumer.drain(100), consumer.snapshot()
+
+    drained, stats = _run(sqs, scenario)
+
+    assert sorted(m["n"] for m in drained) == list(range(25))
+    assert stats["processed"] == 25
+    assert sqs.calls.get("delete_message", 0) == 0
+    assert sqs.calls["delete_message_batch"] <= 5
+    assert len(sqs.deleted) == 25
+
+
+def test_failed_messages_are_not_acknowledged():
+    sqs = StandInSqsClient()
+    sqs.send_message(QUEUE_URL, json.dumps({"ok": False}))
+    sqs.send_message(QUEUE_URL, json.dumps({"ok": True}))
+
+    async def handler(message):
+        body = json.loads(message["Body"])
+        if not body["ok"]:
+            raise RuntimeError("downstream unavailable")
+        return body
+
+    async def scenario(consumer):
+        await _wait_for(lambda: consumer.stats["processed"] + consumer.stats["failed"] == 2)
+        await _wait_for(lambda: consumer.stats["deleted"] == 1)
+        return consumer.snapshot()
+
+    stats = _run(sqs, scenario, handler=handler)
+
+    assert stats["failed"] == 1
+    assert len(sqs.deleted) == 1
+
+
+def test_bodies_that_are_not_json_are_discarded_at_once():
+    sqs = StandInSqsClient()
+    sqs.send_message(QUEUE_URL, "not json")
+    sqs.send_message(QUEUE_URL, json.dumps({"ok": True}))
+
+    async def scenario(consumer):
+        await _wait_for(lambda: consumer.stats["deleted"] == 2)
+        return consumer.snapshot(), consumer.drain(10)
+
+    stats, drained = _run(sqs, scenario)
+
+    assert stats["discarded"] == 1
+    assert stats["failed"] == 0
+    assert drained == [{"ok": True}]
+    assert len(sqs.deleted) == 2
+
+
+def test_visibility_is_extended_for_slow_messages():
+    sqs = StandInSqsClient()
+    sqs.send_message(QUEUE_URL, json.dumps({"slow": True}))
+
+    async def slow_handler(message):
+        await asyncio.sleep(1.2)
+        return json.loads(message["Body"])
+
+    async def scenario(consumer):
+        await _wait_for(lambda: consumer.stats["deleted"] == 1)
+        return consumer.snapshot()
+
+    stats = _run(sqs, scenario, handler=slow_handler, visibility_timeout=1)
+
+    assert stats["visibility_extended"] >= 1
+
+
+def test_stop_acknowledges_receipts_held_by_the_ack_loop():
+    sqs = StandInSqsClient()
+    for n in range(3):
+        sqs.send_message(QUEUE_URL, json.dumps({"n": n}))
+
+    async def scenario(consumer):
+        # Processed, but still lingering for a fuller delete batch
+        await _wait_for(lambda: consumer.stats["processed"] == 3)
+
+    _run(sqs, scenario, ack_linger=5.0)
+
+    assert len(sqs.deleted) == 3
+
+
+def test_stop_waits_for_a_delete_in_progress():
+    sqs = StandInSqsClient(latency=0.2)
+    sqs.send_message(QUEUE_URL, json.dumps({"n": 0}))
+
+    async def scenario(consumer):
+        await _wait_for(lambda: consumer.stats["processed"] == 1)
+        await asyncio.sleep(0.1)
+
+    _run(sqs, scenario, ack_linger=0.01)
+
+    assert len(sqs.deleted) == 1
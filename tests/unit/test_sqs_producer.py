@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.logger_app.aws_clients import AwsCallExecutor, AsyncAwsProxy
+from app.logger_app.sqs_producer import SqsBatchProducer
+from benchmarks.standins import StandInSqsClient
+
+QUEUE_URL = "http://sqs.local/queue"
+
+
+def _run(sqs, scenario, **producer_kwargs):
+    executor = AwsCallExecutor(max_concurrency=4)
+    batches = []
+
+    async def main():
+        producer = SqsBatchProducer(
+            AsyncAwsProxy(sqs, executor), QUEUE_URL,
+            on_batch=lambda size, sent, failed: batches.append((size, sent, failed)),
+            **producer_kwargs
+        )
+        try:
+            return await scenario(producer)
+        finally:
+            await producer.close()
+
+    try:
+        return asyncio.run(main()), batches
+    finally:
+        executor.shutdown()
+
+
+def test_concurrent_sends_share_batches():
+    sqs = StandInSqsClient()
+
+    async def scenario(producer):
+        return await asyncio.gather(*(producer.send(json.dumps({"n": n})) for n in range(25)))
+
+    message_ids, batches = _run(sqs, scenario, linger=0.05)
+
+    assert len(set(message_ids)) == 25
+    assert sqs.calls == {"send_message_batch": 3}
+    assert [size for size, _, _ in batches] == [10, 10, 5]
+
+
+def test_each_caller_gets_its_own_message_id():
+    sqs = StandInSqsClient()
+
+    async def scenario(producer):
+        ids = await asyncio.gather(*(producer.send(f"body-{n}") for n in range(3)))
+        return dict(zip(ids, (f"body-{n}" for n in range(3))))
+
+    sent, _ = _run(sqs, scenario)
+    received = sqs.receive_message(QUEUE_URL, MaxNumberOfMessages=10)["Messages"]
+
+    assert {m["MessageId"]: m["Body"] for m in received} == sent
+
+
+def test_batch_is_flushed_before_the_payload_limit():
+    sqs = StandInSqsClient()
+
+    async def scenario(producer):
+        return await asyncio.gather(*(producer.send("x" * 100) for _ in range(4)))
+
+    _, batches = _run(sqs, scenario, linger=0.05, max_batch_bytes=250)
+
+    assert [size for size, _, _ in batches] == [2, 2]
+
+
+def test_retryable_failures_are_retried_and_sender_faults_are_not():
+    sqs = StandInSqsClient()
+    send_batch = sqs.send_message_batch
+    attempts = []
+
+    def flaky_send_batch(QueueUrl, Entries):
+        attempts.append(len(Entries))
+        if len(attempts) > 1:
+            return send_batch(QueueUrl, Entries)
+        response = send_batch(QueueUrl, Entries[2:])
+        response["Failed"] = [
+            {"Id": "0", "Code": "InternalError", "SenderFault": False},
+            {"Id": "1", "Code": "InvalidMessageContents", "SenderFault": True},
+        ]
+        return response
+
+    sqs.send_message_batch = flaky_send_batch
+
+    async def scenario(producer):
+        return await asyncio.gather(*(producer.send(f"m{n}") for n in range(3)), return_exceptions=True)
+
+    results, batches = _run(sqs, scenario, retry_backoff=0.001)
+
+    assert attempts == [3, 1]
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], ClientError)
+    assert results[1].response["Error"]["Code"] == "InvalidMessageContents"
+    assert batches == [(3, 1, 1), (1, 1, 0)]
+
+
+def test_close_flushes_pending_messages():
+    sqs = StandInSqsClient()
+
+    async def scenario(producer):
+        task = asyncio.create_task(producer.send("late"))
+        await asyncio.sleep(0)
+        await producer.close()
+        return await task
+
+    message_id, _ = _run(sqs, scenario, linger=10)
+
+    assert message_id
+
+
+def test_failed_calls_are_retried_unless_they_can_never_succeed():
+    sqs = StandInSqsClient()
+    send_batch = sqs.send_message_batch
+    attempts = []
+
+    def throttled_send_batch(QueueUrl, Entries):
+        attempts.append(len(Entries))
+        if len(attempts) == 1:
+            raise ClientError({"Error": {"Code": "RequestThrottled", "Message": "slow down"}}, "SendMessageBatch")
+        if len(attempts) == 2:
+            raise ConnectionError("connection reset")
+        return send_batch(QueueUrl, Entries)
+
+    sqs.send_message_batch = throttled_send_batch
+
+    async def scenario(producer):
+        return await asyncio.gather(*(producer.send(f"m{n}") for n in range(3)))
+
+    results, batches = _run(sqs, scenario, retry_backoff=0.001)
+    assert attempts == [3, 3, 3]
+    assert all(isinstance(r, str) for r in results)
+    assert batches == [(3, 0, 0), (3, 0, 0), (3, 3, 0)]
+
+    def denied_send_batch(QueueUrl, Entries):
+        attempts.append(len(Entries))
+        raise ClientError({"Error": {"Code": "AccessDenied", "Message": "no"}}, "SendMessageBatch")
+
+    sqs.send_message_batch = denied_send_batch
+    attempts.clear()
+    results, batches = _run(sqs, lambda producer: asyncio.gather(producer.send("m"), return_exceptions=True),
+                            retry_backoff=0.001)
+    assert attempts == [1]
+    assert isinstance(results[0], ClientError)
+    assert batches == [(1, 0, 1)]
+
+
+def test_oversized_messages_are_rejected_before_batching():
+    sqs = StandInSqsClient()
+
+    async def scenario(producer):
+        with pytest.raises(ValueError, match="byte limit"):
+            await producer.send("x" * (256 * 1024 + 1))
+        return await producer.send("small")
+
+    message_id, batches = _run(sqs, scenario)
+    assert message_id
+    assert batches == [(1, 1, 0)]
@@ -0,0 +1,22 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from app.modules.sqs_stack import SqsStack
+
+
+def test_message_queue_has_long_polling_and_a_dlq():
+    app = core.App()
+    stack = SqsStack(app, "SqsStack")
+    template = assertions.Template.from_stack(stack)
+
+    template.resource_count_is("AWS::SQS::Queue", 2)
+    template.has_resource_properties("AWS::SQS::Queue", {
+        "QueueName": "logger-app-messages",
+        "VisibilityTimeout": 30,
+        "ReceiveMessageWaitTimeSeconds": 20,
+        "RedrivePolicy": assertions.Match.object_like({"maxReceiveCount": 3}),
+    })
+    template.has_resource_properties("AWS::SQS::Queue", {
+        "QueueName": "logger-app-messages-dlq",
+        "MessageRetentionPeriod": 1209600,
+    })
@@ -0,0 +1,101 @@
+import socket
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased
+
+from app.logger_app.telemetry import (
+    CollectorProbe, GatedSpanExporter, RouteRatioSampler, collector_address, parse_route_ratios
+)
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append(list(spans))
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis=30000):
+        return True
+
+    def shutdown(self):
+        pass
+
+
+def _unused_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_collector_address():
+    assert collector_address("http://localhost:4317") == ("localhost", 4317)
+    assert collector_address("otel:4318") == ("otel", 4318)
+    assert collector_address("http://collector") == ("collector", 4317)
+
+
+def test_spans_are_held_until_the_collector_answers():
+    port = _unused_port()
+    probe = CollectorProbe(f"http://127.0.0.1:{port}", initial_backoff=0.02, max_backoff=0.05)
+    delegate = RecordingExporter()
+    exporter = GatedSpanExporter(lambda: delegate, probe, max_buffered=3)
+    probe.start()
+    try:
+        assert exporter.export(["a", "b"]) == SpanExportResult.SUCCESS
+        assert exporter.export(["c", "d"]) == SpanExportResult.SUCCESS
+        assert delegate.batches == []
+        assert exporter.buffered == 3
+        assert exporter.dropped == 1
+        while probe.attempts < 2:
+            time.sleep(0.01)
+        assert not probe.ready
+
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", port))
+            server.listen()
+            assert probe.wait(timeout=5)
+        # The probe flushes what was held as soon as it connects
+        assert delegate.batches == [["b", "c", "d"]]
+
+        exporter.export(["e"])
+        assert delegate.batches[-1] == ["e"]
+    finally:
+        probe.stop()
+
+
+def test_head_sampling_ratio_per_route():
+    exporter = InMemorySpanExporter()
+    sampler = ParentBased(RouteRatioSampler(parse_route_ratios("/health=0, /items/{item_id}=1"), 0.0))
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        with tracer.start_as_current_span("get_item"):
+            return {}
+
+    @app.get("/other")
+    async def other():
+        return {}
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+    client = TestClient(app)
+    for path in ("/health", "/items/a", "/other", "/health", "/items/b"):
+        client.get(path)
+
+    spans = exporter.get_finished_spans()
+    assert {span.attributes.get("http.route") for span in spans if span.parent is None} == {"/items/{item_id}"}
+    assert sum(span.name == "get_item" for span in spans) == 2
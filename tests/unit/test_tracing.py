@@ -0,0 +1,37 @@
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from app.logger_app.tracing import NOOP_SPAN, Tracing, mark_error
+
+
+def test_disabled_tracing_hands_out_the_shared_noop_span():
+    tracing = Tracing()
+    assert not tracing.enabled
+    with tracing.span("send_sqs_message", {"sqs.queue_url": "queue"}) as span:
+        assert span is NOOP_SPAN
+        assert not span.is_recording()
+        span.set_attribute("sqs.message_id", "id")
+        mark_error(span, ValueError("boom"))
+
+
+def test_enabled_tracing_records_attributes_and_errors():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracing = Tracing(provider.get_tracer("test"))
+    assert tracing.enabled
+
+    with tracing.span("get_data_from_dynamodb", {"dynamodb.table": "items"}) as span:
+        assert span.is_recording()
+        mark_error(span, KeyError("missing"))
+
+    (finished,) = exporter.get_finished_spans()
+    assert finished.name == "get_data_from_dynamodb"
+    assert dict(finished.attributes) == {
+        "dynamodb.table": "items", "error": True, "error.message": "'missing'"
+    }
+    # What the collector's tail_sampling status_code policy matches on
+    assert finished.status.status_code == StatusCode.ERROR
+    assert finished.status.description == "'missing'"
@@ -0,0 +1,104 @@
+import asyncio
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+
+from app.logger_app.workflow import StepTimeout, WorkflowStep, run_workflow
+
+
+def _step(name, calls, delay=0.0, fail=False, **kwargs):
+    async def run(context):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        calls.append(name)
+        return name.upper()
+    return WorkflowStep(name, run, **kwargs)
+
+
+def test_independent_steps_run_concurrently():
+    calls = []
+    steps = [_step("a", calls, delay=0.2), _step("b", calls, delay=0.2)]
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await run_workflow(steps, {})
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(main())
+    assert result.ok
+    assert sorted(result.completed) == ["a", "b"]
+    assert result.results == {"a": "A", "b": "B"}
+    assert elapsed < 0.35
+
+
+def test_dependent_step_waits_and_is_skipped_after_failure():
+    calls = []
+    steps = [
+        _step("a", calls),
+        _step("b", calls, fail=True),
+        _step("c", calls, depends_on=["a", "b"]),
+    ]
+    result = asyncio.run(run_workflow(steps, {}))
+    assert result.completed == ["a"]
+    assert list(result.failed) == ["b"]
+    assert result.skipped == ["c"]
+    assert "c" not in calls
+
+
+def test_failure_compensates_completed_steps():
+    undone = []
+
+    async def undo(context):
+        undone.append("save")
+
+    calls = []
+    save = _step("save", calls, compensate=undo)
+    send = _step("send", calls)
+    slow = _step("slow", calls, delay=1.0, timeout=0.05)
+    result = asyncio.run(run_workflow([save, send, slow], {}))
+
+    assert isinstance(result.failed["slow"], StepTimeout)
+    assert result.compensated == ["save"]
+    assert undone == ["save"]
+    summary = result.summary()
+    assert summary["steps_completed"] == ["save", "send"]
+    assert summary["steps_failed"] == {"slow": "Step slow timed out after 0.05s"}
+
+
+def test_each_step_gets_a_span_under_the_caller():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    calls = []
+
+    async def main():
+        with tracer.start_as_current_span("complete_workflow"):
+            return await run_workflow([_step("a", calls), _step("b", calls, fail=True)], {}, tracer)
+
+    asyncio.run(main())
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    root = spans["complete_workflow"]
+    assert spans["workflow.a"].parent.span_id == root.context.span_id
+    assert spans["workflow.b"].parent.span_id == root.context.span_id
+    assert spans["workflow.b"].attributes["error"] is True
+    assert spans["workflow.b"].status.status_code == StatusCode.ERROR
+
+
+def test_timed_out_step_is_compensated_after_it_finishes():
+    calls = []
+
+    async def undo(context):
+        calls.append("undo")
+
+    save = _step("save", calls, delay=0.06, timeout=0.04, compensate=undo)
+    result = asyncio.run(run_workflow([save], {}))
+
+    assert isinstance(result.failed["save"], StepTimeout)
+    assert result.compensated == ["save"]
+    # The late save landed first, so the undo is not overtaken by it
+    assert calls == ["save", "undo"]